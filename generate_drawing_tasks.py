@@ -6,6 +6,9 @@ By default, it exports:
 	A set of Tasks to TASK_EXPORT_DIR/synthesis
 	A set of images to TASK_EXPORT_DIR/human
     A tasks_curriculum_metadata.json file to TASK_EXPORT_DIR that contains the Curriculum and metadata.
+    A _manifest.json file to TASK_EXPORT_DIR with the task names and the slice of each curriculum block, to load single blocks of synthesis tasks with load_block_tasks.
+
+The curriculum summary, manifests, checkpoint, task summaries and initial library are named for the dataset, such as nuts_bolts_programs_all_v2 (see DATASET_VERSION).
 
 Usage:
     python generate_drawing_tasks.py
@@ -14,32 +17,38 @@ Usage:
             --synthesis_export_dir: where to write out the synthesis tasks, if not the task_export_dir.
     		--renders_export_subdir: where to write out the images, if not the task_export_dir.
 
-    		--tasks_generator : name of the task generator to use.
+    		--tasks_generator : name of the task generator to use. Only the module of each generator that is used is imported, from tasks_generator.TASKS_GENERATOR_MODULES. If more than one is included, runs a job for each generator in one process, which shares its warm program and part caches across the jobs, and prints a timing report for each job.
+            --jobs_config: if included, JSON file with a list of jobs to run after the --tasks_generator jobs. Each job is a dict of arguments, such as {"tasks_generator": "dials_programs", "num_tasks_per_condition": "all"}, which override the commandline arguments for that job.
     		--num_tasks_per_condition: if included, enumerate only a set number of tasks from the generator.	
             --no_render: if included, does not render any images (and leaves the human directory blank.)
 			--train_ratio 0.8 : if included, train test split ratio.
+            --workers 1: if included, number of processes used to build the stimuli, and of threads used by each export stage that writes one file per task. Tasks are rendered one at a time as they are exported. Outputs are byte for byte the same as with a single process.
+            --dedup_similarity 0.95: if included, drops stimuli whose program or perceptual hash duplicates an earlier stimulus, or whose perceptual similarity to one is at least this, before rendering.
+            --stratify_split: if included, splits and truncates the stimuli of each sub-family and abstraction level separately, so that each one is in train and test.
+            --synthesis_format pickle: if included, writes the synthesis tasks as one dill pickle per task, or as a sharded archive that is loaded with task_archive.TaskArchive.
+            --incremental: if included, only re-renders and re-writes the tasks whose content hash changed since the last export with --incremental, and deletes the outputs of tasks that are no longer exported. Hashes are kept in a _export_manifest.json file in TASK_EXPORT_DIR.
+            --checkpoint_every 1024: if included, exports the tasks in shards of this many tasks, and saves a _checkpoint.pkl file to TASK_EXPORT_DIR after each shard. Only supports the default csv summaries and pickled synthesis tasks.
+            --resume: if included, continues a checkpointed run from its last checkpoint. The resumed run regenerates the same curriculum, only renders the tasks that it exports, and exports the same files as an uninterrupted run, with any number of --workers.
+            --summary_format csv: if included with --task_summaries, writes the task summaries as a csv, or as a columnar directory with one JSONL file per field.
+            --strokes_sidecar: if included, writes the ground truth strokes of the task summaries to a binary .npz sidecar instead of the csv. Columnar summaries always use the sidecar.
 """
 
 import os, json, argparse, dill
+import functools
+import itertools
 import pathlib
+import random
+import time
+import numpy as np
 import tasksgenerator.tasks_generator as tasks_generator
+from tasksgenerator.curriculum_index import CurriculumIndex
+import tasksgenerator.task_summaries as task_summaries
+import tasksgenerator.task_archive as task_archive
+from tasksgenerator.export_pipeline import ExportPipeline
+from tasksgenerator.incremental_export import IncrementalExport
+from tasksgenerator.generation_checkpoint import GenerationCheckpoint
 from primitives.object_primitives import export_rendered_program
 
-import tasksgenerator.s12_s13_tasks_generator
-import tasksgenerator.s14_s15_tasks_generator
-import tasksgenerator.s16_s17_tasks_generator
-
-import tasksgenerator.nuts_bolts_tasks_generator
-import tasksgenerator.wheels_tasks_generator
-import tasksgenerator.furniture_tasks_generator
-
-import tasksgenerator.dial_programs_task_generator
-import tasksgenerator.nuts_bolts_programs_tasks_generator
-import tasksgenerator.wheels_programs_tasks_generator
-import tasksgenerator.furniture_programs_tasks_generator
-
-import tasksgenerator.nuts_bolts_synthetic_language_tasks_generator
-
 DEFAULT_EXPORT_DIR = "data"
 DEFAULT_SUMMARIES_SUBDIR = "summaries"
 DEFAULT_SYNTHESIS_TASKS_SUBDIR = "synthesis"
@@ -47,6 +56,19 @@ DEFAULT_RENDERS_SUBDIR = "renders"
 GENERATING_COMMAND = "generating_command"
 COMMAND_PREFIX = "python generate_drawing_tasks.py "
 DEFAULT_LIBRARIES_DIR = f"{DEFAULT_EXPORT_DIR}/libraries"
+MANIFEST_SUFFIX = "_manifest"
+EXPORT_MANIFEST_SUFFIX = "_export_manifest"
+CHECKPOINT_SUFFIX = "_checkpoint"
+DEFAULT_CHECKPOINT_EVERY = 1024
+PICKLE_FORMAT, ARCHIVE_FORMAT = "pickle", "archive"
+# Version of the generated datasets, which is part of their names. The CogSci 2022 dataset in data/ is v1. v2 samples the stimuli of each generator once, rather than sampling them again after counting them, so the same random state gives different stimuli and train/test splits than v1.
+DATASET_VERSION = "v2"
+JOB_TASKS, JOB_GENERATE_TIME, JOB_EXPORT_TIME, JOB_TOTAL_TIME = (
+    "tasks",
+    "generate",
+    "export",
+    "total",
+)
 
 
 parser = argparse.ArgumentParser()
@@ -77,8 +99,14 @@ parser.add_argument(
 )
 parser.add_argument(
     "--tasks_generator",
-    required=True,
-    help="Name of the tasks generator. Must be a registered generator.",
+    nargs="+",
+    default=[],
+    help="Names of the tasks generators. Must be registered generators. Runs a job for each generator.",
+)
+parser.add_argument(
+    "--jobs_config",
+    default=None,
+    help="If included, JSON file with a list of jobs, each with the arguments that it overrides.",
 )
 parser.add_argument(
     "--num_tasks_per_condition",
@@ -98,17 +126,70 @@ parser.add_argument(
 parser.add_argument(
     "--no_render", action="store_true", help="If included, does not render any images.",
 )
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=1,
+    help="If included, number of processes used to build the stimuli, and of threads used by each export stage.",
+)
+parser.add_argument(
+    "--dedup_similarity",
+    type=float,
+    default=None,
+    help="If included, drops near-duplicate stimuli at this similarity before rendering.",
+)
+parser.add_argument(
+    "--stratify_split",
+    action="store_true",
+    help="If included, splits the stimuli of each sub-family and abstraction level separately.",
+)
 parser.add_argument(
     "--task_summaries",
     action="store_true",
     help="If included, writes out a task summary csv.",
 )
+parser.add_argument(
+    "--synthesis_format",
+    default=PICKLE_FORMAT,
+    choices=[PICKLE_FORMAT, ARCHIVE_FORMAT],
+    help="If included, format of the synthesis tasks: one pickle per task, or a sharded archive.",
+)
+parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="If included, only re-exports the tasks that changed since the last incremental export.",
+)
+parser.add_argument(
+    "--checkpoint_every",
+    type=int,
+    default=None,
+    help="If included, number of tasks to export between checkpoints.",
+)
+parser.add_argument(
+    "--resume",
+    action="store_true",
+    help="If included, resumes a checkpointed run from its last checkpoint.",
+)
+parser.add_argument(
+    "--summary_format",
+    default=task_summaries.CSV_FORMAT,
+    choices=task_summaries.SUMMARY_FORMATS,
+    help="If included, format of the task summaries: a csv, or a directory with one JSONL column per field.",
+)
+parser.add_argument(
+    "--strokes_sidecar",
+    action="store_true",
+    help="If included, writes the ground truth strokes of the task summaries to a binary sidecar.",
+)
 
 
 def generate_tasks_curriculum(args):
     print(f"Generating task curriculum from: {args.tasks_generator}...")
     print(f"Generating {args.num_tasks_per_condition} tasks per condition...")
     generator = tasks_generator.TasksGeneratorRegistry[args.tasks_generator]
+    generator.num_workers = getattr(args, "workers", 1)
+    generator.dedup_similarity = getattr(args, "dedup_similarity", None)
+    generator.stratify_split = getattr(args, "stratify_split", False)
     tasks_curriculum = generator.generate_tasks_curriculum(
         args.num_tasks_per_condition, float(args.train_ratio)
     )
@@ -122,49 +203,83 @@ def build_generating_command_string(args):
     return COMMAND_PREFIX + command_string
 
 
+def get_dataset_name(args):
+    """:ret: name of the generated dataset, which names its curriculum summary, manifests, checkpoint, task summaries and initial library."""
+    return f"{args.tasks_generator}_{args.num_tasks_per_condition}_{DATASET_VERSION}"
+
+
 def export_curriculum_summary(args, tasks_curriculum):
     pathlib.Path(args.task_export_dir).mkdir(parents=True, exist_ok=True)
     curriculum_summary = tasks_curriculum.get_curriculum_summary()
     curriculum_summary[tasks_generator.TaskCurriculum.METADATA][
         GENERATING_COMMAND
     ] = build_generating_command_string(args)
-    num_tasks = args.num_tasks_per_condition
-    curriculum_summary_name = f"{args.tasks_generator}_{num_tasks}"
     curriculum_summary_file = os.path.join(
-        args.task_export_dir, curriculum_summary_name + ".json"
+        args.task_export_dir, get_dataset_name(args) + ".json"
     )
     with open(curriculum_summary_file, "w") as f:
         json.dump(curriculum_summary, f, indent="")
     return curriculum_summary_file
 
 
-def export_task_summary(args, tasks_curriculum):
+def export_curriculum_manifest(args, tasks_curriculum):
+    pathlib.Path(args.task_export_dir).mkdir(parents=True, exist_ok=True)
+    manifest = tasks_curriculum.get_manifest()
+    manifest_name = get_dataset_name(args) + MANIFEST_SUFFIX
+    manifest_file = os.path.join(args.task_export_dir, manifest_name + ".json")
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f)
+    return manifest_file
+
+
+def load_block_tasks(
+    manifest_file, synthesis_export_dir, split, condition, curriculum_block
+):
+    """Loads only the synthesis tasks of one curriculum block, using a manifest from export_curriculum_manifest. Condition and curriculum_block are the keys in the curriculum summary, with their prefixes. Synthesis tasks can be pickles or an archive.
+    :ret: [array of DrawingTasks]."""
+    with open(manifest_file) as f:
+        curriculum_index = CurriculumIndex.from_manifest(json.load(f))
+    export_names = curriculum_index.get_block(split, condition, curriculum_block)
+    if task_archive.is_task_archive(synthesis_export_dir):
+        return task_archive.TaskArchive(synthesis_export_dir).load_tasks(export_names)
+    block_tasks = []
+    for export_name in export_names:
+        with open(os.path.join(synthesis_export_dir, export_name + ".pkl"), "rb") as f:
+            block_tasks.append(dill.load(f))
+    return block_tasks
+
+
+def get_task_summary_file(args):
     summaries_export_dir = (
         args.summaries_export_dir
         if args.summaries_export_dir
         else os.path.join(args.task_export_dir, DEFAULT_SUMMARIES_SUBDIR)
     )
-    tasks_summaries = tasks_curriculum.get_curriculum_tasks_csv_summary()
-    num_tasks = args.num_tasks_per_condition
-    curriculum_summary_name = f"{args.tasks_generator}_{num_tasks}"
-    curriculum_summary_file = os.path.join(
-        summaries_export_dir, curriculum_summary_name + ".csv"
-    )
-    import csv
+    curriculum_summary_name = get_dataset_name(args)
+    if args.summary_format == task_summaries.COLUMNAR_FORMAT:
+        return os.path.join(summaries_export_dir, curriculum_summary_name)
+    return os.path.join(summaries_export_dir, curriculum_summary_name + ".csv")
 
-    with open(curriculum_summary_file, "w", encoding="utf8", newline="") as f:
-        fc = csv.DictWriter(f, fieldnames=tasks_summaries[0].keys(),)
-        fc.writeheader()
-        fc.writerows(tasks_summaries)
+
+def export_task_summary(args, tasks_curriculum):
+    tasks_summaries = tasks_curriculum.iter_curriculum_tasks_csv_summary()
+    curriculum_summary_file = get_task_summary_file(args)
+    if args.summary_format == task_summaries.COLUMNAR_FORMAT:
+        task_summaries.write_columnar_summaries(
+            tasks_summaries, curriculum_summary_file
+        )
+    else:
+        task_summaries.write_csv_summaries(
+            tasks_summaries,
+            curriculum_summary_file,
+            strokes_sidecar=args.strokes_sidecar,
+        )
     return curriculum_summary_file
 
 
 def export_initial_library_summary(args, tasks_curriculum):
     libraries_export_dir = args.libraries_export_dir
-    num_tasks = args.num_tasks_per_condition
-    library_summary_file = (
-        f"{args.tasks_generator}_{num_tasks}_dreamcoder_program_dsl_0"
-    )
+    library_summary_file = get_dataset_name(args) + "_dreamcoder_program_dsl_0"
     with open(
         os.path.join(libraries_export_dir, library_summary_file + ".json"), "w"
     ) as f:
@@ -172,55 +287,327 @@ def export_initial_library_summary(args, tasks_curriculum):
         json.dump(library_summary, f)
 
 
-def export_tasks(args, tasks_curriculum):
+def get_synthesis_export_dir(args):
     synthesis_export_dir = (
         args.synthesis_export_dir
         if args.synthesis_export_dir
         else os.path.join(args.task_export_dir, DEFAULT_SYNTHESIS_TASKS_SUBDIR)
     )
     pathlib.Path(synthesis_export_dir).mkdir(parents=True, exist_ok=True)
+    return synthesis_export_dir
+
+
+def export_task(task, synthesis_export_dir, export_name=None):
+    """Pickles a synthesis task to <export_name>.pkl. The export_name defaults to the task name; see TaskCurriculum.get_task_export_name."""
+    export_name = export_name if export_name is not None else task.name
+    task_export_name = os.path.join(synthesis_export_dir, export_name + ".pkl")
+    with open(task_export_name, "wb") as f:
+        dill.dump(task, f)
+
+
+def export_tasks(args, tasks_curriculum):
+    synthesis_export_dir = get_synthesis_export_dir(args)
     curriculum_tasks = tasks_curriculum.get_all_tasks()
     print(
         f"Writing {len(curriculum_tasks)} synthesis tasks out to: {synthesis_export_dir}"
     )
+    if args.synthesis_format == ARCHIVE_FORMAT:
+        task_archive.write_task_archive(
+            curriculum_tasks,
+            synthesis_export_dir,
+            get_export_name=tasks_curriculum.get_task_export_name,
+        )
+        return synthesis_export_dir
     for task in curriculum_tasks:
-        task_export_name = os.path.join(synthesis_export_dir, task.name + ".pkl")
-        with open(task_export_name, "wb") as f:
-            dill.dump(task, f)
+        export_task(
+            task, synthesis_export_dir, tasks_curriculum.get_task_export_name(task)
+        )
     return synthesis_export_dir
 
 
-def export_rendered_images(args, tasks_curriculum):
+def get_renders_export_dir(args):
     renders_export_dir = (
         args.renders_export_dir
         if args.renders_export_dir
         else os.path.join(args.task_export_dir, DEFAULT_RENDERS_SUBDIR)
     )
     pathlib.Path(renders_export_dir).mkdir(parents=True, exist_ok=True)
+    return renders_export_dir
+
+
+def export_rendered_images(args, tasks_curriculum):
+    renders_export_dir = get_renders_export_dir(args)
     curriculum_tasks = tasks_curriculum.get_all_tasks()
     print(f"Writing {len(curriculum_tasks)} renders out to: {renders_export_dir}")
     for task in curriculum_tasks:
-        export_rendered_program(task.rendering, task.name, renders_export_dir)
+        export_rendered_program(
+            task.rendering,
+            tasks_curriculum.get_task_export_name(task),
+            renders_export_dir,
+        )
     return renders_export_dir
 
 
+def get_task_outputs(args, tasks_curriculum, task):
+    """:ret: [files that are exported for the task on its own]."""
+    export_name = tasks_curriculum.get_task_export_name(task)
+    outputs = []
+    if not args.no_synthesis_tasks and args.synthesis_format == PICKLE_FORMAT:
+        outputs.append(
+            os.path.join(get_synthesis_export_dir(args), export_name + ".pkl")
+        )
+    if not args.no_render:
+        outputs.append(os.path.join(get_renders_export_dir(args), export_name + ".png"))
+    return outputs
+
+
+def get_tasks_to_export(args, tasks_curriculum, incremental_export):
+    """Finds the tasks that changed since the last incremental export, and deletes the outputs of tasks that are no longer exported. A sharded archive or task summary is rewritten whole if any task changed or was removed.
+    :ret: [tasks to export], whether to export the task summary."""
+    curriculum_tasks = tasks_curriculum.get_all_tasks()
+    tasks_to_export = incremental_export.get_changed_tasks(
+        curriculum_tasks,
+        functools.partial(get_task_outputs, args, tasks_curriculum),
+        get_export_name=tasks_curriculum.get_task_export_name,
+    )
+    stale_outputs = incremental_export.remove_stale_outputs()
+    changed = (
+        len(tasks_to_export) > 0
+        or len(stale_outputs) > 0
+        or set(incremental_export.previous_tasks) != set(incremental_export.tasks)
+    )
+    print(
+        f"...{len(tasks_to_export)} of {len(curriculum_tasks)} tasks changed, removed {len(stale_outputs)} stale outputs."
+    )
+    if changed and args.synthesis_format == ARCHIVE_FORMAT:
+        tasks_to_export = curriculum_tasks
+    export_summary = changed or not os.path.exists(get_task_summary_file(args))
+    return tasks_to_export, export_summary
+
+
 def export_tasks_curriculum_data(args, tasks_curriculum):
+    """Exports the curriculum data. The synthesis tasks and renders are exported concurrently by an ExportPipeline, which walks the tasks and renders each of them once. The task summaries are not part of that walk: they are written by a job alongside it, which walks the tasks separately in summary order.
+    :ret: {export stage : CPU seconds}, as returned by ExportPipeline.run."""
     export_curriculum_summary(args, tasks_curriculum)
+    export_curriculum_manifest(args, tasks_curriculum)
 
-    if args.task_summaries:
-        export_task_summary(args, tasks_curriculum)
+    curriculum_tasks = tasks_curriculum.get_all_tasks()
+    tasks_to_export, export_summary = curriculum_tasks, True
+    if args.incremental:
+        incremental_export = IncrementalExport(
+            os.path.join(
+                args.task_export_dir,
+                get_dataset_name(args) + EXPORT_MANIFEST_SUFFIX + ".json",
+            )
+        )
+        tasks_to_export, export_summary = get_tasks_to_export(
+            args, tasks_curriculum, incremental_export
+        )
+
+    pipeline = ExportPipeline()
+    if args.task_summaries and export_summary:
+        pipeline.add_job(
+            "task_summaries",
+            functools.partial(export_task_summary, args, tasks_curriculum),
+        )
         export_initial_library_summary(args, tasks_curriculum)
+    add_task_export_stages(args, tasks_curriculum, pipeline)
 
+    print(f"Exporting {len(tasks_to_export)} tasks...")
+    # Render each task once, before it is passed to the stages that use it.
+    render_task = (
+        None if args.no_synthesis_tasks and args.no_render else lambda t: t.rendering
+    )
+    timings = pipeline.run(tasks_to_export, prepare_fn=render_task)
+    if args.incremental:
+        incremental_export.save()
+    for stage, seconds in timings.items():
+        print(f"...{stage}: {seconds:.2f}s")
+    return timings
+
+
+def add_task_export_stages(args, tasks_curriculum, pipeline):
+    """Adds the synthesis tasks and renders stages to an ExportPipeline. Task files are named by their export names in the curriculum."""
+    get_export_name = tasks_curriculum.get_task_export_name
+    num_workers = getattr(args, "workers", 1)
     if not args.no_synthesis_tasks:
-        export_tasks(args, tasks_curriculum)
+        synthesis_export_dir = get_synthesis_export_dir(args)
+        print(f"Writing synthesis tasks out to: {synthesis_export_dir}")
+        if args.synthesis_format == ARCHIVE_FORMAT:
+            pipeline.add_stream_stage(
+                "synthesis_tasks",
+                functools.partial(
+                    task_archive.write_task_archive,
+                    archive_dir=synthesis_export_dir,
+                    get_export_name=get_export_name,
+                ),
+            )
+        else:
+            pipeline.add_task_stage(
+                "synthesis_tasks",
+                lambda task: export_task(
+                    task, synthesis_export_dir, get_export_name(task)
+                ),
+                num_workers=num_workers,
+            )
 
     if not args.no_render:
-        export_rendered_images(args, tasks_curriculum)
+        renders_export_dir = get_renders_export_dir(args)
+        print(f"Writing renders out to: {renders_export_dir}")
+        pipeline.add_task_stage(
+            "renders",
+            lambda task: export_rendered_program(
+                task.rendering, get_export_name(task), renders_export_dir
+            ),
+            num_workers=num_workers,
+        )
+
+
+def get_generation_checkpoint(args):
+    """:ret: the GenerationCheckpoint for a checkpointed run, or None. A resumed run restores the random state of its checkpoint, so it must be called before the curriculum is generated."""
+    if args.checkpoint_every is None and not args.resume:
+        return None
+    checkpoint_file = os.path.join(
+        args.task_export_dir, get_dataset_name(args) + CHECKPOINT_SUFFIX + ".pkl"
+    )
+    if args.resume and os.path.exists(checkpoint_file):
+        checkpoint = GenerationCheckpoint.load(checkpoint_file)
+        checkpoint.restore_random_state()
+        print(f"Resuming from checkpoint after {checkpoint.position} tasks...")
+    else:
+        checkpoint = GenerationCheckpoint(checkpoint_file)
+        checkpoint.record_random_state()
+    return checkpoint
+
+
+def export_tasks_curriculum_data_with_checkpoints(args, tasks_curriculum, checkpoint):
+    """Exports the curriculum data in shards of args.checkpoint_every tasks, in the order of get_all_tasks, and saves the checkpoint after each shard. Generating the curriculum does not render the tasks, with any number of args.workers, so tasks are only rendered in the shard that exports them, and their renderings are dropped afterwards.
+    :ret: {export stage : CPU seconds}, summed over the shards."""
+    if (
+        args.incremental
+        or args.synthesis_format != PICKLE_FORMAT
+        or args.summary_format != task_summaries.CSV_FORMAT
+        or args.strokes_sidecar
+    ):
+        raise ValueError(
+            "Checkpointed runs only support csv task summaries without a strokes sidecar, pickled synthesis tasks, and do not support --incremental."
+        )
+    pathlib.Path(args.task_export_dir).mkdir(parents=True, exist_ok=True)
+    export_curriculum_summary(args, tasks_curriculum)
+    export_curriculum_manifest(args, tasks_curriculum)
+    if args.task_summaries:
+        export_initial_library_summary(args, tasks_curriculum)
+        summary_file = get_task_summary_file(args)
+        pathlib.Path(os.path.dirname(summary_file)).mkdir(parents=True, exist_ok=True)
+
+    curriculum_tasks = tasks_curriculum.get_all_tasks()
+    num_summaries = sum(1 for _ in tasks_curriculum.iter_summary_tasks())
+    checkpoint.start(
+        [tasks_curriculum.get_task_export_name(task) for task in curriculum_tasks]
+    )
+    checkpoint_every = args.checkpoint_every or DEFAULT_CHECKPOINT_EVERY
+    summary_offset = checkpoint.summary_offset
+    render_task = (
+        None if args.no_synthesis_tasks and args.no_render else lambda t: t.rendering
+    )
+    timings = {}
+    for start in range(checkpoint.position, len(curriculum_tasks), checkpoint_every):
+        end = min(start + checkpoint_every, len(curriculum_tasks))
+        shard_tasks = curriculum_tasks[start:end]
+        pipeline = ExportPipeline()
+        add_task_export_stages(args, tasks_curriculum, pipeline)
+        shard_timings = pipeline.run(shard_tasks, prepare_fn=render_task)
+        if args.task_summaries:
+            # Each shard also writes the summaries at the same positions, and the last shard writes the rest.
+            summaries_start = min(start, num_summaries)
+            summaries_end = min(end, num_summaries)
+            if end == len(curriculum_tasks):
+                summaries_end = num_summaries
+            summaries = itertools.islice(
+                tasks_curriculum.iter_curriculum_tasks_csv_summary(summaries_start),
+                summaries_end - summaries_start,
+            )
+            summary_offset = task_summaries.append_csv_summaries(
+                summaries, summary_file, summary_offset
+            )
+        checkpoint.save(end, summary_offset)
+        for task in shard_tasks:
+            task.clear_rendering()
+        for stage, seconds in shard_timings.items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+        print(f"...checkpoint after {end} tasks.")
+    checkpoint.remove()
+    for stage, seconds in timings.items():
+        print(f"...{stage}: {seconds:.2f}s")
+    return timings
+
+
+def get_jobs_args(args):
+    """:ret: [args for each job], with a single tasks_generator: a job for each --tasks_generator, then the jobs in the --jobs_config file."""
+    job_defaults = dict(vars(args), jobs_config=None)
+    jobs_args = [
+        argparse.Namespace(**dict(job_defaults, tasks_generator=generator_name))
+        for generator_name in args.tasks_generator
+    ]
+    if args.jobs_config is not None:
+        with open(args.jobs_config) as f:
+            jobs = json.load(f)
+        for job in jobs:
+            unknown_arguments = set(job) - set(job_defaults)
+            if unknown_arguments:
+                raise ValueError(
+                    f"Unknown arguments in {args.jobs_config}: {sorted(unknown_arguments)}"
+                )
+            jobs_args.append(argparse.Namespace(**dict(job_defaults, **job)))
+    if len(jobs_args) == 0:
+        raise ValueError("Include at least one --tasks_generator or a --jobs_config.")
+    return jobs_args
+
+
+def run_generation_job(args):
+    """Generates and exports the curriculum for a single tasks_generator.
+    :ret: {job stage : seconds} for the generation and export, and the number of tasks."""
+    start = time.time()
+    # Import the generator before a resumed run restores the random state.
+    tasks_generator.TasksGeneratorRegistry.get_class(args.tasks_generator)
+    checkpoint = get_generation_checkpoint(args)
+    tasks_curriculum = generate_tasks_curriculum(args)
+    generate_time = time.time() - start
+    if checkpoint is None:
+        export_tasks_curriculum_data(args, tasks_curriculum)
+    else:
+        export_tasks_curriculum_data_with_checkpoints(
+            args, tasks_curriculum, checkpoint
+        )
+    return {
+        JOB_TASKS: len(tasks_curriculum.get_all_tasks()),
+        JOB_GENERATE_TIME: generate_time,
+        JOB_EXPORT_TIME: time.time() - start - generate_time,
+        JOB_TOTAL_TIME: time.time() - start,
+    }
 
 
 def main(args):
-    tasks_curriculum = generate_tasks_curriculum(args)
-    export_tasks_curriculum_data(args, tasks_curriculum)
+    """Runs each job in this process, so that later jobs reuse the imports and the program and part caches of earlier ones. Every job starts from the random state at the start of the run, so it generates the same tasks as it would on its own.
+    :ret: {job name : timings from run_generation_job}."""
+    jobs_args = get_jobs_args(args)
+    # Generators are only imported when they are used. Import them all before recording the random state, as they seed it when they are imported.
+    for job_args in jobs_args:
+        tasks_generator.TasksGeneratorRegistry.get_class(job_args.tasks_generator)
+    random_state, numpy_random_state = random.getstate(), np.random.get_state()
+    jobs_timings = {}
+    for job_args in jobs_args:
+        random.setstate(random_state)
+        np.random.set_state(numpy_random_state)
+        job_name = f"{job_args.tasks_generator}_{job_args.num_tasks_per_condition}"
+        jobs_timings[job_name] = run_generation_job(job_args)
+
+    print(f"Timings for {len(jobs_timings)} jobs:")
+    for job_name, job_timings in jobs_timings.items():
+        print(
+            f"...{job_name}: {job_timings[JOB_TASKS]} tasks, generate {job_timings[JOB_GENERATE_TIME]:.2f}s, export {job_timings[JOB_EXPORT_TIME]:.2f}s, total {job_timings[JOB_TOTAL_TIME]:.2f}s"
+        )
+    return jobs_timings
 
 
 if __name__ == "__main__":
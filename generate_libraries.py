@@ -23,6 +23,7 @@ import numpy as np
 from primitives.gadgets_primitives import *
 from dreamcoder.grammar import Grammar
 from dreamcoder.program import Program, prettyProgram
+from tasksgenerator.tasks_generator import get_program_metadata
 
 random.seed(0)
 np.random.seed(0)
@@ -156,7 +157,7 @@ def pretty_print_program_columns(args, summaries_dict, libraries_dict, fieldname
 
 def build_frontier_from_summary_row(row):
     program = row[args.program_column]
-    program = Program.parse(program)
+    program = get_program_metadata(program).parsed
     program_type = program.infer()
 
     # Construct task.
@@ -0,0 +1,247 @@
+"""
+gadgets_canonicalizer.py | Author : Catherine Wong.
+
+Canonicalizes program strings in the gadgets DSL so that programs which draw the same strokes have the same text, and computes stable content hashes over them.
+
+Canonicalization is purely syntactic and works on the S-expression, so it does not need to parse or evaluate programs through DreamCoder. It:
+    folds constant arithmetic, eg. (* 2 (* 0.5 1)) -> 1, whenever the result is itself a constant in the DSL.
+    normalizes the arguments to M and removes identity transforms, eg. (T l (M 1 0 0 0)) -> l.
+    removes trivial repeats and empty strokes, eg. (repeat l 1 m) -> l, (C empt l) -> l.
+    flattens chains of C into the same left-nested form produced by connect_strokes.
+    optionally sorts the strokes in a chain of C. This changes the order of the evaluated strokes but not the rendered image, so it is off by default.
+
+The content hash is computed over a fully folded key in which every number is written at a fixed precision, so it is also stable for arithmetic that does not fold back to a DSL constant.
+"""
+
+import math
+import hashlib
+import re
+from functools import lru_cache
+
+from dreamcoder.program import Primitive
+
+TOKENIZER = re.compile(r"#\(|\(|\)|[^\s()]+")
+INVENTION = "#"
+PI = "pi"
+EMPTY_STROKE = "empt"
+CONNECT, TRANSFORM, TRANSFORM_MATRIX, REPEAT = "C", "T", "M", "repeat"
+IDENTITY_TRANSFORM_MATRIX = (1.0, 0.0, 0.0, 0.0)  # s, theta, x, y
+KEY_PRECISION = 12
+CANONICAL_PROGRAM_CACHE_SIZE = 10000
+
+MATH_OPERATIONS = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "*": lambda x, y: x * y,
+    "/": lambda x, y: x / y,
+    "pow": lambda x, y: x**y,
+    "max": max,
+    "min": min,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+}
+
+
+class FoldedConstant:
+    """A folded numeric subexpression. Keeps the canonical source expression for values that are not constants in the DSL."""
+
+    __slots__ = ("value", "source")
+
+    def __init__(self, value, source):
+        self.value = value
+        self.source = source
+
+
+def parse_s_expression(program_string):
+    """:ret: nested tuples of atoms. Inventions #(...) are parsed as (INVENTION, body)."""
+    tokens = TOKENIZER.findall(program_string)
+    stack = [[]]
+    for token in tokens:
+        if token == "(":
+            stack.append([])
+        elif token == "#(":
+            stack.append([INVENTION])
+        elif token == ")":
+            expression = stack.pop()
+            if expression and expression[0] == INVENTION:
+                expression = (INVENTION, tuple(expression[1:]))
+            stack[-1].append(tuple(expression))
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1 or len(stack[0]) != 1:
+        raise ValueError(f"Unbalanced program string: {program_string}")
+    return stack[0][0]
+
+
+def _constant_name(value):
+    """:ret: the DSL constant that evaluates to exactly this value, or None."""
+    if value == _dsl_constant_value(PI):
+        return PI
+    name = f"{value:g}"
+    if name == "-0":
+        name = "0"
+    if _dsl_constant_value(name) == value:
+        return name
+    return None
+
+
+def _dsl_constant_value(atom):
+    """:ret: the value of a numeric constant primitive, or None."""
+    primitive = Primitive.GLOBALS.get(atom)
+    if primitive is None or isinstance(primitive.value, bool):
+        return None
+    if isinstance(primitive.value, (int, float)):
+        return float(primitive.value)
+    return None
+
+
+def _numeric_value(atom):
+    value = _dsl_constant_value(atom)
+    if value is not None:
+        return value
+    try:
+        return float(atom)
+    except ValueError:
+        return None
+
+
+def _fold(expression):
+    """Bottom-up canonicalization. :ret: a FoldedConstant, an atom or a tuple expression."""
+    if isinstance(expression, str):
+        value = _numeric_value(expression)
+        if value is not None:
+            return FoldedConstant(value, expression)
+        return expression
+    if len(expression) == 0:
+        return expression
+    if expression[0] == INVENTION:
+        return (INVENTION, _fold(expression[1]))
+
+    head, arguments = expression[0], [_fold(a) for a in expression[1:]]
+    if head in MATH_OPERATIONS and all(
+        isinstance(a, FoldedConstant) for a in arguments
+    ):
+        source = (head,) + tuple(a.source for a in arguments)
+        try:
+            value = float(MATH_OPERATIONS[head](*[a.value for a in arguments]))
+        except (ArithmeticError, ValueError, TypeError):
+            return source
+        return FoldedConstant(value, source)
+
+    if head == TRANSFORM and len(arguments) == 2:
+        stroke, transform_matrix = arguments
+        if stroke == EMPTY_STROKE:
+            return EMPTY_STROKE
+        if _is_identity_transform_matrix(transform_matrix):
+            return stroke
+    if head == REPEAT and len(arguments) == 3:
+        stroke, n, _ = arguments
+        if stroke == EMPTY_STROKE:
+            return EMPTY_STROKE
+        if isinstance(n, FoldedConstant):
+            if int(n.value) <= 0:
+                return EMPTY_STROKE
+            if int(n.value) == 1:
+                return stroke
+    if head == CONNECT and len(arguments) == 2:
+        operands = _flatten_connect(arguments)
+        if len(operands) == 0:
+            return EMPTY_STROKE
+        if len(operands) == 1:
+            return operands[0]
+        return (CONNECT,) + tuple(operands)
+    return (head,) + tuple(arguments)
+
+
+def _is_identity_transform_matrix(expression):
+    if not (
+        isinstance(expression, tuple)
+        and len(expression) == 5
+        and expression[0] == TRANSFORM_MATRIX
+    ):
+        return False
+    return all(
+        isinstance(a, FoldedConstant) and a.value == identity
+        for a, identity in zip(expression[1:], IDENTITY_TRANSFORM_MATRIX)
+    )
+
+
+def _flatten_connect(arguments):
+    """:ret: the operands of a chain of C, in order and without empty strokes."""
+    flattened = []
+    for argument in arguments:
+        if isinstance(argument, tuple) and argument and argument[0] == CONNECT:
+            flattened += argument[1:]
+        elif argument != EMPTY_STROKE:
+            flattened.append(argument)
+    return flattened
+
+
+def _to_string(expression, sort_connects):
+    if isinstance(expression, FoldedConstant):
+        name = _constant_name(expression.value)
+        if name is not None:
+            return name
+        return _to_string(expression.source, sort_connects)
+    if isinstance(expression, str):
+        return expression
+    if expression and expression[0] == INVENTION:
+        return INVENTION + _to_string(expression[1], sort_connects)
+    if expression and expression[0] == CONNECT:
+        operands = [_to_string(e, sort_connects) for e in expression[1:]]
+        if sort_connects:
+            operands = sorted(operands)
+        connected = operands[0]
+        for operand in operands[1:]:
+            connected = f"(C {connected} {operand})"
+        return connected
+    return "(" + " ".join(_to_string(e, sort_connects) for e in expression) + ")"
+
+
+def _to_key(expression, sort_connects):
+    """As _to_string, but writes every folded number at a fixed precision and reduces angles."""
+    if isinstance(expression, FoldedConstant):
+        value = 0.0 if expression.value == 0 else expression.value
+        return f"{value:.{KEY_PRECISION}g}"
+    if isinstance(expression, str):
+        return expression
+    if expression and expression[0] == INVENTION:
+        return INVENTION + _to_key(expression[1], sort_connects)
+    if expression and expression[0] == CONNECT:
+        operands = [_to_key(e, sort_connects) for e in expression[1:]]
+        if sort_connects:
+            operands = sorted(operands)
+        return "(" + " ".join([CONNECT] + operands) + ")"
+    if (
+        expression
+        and expression[0] == TRANSFORM_MATRIX
+        and len(expression) == 5
+        and isinstance(expression[2], FoldedConstant)
+    ):
+        theta = expression[2].value % (2 * math.pi)
+        expression = expression[:2] + (FoldedConstant(theta, None),) + expression[3:]
+    return "(" + " ".join(_to_key(e, sort_connects) for e in expression) + ")"
+
+
+@lru_cache(maxsize=CANONICAL_PROGRAM_CACHE_SIZE)
+def _canonicalize_program_string(program_string, sort_connects):
+    folded = _fold(parse_s_expression(program_string))
+    return (
+        _to_string(folded, sort_connects),
+        hashlib.sha1(_to_key(folded, sort_connects).encode("utf-8")).hexdigest(),
+    )
+
+
+def canonicalize_program(program, sort_connects=False):
+    """
+    :program: a program string or a parsed Program in the gadgets DSL.
+    :sort_connects: if True, sorts the strokes within each chain of C. Only use this where stroke order does not matter, such as when comparing renders.
+    :ret: the canonical program string, which parses and evaluates to the same strokes as program.
+    """
+    return _canonicalize_program_string(str(program), sort_connects)[0]
+
+
+def program_content_hash(program, sort_connects=False):
+    """:ret: a stable hex digest that is equal for programs with the same canonical form. See canonicalize_program."""
+    return _canonicalize_program_string(str(program), sort_connects)[1]
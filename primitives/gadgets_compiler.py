@@ -0,0 +1,345 @@
+"""
+gadgets_compiler.py | Author : Catherine Wong.
+
+Compiles programs in the gadgets DSL into flat instruction lists that are evaluated without DreamCoder's interpreter.
+
+Programs are parsed directly from their strings, and primitives are resolved through the same global primitive table used by Program.parse. Numeric and transform matrix subexpressions are folded when the program is compiled, and identical subexpressions are only evaluated once. The values of subexpressions, whether they are folded or evaluated by instructions, are kept in SUBEXPRESSION_VALUE_CACHE by their subexpression string. The cache is shared by every compiled program, so a subexpression that is compiled or evaluated again, by the same or any other program, is not recomputed while it is cached. The stroke operations (T, C and repeat) transform one stroke at a time, with the same matrix product as _tform_once, so compiled programs evaluate to bitwise identical strokes. They are not batched into a single matrix product over every stroke, since BLAS can round that product differently from _tform_once in the last bit.
+
+Programs that cannot be compiled, such as those with lambdas or inventions, are evaluated with Program.evaluate.
+"""
+
+import numpy as np
+from collections import defaultdict
+from functools import lru_cache
+from dreamcoder.program import Program, Primitive
+from dreamcoder.utilities import Curried
+from primitives.object_primitives import (
+    _makeAffine,
+    _connect,
+    render_stroke_arrays_to_canvas,
+    XYLIM,
+    SYNTHESIS_TASK_CANVAS_WIDTH_HEIGHT,
+)
+from primitives.gadgets_canonicalizer import parse_s_expression
+from tasksgenerator.tasks_generator import LRUCache
+
+COMPILED_PROGRAM_CACHE_SIZE = 10000
+SUBEXPRESSION_VALUE_CACHE_SIZE = 10000
+# {subexpression string : value} for the subexpressions of every compiled program. Values are never modified in place, and are copied when they are returned from a CompiledProgram.
+SUBEXPRESSION_VALUE_CACHE = LRUCache(SUBEXPRESSION_VALUE_CACHE_SIZE)
+
+
+class UncompilableProgramError(Exception):
+    pass
+
+
+def _transform_stroke(p, transformation_matrix):
+    """_tform_once for a single stroke. Computes the same matrix product on the same homogeneous coordinates, so the result is bitwise identical, without _tform_once's intermediate copies."""
+    points = np.empty((p.shape[0], 3))
+    points[:, :2] = p
+    points[:, 2] = 1.0
+    return (transformation_matrix @ points.transpose()).transpose()[:, :2]
+
+
+def _transform(p, transformation_matrix):
+    """_tform_once, one stroke at a time."""
+    if isinstance(p, list):
+        return [_transform(x, transformation_matrix) for x in p]
+    return _transform_stroke(p, transformation_matrix)
+
+
+def _repeat(p, n, transformation_matrix):
+    """_repeat without copying each stroke. Values are never modified in place, and are copied when they are returned from a CompiledProgram."""
+    p_out = []
+    for i in range(int(n)):
+        if i > 0:
+            p = _transform(p, transformation_matrix)
+        p_out.extend(p)
+    return p_out
+
+
+def _make_affine_simple(s, theta, x, y):
+    return _makeAffine(s, theta, x, y)
+
+
+# Kernels for the stroke operations, and the matrix constructor so that matrices fold. {name : (kernel, arity, folds)}
+KERNELS = {
+    "M": (_make_affine_simple, 4, True),
+    "T": (_transform, 2, False),
+    "C": (_connect, 2, False),
+    "repeat": (_repeat, 3, False),
+}
+
+
+def _apply_primitive(value, *arguments):
+    for argument in arguments:
+        value = value(argument)
+    return value
+
+
+class CompiledProgram:
+    """
+    CompiledProgram: flat instruction list for one or more programs.
+    registers: initial register values, with the values of all folded subexpressions.
+    instructions: [(output register, kernel, [argument registers], [registers released], subexpression string)] in evaluation order. Intermediate registers are released after their last use. Values are looked up in SUBEXPRESSION_VALUE_CACHE by their subexpression string before they are computed.
+    outputs: the register holding the value of each program.
+    """
+
+    __slots__ = ("registers", "instructions", "outputs")
+
+    def __init__(self, registers, instructions, outputs):
+        self.registers = registers
+        self.outputs = outputs
+        # Release each intermediate register after the last instruction that reads it.
+        last_uses = {}
+        for idx, (_, _, arguments, _) in enumerate(instructions):
+            for argument in arguments:
+                last_uses[argument] = idx
+        releases, output_registers = defaultdict(list), set(outputs)
+        for register, idx in last_uses.items():
+            if register not in output_registers:
+                releases[idx].append(register)
+        self.instructions = tuple(
+            (output, kernel, arguments, releases[idx], key)
+            for idx, (output, kernel, arguments, key) in enumerate(instructions)
+        )
+
+    def evaluate_registers(self):
+        registers = list(self.registers)
+        for output, kernel, arguments, released, key in self.instructions:
+            value = SUBEXPRESSION_VALUE_CACHE.get(key)
+            if value is None:
+                value = kernel(*[registers[a] for a in arguments])
+                SUBEXPRESSION_VALUE_CACHE[key] = value
+            registers[output] = value
+            for register in released:
+                registers[register] = None
+        return registers
+
+    def evaluate_outputs(self):
+        """:ret: [value of each program], as Program.evaluate would return them."""
+        registers = self.evaluate_registers()
+        return [_to_value(registers[output]) for output in self.outputs]
+
+    def __call__(self):
+        """:ret: the value of the first program, as Program.evaluate would return it."""
+        return _to_value(self.evaluate_registers()[self.outputs[0]])
+
+
+def _get_cached_value(key, fn, *arguments):
+    """:ret: the cached value of the subexpression with this key, or fn(*arguments), which is cached."""
+    value = SUBEXPRESSION_VALUE_CACHE.get(key)
+    if value is None:
+        value = fn(*arguments)
+        SUBEXPRESSION_VALUE_CACHE[key] = value
+    return value
+
+
+def _to_value(value):
+    if isinstance(value, list):
+        return [np.copy(p) for p in value]
+    if isinstance(value, np.ndarray):
+        return np.copy(value)
+    return value
+
+
+class ProgramCompiler:
+    """
+    ProgramCompiler: builds a CompiledProgram. Identical subexpressions are compiled into a single register, including across every program added to the same compiler.
+    """
+
+    FOLDED, INSTRUCTION = "folded", "instruction"
+
+    def __init__(self):
+        self.registers = []
+        self.instructions = []
+        self.register_kinds = []
+        self.register_keys = []
+        self.subexpression_registers = {}
+        self.outputs = []
+
+    def add_program(self, program):
+        """Adds a program string or parsed Program. :ret: its output register. Raises UncompilableProgramError and leaves the compiler unchanged."""
+        num_registers, num_instructions = len(self.registers), len(self.instructions)
+        try:
+            output = self._compile(parse_s_expression(str(program)))
+        except (UncompilableProgramError, ValueError) as e:
+            del self.registers[num_registers:]
+            del self.register_kinds[num_registers:]
+            del self.register_keys[num_registers:]
+            del self.instructions[num_instructions:]
+            self.subexpression_registers = {
+                expression: register
+                for expression, register in self.subexpression_registers.items()
+                if register < num_registers
+            }
+            raise UncompilableProgramError(str(e))
+        self.outputs.append(output)
+        return output
+
+    def build(self):
+        return CompiledProgram(
+            tuple(self.registers), tuple(self.instructions), tuple(self.outputs)
+        )
+
+    def _new_register(self, kind, key, value=None):
+        self.registers.append(value)
+        self.register_kinds.append(kind)
+        self.register_keys.append(key)
+        return len(self.registers) - 1
+
+    def _compile(self, expression):
+        if expression in self.subexpression_registers:
+            return self.subexpression_registers[expression]
+        if isinstance(expression, str):
+            register = self._new_register(
+                ProgramCompiler.FOLDED,
+                expression,
+                _get_cached_value(expression, self._evaluate_atom, expression),
+            )
+        else:
+            register = self._compile_application(expression)
+        self.subexpression_registers[expression] = register
+        return register
+
+    def _compile_application(self, expression):
+        if len(expression) < 2 or not isinstance(expression[0], str):
+            raise UncompilableProgramError(f"Cannot compile: {expression}")
+        head, arguments = expression[0], [self._compile(e) for e in expression[1:]]
+        self._lookup_primitive(head)
+        if head in KERNELS:
+            kernel, arity, folds = KERNELS[head]
+            if len(arguments) != arity:
+                raise UncompilableProgramError(f"Partial application: {expression}")
+        else:
+            kernel, folds = self._primitive_kernel(head), True
+            arguments = [None] + arguments
+
+        key = "({})".format(
+            " ".join(
+                [head] + [self.register_keys[a] for a in arguments if a is not None]
+            )
+        )
+        if folds and all(
+            a is None or self.register_kinds[a] == ProgramCompiler.FOLDED
+            for a in arguments
+        ):
+            values = [self.registers[a] for a in arguments if a is not None]
+            return self._new_register(
+                ProgramCompiler.FOLDED, key, _get_cached_value(key, kernel, *values)
+            )
+
+        register = self._new_register(ProgramCompiler.INSTRUCTION, key)
+        self.instructions.append(
+            (register, kernel, [a for a in arguments if a is not None], key)
+        )
+        return register
+
+    def _primitive_kernel(self, name):
+        value = self._lookup_primitive(name).value
+        return lambda *arguments: _apply_primitive(value, *arguments)
+
+    def _lookup_primitive(self, name):
+        if name not in Primitive.GLOBALS:
+            raise UncompilableProgramError(f"Unknown primitive: {name}")
+        return Primitive.GLOBALS[name]
+
+    def _evaluate_atom(self, atom):
+        if atom in Primitive.GLOBALS:
+            return Primitive.GLOBALS[atom].value
+        # Numeric literals: defer to Program.parse so that they have the same values.
+        try:
+            float(atom)
+            return Program.parse(atom).evaluate([])
+        except Exception:
+            raise UncompilableProgramError(f"Unknown primitive: {atom}")
+
+
+@lru_cache(maxsize=COMPILED_PROGRAM_CACHE_SIZE)
+def _compile_program_string(program_string):
+    compiler = ProgramCompiler()
+    compiler.add_program(program_string)
+    return compiler.build()
+
+
+def compile_program(program):
+    """:ret: a CompiledProgram for a program string or parsed Program. Raises UncompilableProgramError."""
+    return _compile_program_string(str(program))
+
+
+def evaluate_program(program):
+    """Evaluates a program string or parsed Program. :ret: the same value as Program.evaluate([])."""
+    try:
+        compiled_program = compile_program(program)
+    except UncompilableProgramError:
+        if type(program) == str:
+            program = Program.parse(program)
+        return program.evaluate([])
+    return compiled_program()
+
+
+def evaluate_programs(programs):
+    """
+    Evaluates a batch of program strings or parsed Programs. Subexpressions shared by any of the programs are only evaluated once.
+    :ret: [value of each program], the same values as Program.evaluate([]).
+    """
+    compiler, outputs = ProgramCompiler(), []
+    for program in programs:
+        try:
+            outputs.append(compiler.add_program(program))
+        except UncompilableProgramError:
+            outputs.append(None)
+    registers = compiler.build().evaluate_registers()
+
+    values = []
+    for program, output in zip(programs, outputs):
+        if output is None:
+            values.append(evaluate_program(program))
+        else:
+            values.append(_to_value(registers[output]))
+    return values
+
+
+def render_parsed_programs(
+    programs,
+    stroke_width_height=8 * XYLIM,
+    canvas_width_height=SYNTHESIS_TASK_CANVAS_WIDTH_HEIGHT,
+):
+    """Batched render_parsed_program. Programs are evaluated together with evaluate_programs, and programs with the same program string share a single rendering. :ret: [rendering of each program]."""
+    programs = [Program.parse(p) if type(p) == str else p for p in programs]
+    unrendered = defaultdict(list)
+    for program in programs:
+        if not hasattr(program, "rendering"):
+            unrendered[str(program)].append(program)
+
+    program_strings = list(unrendered)
+    for program_string, evaluated_program in zip(
+        program_strings, evaluate_programs(program_strings)
+    ):
+        rendering = render_stroke_arrays_to_canvas(
+            evaluated_program, stroke_width_height, canvas_width_height
+        )
+        for program in unrendered[program_string]:
+            program.rendering = rendering
+    return [program.rendering for program in programs]
+
+
+def render_parsed_program(
+    program,
+    stroke_width_height=8 * XYLIM,
+    canvas_width_height=SYNTHESIS_TASK_CANVAS_WIDTH_HEIGHT,
+    allow_partial_rendering=False,
+):
+    """Drop-in replacement for object_primitives.render_parsed_program that evaluates with the compiled evaluator."""
+    if type(program) == str:
+        program = Program.parse(program)
+    if not hasattr(program, "rendering"):
+        evaluated_program = evaluate_program(program)
+        # If program is a Curried object, render the arguments
+        if allow_partial_rendering and isinstance(evaluated_program, Curried):
+            assert len(evaluated_program.arguments) == 1
+            evaluated_program = evaluated_program.arguments[0]
+        program.rendering = render_stroke_arrays_to_canvas(
+            evaluated_program, stroke_width_height, canvas_width_height
+        )
+    return program.rendering
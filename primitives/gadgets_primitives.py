@@ -21,6 +21,7 @@ from dreamcoder.utilities import Curried
 from dreamcoder.program import *
 from dreamcoder.type import baseType, arrow, tmaybe, t0, t1, t2
 from tasksgenerator.tasks_generator import *
+from primitives.gadgets_compiler import evaluate_program
 
 from primitives.object_primitives import (
     tstroke,
@@ -251,17 +252,14 @@ def peval(program_string):
     try:
         return float(program_string)
     except:
-        p = Program.parse(program_string)
-        output = p.evaluate([])
-        return output
+        return evaluate_program(program_string)
 
 
 def get_simplified(program_string):
     try:
         return f"{float(program_string):g}"
     except:
-        p = Program.parse(program_string)
-        output = p.evaluate([])
+        output = evaluate_program(program_string)
         output = f"{output:g}"
         try:
             p = Program.parse(output)
@@ -401,7 +399,7 @@ class Shape:
             self.synthetic_language = [copy.deepcopy(SYNTHETIC_LANG_DICT)]
         self.synthetic_abstractions = synthetic_abstractions
         if synthetic_abstractions is None:
-            self.synthetic_abstractions = copy.deepcopy(SYNTHETIC_DICT)
+            self.synthetic_abstractions = SyntheticAbstractions()
 
     def add_shapes(self, new_shapes):
         # Connect all of the programs.
@@ -421,8 +419,7 @@ class Shape:
         )
         for s in new_shapes:
             self.strokes += copy.deepcopy(s.strokes)
-            for k in s.synthetic_abstractions:
-                self.synthetic_abstractions[k] += s.synthetic_abstractions[k]
+            self.synthetic_abstractions.merge(s.synthetic_abstractions)
             self.synthetic_language += s.synthetic_language
 
     @staticmethod
@@ -0,0 +1,74 @@
+"""test_gadgets_canonicalizer.py | Author : Catherine Wong"""
+
+import numpy as np
+from dreamcoder.program import Program
+import primitives.gadgets_canonicalizer as to_test
+import primitives.gadgets_primitives  # Registers the gadgets DSL primitives.
+
+TEST_PROGRAMS = [
+    "(T l (M (* 2 (* 0.5 1)) 0 (- 0 0.5) 0))",
+    "(C (C empt l) (C c (T r (M 1 0 0 0))))",
+    "(repeat (T l (M 1 0 -0.5 (/ 0.5 (tan (/ pi 6))))) 6 (M 1 (/ (* 2 pi) 6) 0 0))",
+    "(repeat (r_s (+ 1 1) 3) 1 (M 1 0 0.5 0))",
+]
+
+
+def assert_same_strokes(strokes_1, strokes_2):
+    assert len(strokes_1) == len(strokes_2)
+    for stroke_1, stroke_2 in zip(strokes_1, strokes_2):
+        assert np.allclose(stroke_1, stroke_2)
+
+
+def test_canonicalize_program_folds_constants():
+    assert to_test.canonicalize_program("(* 2 (* 0.5 1))") == "1"
+    assert (
+        to_test.canonicalize_program("(T l (M 1 0 (- 0 0.5) 0))")
+        == "(T l (M 1 0 -0.5 0))"
+    )
+    assert to_test.canonicalize_program("(T l (M (* 2 0.5) 0 0 0))") == "l"
+    # Values that are not DSL constants keep their expression.
+    assert (
+        to_test.canonicalize_program("(T c (M 1 0 (/ 1 3) 0))")
+        == "(T c (M 1 0 (/ 1 3) 0))"
+    )
+
+
+def test_canonicalize_program_flattens_connects():
+    assert to_test.canonicalize_program("(C l (C c r))") == "(C (C l c) r)"
+    assert to_test.canonicalize_program("(C empt (C l empt))") == "l"
+    assert (
+        to_test.canonicalize_program("(C r (C l c))", sort_connects=True)
+        == "(C (C c l) r)"
+    )
+
+
+def test_canonicalize_program_same_evaluation():
+    for program in TEST_PROGRAMS:
+        canonical_program = to_test.canonicalize_program(program)
+        assert_same_strokes(
+            Program.parse(program).evaluate([]),
+            Program.parse(canonical_program).evaluate([]),
+        )
+
+
+def test_program_content_hash():
+    assert to_test.program_content_hash(
+        "(C l (C c r))"
+    ) == to_test.program_content_hash("(C (C l c) r)")
+    assert to_test.program_content_hash(
+        "(C r (C l c))"
+    ) != to_test.program_content_hash("(C (C l c) r)")
+    assert to_test.program_content_hash(
+        "(C r (C l c))", sort_connects=True
+    ) == to_test.program_content_hash("(C (C l c) r)", sort_connects=True)
+    assert to_test.program_content_hash(
+        "(T c (M 1 0 (/ 1 3) 0))"
+    ) == to_test.program_content_hash("(T c (M 1 0 (/ 2 6) 0))")
+    assert to_test.program_content_hash(
+        Program.parse("(T l (M 1 0 (- 0 0.5) 0))")
+    ) == to_test.program_content_hash("(T l (M 1 0 -0.5 0))")
+
+
+def test_canonicalize_program_cache_bounded():
+    cache_info = to_test._canonicalize_program_string.cache_info()
+    assert cache_info.maxsize == to_test.CANONICAL_PROGRAM_CACHE_SIZE
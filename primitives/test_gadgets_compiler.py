@@ -0,0 +1,125 @@
+"""test_gadgets_compiler.py | Author : Catherine Wong"""
+
+import random
+import numpy as np
+from dreamcoder.program import Program
+import primitives.gadgets_compiler as to_test
+import primitives.gadgets_primitives as gadgets_primitives
+import primitives.object_primitives as object_primitives
+
+TEST_PROGRAMS = [
+    "(+ -8.875 (* 0.5 1.5))",
+    "(r_s 16 8)",
+    "(C empt l)",
+    "(repeat empt 3 (M 1 0 1 0))",
+    gadgets_primitives.cc_string[-1],
+    gadgets_primitives.hexagon_string[-1],
+    gadgets_primitives.nested_scaling_string(
+        gadgets_primitives.hexagon_string[-1], 3, 1.25
+    )[-1],
+    gadgets_primitives.rotation_string(gadgets_primitives._circle, "c", 6)[-1],
+    "(C (T (r_s 2 3) (M 1 (/ pi 4) 0.5 -1)) (repeat (T c (M 0.5 0 1 0)) 5 (M 1 (/ (* 2 pi) 5) 0 0)))",
+]
+
+
+def assert_same_value(value_1, value_2):
+    if isinstance(value_1, list):
+        assert len(value_1) == len(value_2)
+        for stroke_1, stroke_2 in zip(value_1, value_2):
+            assert np.array_equal(stroke_1, stroke_2)
+    else:
+        assert value_1 == value_2
+
+
+def test_evaluate_program_same_as_dreamcoder():
+    for program_string in TEST_PROGRAMS:
+        ground_truth = Program.parse(program_string).evaluate([])
+        assert_same_value(ground_truth, to_test.evaluate_program(program_string))
+        assert_same_value(
+            ground_truth, to_test.evaluate_program(Program.parse(program_string))
+        )
+
+
+def test_evaluate_program_random_transforms_same_as_dreamcoder():
+    # Compiled programs must evaluate to bitwise identical strokes, not just close ones.
+    rng = random.Random(0)
+    for _ in range(300):
+        matrix_string = "(M {} {} {} {})".format(
+            *[repr(rng.uniform(-4, 4)) for _ in range(4)]
+        )
+        shape_string = rng.choice(["c", "l", "(r_s 2 3)", "(C c l)"])
+        program_string = f"(T (repeat {shape_string} {rng.randint(1, 6)} {matrix_string}) {matrix_string})"
+        assert_same_value(
+            Program.parse(program_string).evaluate([]),
+            to_test.evaluate_program(program_string),
+        )
+
+
+def test_evaluate_program_uncompilable():
+    program_string = "(T l)"
+    try:
+        to_test.compile_program(program_string)
+        assert False
+    except to_test.UncompilableProgramError:
+        pass
+    assert to_test.evaluate_program(program_string).arguments[0] == (
+        Program.parse(program_string).evaluate([]).arguments[0]
+    )
+
+
+def test_compiled_program_shares_subexpressions():
+    program_string = "(C (T c (M 2 0 1 0)) (T c (M 2 0 1 0)))"
+    compiled_program = to_test.compile_program(program_string)
+    # One transform instruction and one connect instruction.
+    assert len(compiled_program.instructions) == 2
+
+
+def test_compiled_programs_share_subexpression_values():
+    to_test.SUBEXPRESSION_VALUE_CACHE.clear()
+    shared = "(T c (M 2 0 1 0))"
+    to_test.evaluate_programs([shared])
+    shared_value = to_test.SUBEXPRESSION_VALUE_CACHE.get(shared)
+    assert shared_value is not None
+    # A different program, compiled on its own, reuses the value instead of transforming c again.
+    compiled_program = to_test.compile_program(f"(C {shared} l)")
+    registers = compiled_program.evaluate_registers()
+    assert registers[compiled_program.outputs[0]][0] is shared_value[0]
+    assert_same_value(Program.parse(f"(C {shared} l)").evaluate([]), compiled_program())
+
+
+def test_render_parsed_program():
+    for program_string in TEST_PROGRAMS[2:]:
+        assert np.array_equal(
+            object_primitives.render_parsed_program(program_string),
+            to_test.render_parsed_program(program_string),
+        )
+
+
+def test_evaluate_programs():
+    test_programs = TEST_PROGRAMS + ["(T l)"] + TEST_PROGRAMS
+    for program_string, value in zip(
+        test_programs, to_test.evaluate_programs(test_programs)
+    ):
+        if program_string == "(T l)":
+            continue
+        assert_same_value(Program.parse(program_string).evaluate([]), value)
+
+
+def test_evaluate_programs_shares_subexpressions():
+    shared = gadgets_primitives.hexagon_string[-1]
+    test_programs = [f"(T {shared} (M {scale} 0 0 0))" for scale in [2, 3, 4]]
+    compiler = to_test.ProgramCompiler()
+    for program_string in test_programs:
+        compiler.add_program(program_string)
+    # The hexagon is evaluated once: one transform and one repeat, then one transform for each program.
+    assert len(compiler.build().instructions) == 2 + len(test_programs)
+
+
+def test_render_parsed_programs():
+    test_programs = TEST_PROGRAMS[2:]
+    for program_string, rendering in zip(
+        test_programs, to_test.render_parsed_programs(test_programs)
+    ):
+        assert np.array_equal(
+            object_primitives.render_parsed_program(program_string), rendering
+        )
@@ -1,5 +1,6 @@
 # Generates four technical drawing subdomains used in the CogSci 2022 dataset.
-python generate_drawing_tasks.py --tasks_generator nuts_bolts_programs --num_tasks_per_condition all --train_ratio 0.8 --task_summaries
-python generate_drawing_tasks.py --tasks_generator dials_programs --num_tasks_per_condition all --train_ratio 0.8 --task_summaries 
-python generate_drawing_tasks.py --tasks_generator wheels_programs --num_tasks_per_condition all --train_ratio 0.8 --task_summaries 
-python generate_drawing_tasks.py --tasks_generator furniture_programs --num_tasks_per_condition all --train_ratio 0.8 --task_summaries
\ No newline at end of file
+# This generates v2 of the dataset, such as data/summaries/nuts_bolts_programs_all_v2.csv. Its stimuli and train/test splits differ from the v1 dataset used in the paper, which is checked into data/.
+# Each subdomain is a job in one process, which shares its imports and caches across the jobs. The outputs are the same as running each subdomain on its own.
+python generate_drawing_tasks.py --tasks_generator nuts_bolts_programs dials_programs wheels_programs furniture_programs --num_tasks_per_condition all --train_ratio 0.8 --task_summaries
+# Or, generate all four subdomains concurrently in one invocation, as one curriculum with a condition for each subdomain.
+# python generate_drawing_tasks.py --tasks_generator gadgets_1k --num_tasks_per_condition all --train_ratio 0.8 --task_summaries --workers 4
\ No newline at end of file
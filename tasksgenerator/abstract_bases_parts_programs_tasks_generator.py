@@ -26,6 +26,7 @@ class AbstractBasesAndPartsProgramsTasksGenerator(AbstractTasksGenerator):
     def __init__(self):
         super().__init__(grammar=constants + some_none + objects + transformations)
 
+    @memoized_part("n_segment_base")
     def _generate_basic_n_segment_bases_string(
         self,
         primitives=[RECTANGLE],
@@ -37,7 +38,7 @@ class AbstractBasesAndPartsProgramsTasksGenerator(AbstractTasksGenerator):
     ):
         """See bases_parts_tasks_generator for initial implementation."""
         strokes, stroke_strings = [], []
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
         # For now, we do this in the most naive way possible. The looping structure is external to the
         # DreamCoder string program.
 
@@ -246,7 +247,7 @@ class AbstractBasesAndPartsProgramsTasksGenerator(AbstractTasksGenerator):
             return (
                 [[]],
                 "empt",
-                copy.deepcopy(SYNTHETIC_DICT),
+                SyntheticAbstractions(),
                 min_x,
                 max_x,
                 min_y,
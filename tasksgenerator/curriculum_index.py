@@ -0,0 +1,167 @@
+"""
+curriculum_index.py | Author : Catherine Wong.
+
+Defines the CurriculumIndex, a flat index over the tasks of a TaskCurriculum.
+
+Tasks are kept in a single array in curriculum order: by split, then condition, then curriculum block. Each curriculum block is then a slice of the array. The index maps each task export name to its position and each block to its slice, and memoizes the views over them.
+
+Task names are only unique within a split: the programs generators name the train and test tasks with the same index alike, such as nuts_bolts_000. The export name of a task is its name, unless a different task in the curriculum has the same name, in which case it is prefixed with the split that the task is first in (see get_task_export_name). Exported files are named by export name.
+
+The index serializes to a manifest with only the task export names and the block slices, so that tools can find and load the tasks of one block without loading the rest of the curriculum.
+"""
+from collections import defaultdict
+
+MANIFEST_TASKS = "tasks"
+MANIFEST_BLOCKS = "blocks"
+
+
+class CurriculumIndex:
+    """
+    CurriculumIndex: flat index over the tasks of a curriculum.
+    :tasks: array of tasks in curriculum order. For an index loaded from a manifest, these are the task export names.
+    :blocks: {split : {condition : {curriculum_block : (start, end)}}} slices of the tasks in each block.
+    """
+
+    def __init__(self, tasks, blocks):
+        self.tasks = tasks
+        self.blocks = blocks
+        self._export_names = self._get_export_names()
+        self._task_indices = {}
+        for task_idx, task in enumerate(tasks):
+            self._task_indices.setdefault(self.get_export_name(task), task_idx)
+        self._split_tasks = {}
+        self._generator_tasks = None
+        self._unique_tasks = None
+
+    def _get_export_names(self):
+        """:ret: {task key : export name}. Names shared by different tasks are prefixed with the split that each task is first in."""
+        task_splits = [None] * len(self.tasks)
+        for split, split_blocks in self.blocks.items():
+            for condition_blocks in split_blocks.values():
+                for start, end in condition_blocks.values():
+                    task_splits[start:end] = [split] * (end - start)
+        name_tasks, task_names = defaultdict(set), {}
+        for task, split in zip(self.tasks, task_splits):
+            task_key = _get_task_key(task)
+            if task_key not in task_names:
+                task_names[task_key] = (split, _get_task_name(task))
+                name_tasks[_get_task_name(task)].add(task_key)
+        return {
+            task_key: get_task_export_name(split, task_name)
+            if len(name_tasks[task_name]) > 1
+            else task_name
+            for task_key, (split, task_name) in task_names.items()
+        }
+
+    @classmethod
+    def from_curriculum(cls, curriculum):
+        """:curriculum: {split : {condition : {curriculum_block : [array of tasks]}}}, as returned by TaskCurriculum.get_curriculum."""
+        tasks, blocks = [], {}
+        for split in curriculum:
+            for condition, condition_blocks in curriculum[split].items():
+                for curriculum_block, block_tasks in condition_blocks.items():
+                    start = len(tasks)
+                    tasks += block_tasks
+                    blocks.setdefault(split, {}).setdefault(condition, {})[
+                        curriculum_block
+                    ] = (start, len(tasks))
+        return cls(tasks, blocks)
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        """:ret: an index over the task export names of a manifest from get_manifest."""
+        blocks = {
+            split: {
+                condition: {
+                    curriculum_block: tuple(block_slice)
+                    for curriculum_block, block_slice in condition_blocks.items()
+                }
+                for condition, condition_blocks in split_blocks.items()
+            }
+            for split, split_blocks in manifest[MANIFEST_BLOCKS].items()
+        }
+        return cls(list(manifest[MANIFEST_TASKS]), blocks)
+
+    def get_manifest(self):
+        """:ret: JSON serializable manifest with the task export names in curriculum order and the slice of each block."""
+        blocks = {
+            split: {
+                condition: {
+                    curriculum_block: list(block_slice)
+                    for curriculum_block, block_slice in condition_blocks.items()
+                }
+                for condition, condition_blocks in split_blocks.items()
+            }
+            for split, split_blocks in self.blocks.items()
+        }
+        return {
+            MANIFEST_TASKS: [self.get_export_name(task) for task in self.tasks],
+            MANIFEST_BLOCKS: blocks,
+        }
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __contains__(self, export_name):
+        return export_name in self._task_indices
+
+    def get_export_name(self, task):
+        """:ret: the name that the task is exported under, unique within the curriculum."""
+        return self._export_names[_get_task_key(task)]
+
+    def get_task_index(self, export_name):
+        """:ret: position of the first task with this export name."""
+        return self._task_indices[export_name]
+
+    def get_task(self, export_name):
+        return self.tasks[self._task_indices[export_name]]
+
+    def get_block(self, split, condition, curriculum_block):
+        """:ret: the tasks of a curriculum block. Condition and curriculum_block are the keys in the curriculum, with their prefixes."""
+        start, end = self.blocks[split][condition][curriculum_block]
+        return self.tasks[start:end]
+
+    def get_split(self, split):
+        """:ret: the tasks of every block in a split, in curriculum order."""
+        if split not in self._split_tasks:
+            self._split_tasks[split] = [
+                task
+                for condition in self.blocks.get(split, {})
+                for curriculum_block in self.blocks[split][condition]
+                for task in self.get_block(split, condition, curriculum_block)
+            ]
+        return self._split_tasks[split]
+
+    def get_generator_tasks(self, task_generator_name):
+        """:ret: the unique tasks with this task_generator_name, in curriculum order."""
+        if self._generator_tasks is None:
+            self._generator_tasks = defaultdict(list)
+            for task in self.get_unique_tasks():
+                self._generator_tasks[task.task_generator_name].append(task)
+        return self._generator_tasks.get(task_generator_name, [])
+
+    def get_unique_tasks(self):
+        """:ret: each task once, in the order that it first appears in the curriculum."""
+        if self._unique_tasks is None:
+            seen = set()
+            self._unique_tasks = []
+            for task in self.tasks:
+                task_key = _get_task_key(task)
+                if task_key not in seen:
+                    seen.add(task_key)
+                    self._unique_tasks.append(task)
+        return self._unique_tasks
+
+
+def get_task_export_name(split, task_name):
+    """:ret: export name for a task whose name is shared by a different task in the curriculum."""
+    return f"{split}_{task_name}"
+
+
+def _get_task_name(task):
+    return task if isinstance(task, str) else task.name
+
+
+def _get_task_key(task):
+    """:ret: key that identifies a task. Tasks loaded from a manifest are their export names."""
+    return task if isinstance(task, str) else id(task)
@@ -6,6 +6,7 @@ Threads program string generating logic through the generation.
 """
 import math, random, itertools, copy
 from primitives.gadgets_primitives import *
+import primitives.gadgets_compiler as gadgets_compiler
 from dreamcoder.grammar import Grammar
 from primitives.object_primitives import rectangle
 from tasksgenerator.dial_tasks_generator import (
@@ -18,6 +19,14 @@ from tasksgenerator.bases_parts_tasks_generator import *
 
 from tasksgenerator.s12_s13_tasks_generator import RANDOM_SEED
 
+# Sub-families and shapes named in the stimuli descriptors.
+ANTENNA_BASES, DIALS = "antenna_bases", "dials"
+ANTENNA_PARTS, DIALS_PARTS = "antenna_parts", "dials_parts"
+DIALS_SHAPES = {"c": c_string, "r": r_string}
+ANTENNA_END_SHAPES = (None, "c", "r")
+MAX_BASE_COLUMNS_FOR_ANTENNA = 3
+ANTENNA_GENERATION_PROBABILITY = 0.25
+
 
 @TasksGeneratorRegistry.register
 class DialProgramsTasksGenerator(AbstractTasksGenerator):
@@ -28,6 +37,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
             grammar=constants + math_operations + objects + transformations
         )
 
+    @memoized_part("base_with_dials")
     def _generate_base_with_dials(
         self,
         n_dials,
@@ -48,7 +58,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
         no_base=False,
     ):
         strokes, stroke_strings = [], []
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
         if not no_base:
             (
                 base,
@@ -68,8 +78,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
             stroke_strings.append(base_string)
 
             # Add the base to the synthetic dict.
-            for k in base_synthetic_dict:
-                synthetic_dict[k] += base_synthetic_dict[k]
+            synthetic_dict.merge(base_synthetic_dict)
 
         if n_dials > 0:
             # Generate the base dial.
@@ -100,8 +109,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
             )
 
             # Add the row of dials to the synthetic dict
-            for k in row_dials_dict:
-                synthetic_dict[k] += row_dials_dict[k]
+            synthetic_dict.merge(row_dials_dict)
 
             # Offset them with respect to the base.
             y_offset = f"(- 0 (* 0.5 (* (- {n_dial_rows} 1) {spacing})))"
@@ -143,6 +151,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
 
         _, y_shift = M_string(y=f"{x_spacing}")
         row_of_dials_string = f"(repeat {dial_shape_string} {n_dials} {x_shift})"
+        dial_synthetic_dict = dial_synthetic_dict.copy()
         row_of_rows_string = f"(repeat {row_of_dials_string} {n_dial_rows} {y_shift})"
 
         # Add a low-level abstraction for each dial.
@@ -171,6 +180,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
 
         return peval(row_of_rows_string), row_of_rows_string, dial_synthetic_dict
 
+    @memoized_part("dial")
     def _generate_nested_circle_dials_string(
         self,
         n_circles=str(1),
@@ -192,7 +202,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
             [],
         )
 
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
 
         if circle_size != STR_ZERO and not shape_specification:
             # Draw nested circles.
@@ -273,6 +283,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
 
         return [strokes], object_string, synthetic_dict
 
+    @memoized_part("dial_base")
     def _generate_bases_string(
         self,
         base_columns=str(3),
@@ -292,7 +303,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
         """
         strokes, stroke_strings = [], []
 
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
 
         margins = f"(* 4 {tier_scaling})"
         total_base_height = "0"
@@ -401,6 +412,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
             synthetic_dict,
         )
 
+    @memoized_part("antenna")
     def _generate_stacked_antenna_strings(
         self, n_wires=str(3), antenna_size=str(SMALL), scale_wires=True, end_shape=None
     ):
@@ -409,7 +421,7 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
         """
         strokes, stroke_strings = [], []
 
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
 
         antenna_base_height = "3"
         long_vl_string = T_string(
@@ -503,6 +515,38 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
 
         return [strokes], strokes_string, synthetic_dict
 
+    def _sample_antenna_choices(
+        self, generation_probability, antenna_generation_probability, n_antenna
+    ):
+        """
+        Sampling pass for _add_antenna_to_stimuli: draws from the random stream exactly as the original interleaved implementation did, but without building any strokes.
+        :ret: None if no antenna should be added, or a list of (add_antenna, add_double_antenna, add_side_antenna) draws for each antenna.
+        """
+        if random.uniform(0, 1) > generation_probability:
+            return None
+        generation_probability *= antenna_generation_probability
+        return [
+            tuple(random.uniform(0, 1) < generation_probability for _ in range(3))
+            for _ in range(n_antenna)
+        ]
+
+    def _n_antenna(self, antenna_end_shapes):
+        """:ret: the number of antenna enumerated by _add_antenna_to_stimuli."""
+        return 3 * 2 * len(antenna_end_shapes)
+
+    def _antenna_choices_add_stimuli(
+        self, antenna_choices, add_double_antenna=False, add_side_antenna=False
+    ):
+        """:ret: whether building the antenna with these choices could add any stimuli. Does not check the size of the base for double antenna."""
+        if antenna_choices is None:
+            return False
+        return any(
+            add_antenna
+            or (add_double and add_double_antenna)
+            or (add_side and add_side_antenna)
+            for (add_antenna, add_double, add_side) in antenna_choices
+        )
+
     def _add_antenna_to_stimuli(
         self,
         stimuli,
@@ -516,10 +560,38 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
         antenna_generation_probability=0.25,
         stimuli_synthetic_dict=None,
     ):
-        if random.uniform(0, 1) > generation_probability:
+        antenna_choices = self._sample_antenna_choices(
+            generation_probability,
+            antenna_generation_probability,
+            self._n_antenna(antenna_end_shapes),
+        )
+        if antenna_choices is None:
             return None
-        generation_probability *= antenna_generation_probability
+        return self._build_antenna_stimuli(
+            stimuli,
+            stimuli_string,
+            base_width,
+            base_height,
+            antenna_choices,
+            antenna_end_shapes=antenna_end_shapes,
+            add_double_antenna=add_double_antenna,
+            add_side_antenna=add_side_antenna,
+            stimuli_synthetic_dict=stimuli_synthetic_dict,
+        )
 
+    def _build_antenna_stimuli(
+        self,
+        stimuli,
+        stimuli_string,
+        base_width,
+        base_height,
+        antenna_choices,
+        antenna_end_shapes=[None, c_string, r_string],
+        add_double_antenna=False,
+        add_side_antenna=False,
+        stimuli_synthetic_dict=None,
+    ):
+        """Build pass for _add_antenna_to_stimuli. Adds antenna to the stimuli according to draws from _sample_antenna_choices."""
         strokes, stroke_strings, synthetic_dicts = [], [], []
         antenna_strokes, antenna_strings, antenna_synthetic_dicts = [], [], []
         for n_wires in ["1", "2", "3"]:
@@ -549,24 +621,28 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
             sideways_antenna_strings.append(stroke_string)
             sideways_antenna_dicts.append(stroke_dict)
 
-        for base_antenna_primitive, base_antenna_string, base_antenna_dict in zip(
-            antenna_strokes, antenna_strings, antenna_synthetic_dicts
+        for (
+            (base_antenna_primitive, base_antenna_string, base_antenna_dict),
+            (add_antenna, add_double, add_side),
+        ) in zip(
+            zip(antenna_strokes, antenna_strings, antenna_synthetic_dicts),
+            antenna_choices,
         ):
+            if not (add_antenna or add_double or add_side):
+                continue
             y_shift = f"(+ {LARGE} {base_height})"
             antenna_primitive, antenna_primitive_string = T_string(
                 base_antenna_primitive, base_antenna_string, y=y_shift
             )
-            if random.uniform(0, 1) < generation_probability:
+            if add_antenna:
                 strokes.append(stimuli + antenna_primitive)
                 stroke_strings.append(
                     connect_strokes([stimuli_string, antenna_primitive_string])
                 )
-                new_base_dict = copy.deepcopy(stimuli_synthetic_dict)
-                for k in new_base_dict:
-                    new_base_dict[k] += base_antenna_dict[k]
+                new_base_dict = stimuli_synthetic_dict.copy().merge(base_antenna_dict)
                 synthetic_dicts.append(new_base_dict)
 
-            if random.uniform(0, 1) < generation_probability:
+            if add_double:
                 if peval(base_width) > peval(base_height) and add_double_antenna:
                     x_shift = f"(* {base_width} 0.25)"
                     finial_right = T_string(
@@ -587,13 +663,14 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
                             [stimuli_string, finial_right[-1], finial_left[-1]]
                         )
                     )
-                    new_base_dict = copy.deepcopy(stimuli_synthetic_dict)
-                    for k in new_base_dict:
-                        new_base_dict[k] += base_antenna_dict[k]
-                        new_base_dict[k] += base_antenna_dict[k]
+                    new_base_dict = (
+                        stimuli_synthetic_dict.copy()
+                        .merge(base_antenna_dict)
+                        .merge(base_antenna_dict)
+                    )
                     synthetic_dicts.append(new_base_dict)
 
-            if random.uniform(0, 1) < generation_probability:
+            if add_side:
                 if add_side_antenna:
                     for (
                         base_sideways,
@@ -626,46 +703,36 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
                                 ]
                             )
                         )
-                        new_base_dict = copy.deepcopy(stimuli_synthetic_dict)
+                        new_base_dict = stimuli_synthetic_dict.copy()
                         for k in new_base_dict:
                             if "params" not in k:
-                                new_base_dict[k] += base_antenna_dict[k] + ["rotate"]
+                                new_base_dict.merge(base_antenna_dict, levels=[k])
+                                new_base_dict.append(k, "rotate")
                         synthetic_dicts.append(new_base_dict)
 
         if len(strokes) < 1:
             return None
         return strokes, stroke_strings, synthetic_dicts
 
-    def _generate_parts_strings_for_stimuli(
+    def _generate_parts_descriptors(
         self,
         max_dials=5,
-        train_ratio=1.0,
         spacing=f"(+ {LARGE} {SCALE_UNIT})",
         generation_probability=0.2,
     ):
-        """
-        Generator function for drawing the individual parts in the domain.
-        See dials_task_generator.generate_parts_stimuli for original implementation.
-        """
-        strokes, stroke_strings, stroke_dicts = [], [], []
-
-        # Generate antenna.
-        antenna_end_shapes = [None, c_string, r_string]
+        """Yields descriptors for the individual parts in the domain: antenna, then dials without bases."""
         for n_wires in ["1", "2", "3"]:
             for scale_wires in [True, False]:
-                for end_shape in antenna_end_shapes:
-                    (
-                        antenna_stimuli,
-                        antenna_string,
-                        antenna_dict,
-                    ) = self._generate_stacked_antenna_strings(
-                        n_wires=n_wires, scale_wires=scale_wires, end_shape=end_shape
+                for end_shape in ANTENNA_END_SHAPES:
+                    yield (
+                        ANTENNA_PARTS,
+                        (
+                            ("n_wires", n_wires),
+                            ("scale_wires", scale_wires),
+                            ("end_shape", end_shape),
+                        ),
                     )
-                    strokes += antenna_stimuli
-                    stroke_strings.append(antenna_string)
-                    stroke_dicts.append(antenna_dict)
 
-        # Generate dials.
         for total_dials in [1, max_dials + 1]:
             # Varying bases for the single small dials.
             for base_columns in [1, max_dials + 1]:
@@ -686,76 +753,74 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
                             for dial_angle in [STR_VERTICAL, STR_RIGHT]:
                                 for shape_specification in [
                                     None,
-                                    [c_string, r_string],
-                                    [c_string, c_string],
+                                    ("c", "r"),
+                                    ("c", "c"),
                                 ]:
                                     if (
                                         dial_size == LARGE
                                         and dial_angle == STR_VERTICAL
                                     ):
                                         continue
-
-                                    (
-                                        stimuli,
-                                        stimuli_string,
-                                        total_base_width,
-                                        total_base_height,
-                                        stimuli_dict,
-                                    ) = self._generate_base_with_dials(
-                                        max_dials=total_dials,
-                                        n_dials=total_dials,
-                                        n_circles=1,
-                                        dial_size=str(dial_size),
-                                        circle_size=str(dial_size),
-                                        dial_angle=dial_angle,
-                                        base_columns=str(base_columns),
-                                        base_height=str(base_height),
-                                        centered=centered,
-                                        n_dial_rows=rows,
-                                        n_base_tiers=STR_ZERO,
-                                        spacing=spacing,
-                                        base_end_filials=False,
-                                        shape_specification=shape_specification,
-                                        no_base=True,
+                                    yield (
+                                        DIALS_PARTS,
+                                        (
+                                            ("total_dials", total_dials),
+                                            ("base_columns", base_columns),
+                                            ("base_height", base_height),
+                                            ("centered", centered),
+                                            ("rows", rows),
+                                            ("dial_size", dial_size),
+                                            ("dial_angle", dial_angle),
+                                            (
+                                                "shape_specification",
+                                                shape_specification,
+                                            ),
+                                            ("spacing", spacing),
+                                            (
+                                                "generation_probability",
+                                                generation_probability,
+                                            ),
+                                        ),
                                     )
-                                    if total_dials > 1 or rows > 1:
-                                        if (
-                                            random.uniform(0, 1)
-                                            > generation_probability
-                                        ):
-                                            continue
-
-                                    strokes.append(stimuli)
-                                    stroke_strings.append(stimuli_string)
-                                    stroke_dicts.append(stimuli_dict)
-
-        # Randomly sample them.
-        return random_sample_ratio_ordered_array(
-            strokes, train_ratio, strings_array=list(zip(stroke_strings, stroke_dicts))
-        )
 
-    def _generate_strokes_strings_for_stimuli(
+    def _generate_parts_strings_for_stimuli(
         self,
-        train_ratio=1.0,
         max_dials=5,
+        train_ratio=1.0,
         spacing=f"(+ {LARGE} {SCALE_UNIT})",
-        generation_probability=0.14,  # Probabilistically generate from space
+        generation_probability=0.2,
     ):
         """
-        Main generator function. Returns strokes and strings for stimuli.
-
-        See dials_task_generator.generate_strokes_for_stimuli for original implementation.
+        Generator function for drawing the individual parts in the domain.
+        See dials_task_generator.generate_parts_stimuli for original implementation.
         """
-        strokes, stroke_strings, stroke_dicts = [], [], []
-
-        MAX_BASE_COLUMNS_FOR_ANTENNA = 3
+        return self._build_stimuli_from_descriptors(
+            self._generate_parts_descriptors(
+                max_dials=max_dials,
+                spacing=spacing,
+                generation_probability=generation_probability,
+            ),
+            train_ratio,
+        )
 
-        # Loop over the full cross product of dials / antenna / stimuli / tiers
+    def _generate_dials_descriptors(
+        self,
+        max_dials=5,
+        spacing=f"(+ {LARGE} {SCALE_UNIT})",
+        generation_probability=0.14,
+        shuffle=False,
+    ):
+        """
+        Yields descriptors for the full cross product of dials / antenna / stimuli / tiers: blank bases with antenna, and bases with dials that may also have antenna.
+        If shuffle, shuffles the numbers of dials and columns with the global random state as the original implementation did, so that sampling the descriptors in order makes the same draws. Otherwise, yields them in canonical order without drawing.
+        """
         total_dials_range = list(range(1, max_dials + 1))
-        random.shuffle(total_dials_range)
+        if shuffle:
+            random.shuffle(total_dials_range)
         for total_dials in total_dials_range:
             total_columns_range = list(range(1, max_dials + 1, 2))
-            random.shuffle(total_columns_range)
+            if shuffle:
+                random.shuffle(total_columns_range)
 
             # Varying bases for the single small dials.
             for base_columns in total_columns_range:
@@ -775,13 +840,14 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
                                 if base_columns < total_dials:
                                     continue
 
-                                centered = total_dials % 2 != 0
-
-                                add_side_antenna = (
-                                    base_columns < MAX_BASE_COLUMNS_FOR_ANTENNA
-                                )
-                                add_double_antenna = (
-                                    base_columns > MAX_BASE_COLUMNS_FOR_ANTENNA
+                                base_parameters = (
+                                    ("total_dials", total_dials),
+                                    ("base_columns", base_columns),
+                                    ("base_height", base_height),
+                                    ("centered", total_dials % 2 != 0),
+                                    ("rows", rows),
+                                    ("tiers", tiers),
+                                    ("base_end_filials", base_end_filials),
                                 )
 
                                 # Blank bases with antenna.
@@ -791,116 +857,226 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
                                     and tiers == 1
                                     and total_dials == 1
                                 ):
-                                    (
-                                        stimuli,
-                                        stimuli_string,
-                                        total_base_width,
-                                        total_base_height,
-                                        stimuli_dict,
-                                    ) = self._generate_base_with_dials(
-                                        n_dials=0,
-                                        n_circles=1,
-                                        dial_size=STR_ZERO,
-                                        circle_size=STR_ZERO,
-                                        dial_angle=STR_ZERO,
-                                        base_columns=base_columns,
-                                        base_height=base_height,
-                                        centered=centered,
-                                        n_dial_rows=rows,
-                                    )
-                                    antenna_stimuli = self._add_antenna_to_stimuli(
-                                        stimuli,
-                                        stimuli_string,
-                                        base_width=total_base_width,
-                                        base_height=total_base_height,
-                                        generation_probability=1.0,
-                                        antenna_generation_probability=0.5,
-                                        stimuli_synthetic_dict=stimuli_dict,
-                                    )
-                                    if antenna_stimuli is not None:
-                                        (
-                                            stim_strokes,
-                                            stim_strings,
-                                            stim_dicts,
-                                        ) = antenna_stimuli
-
-                                        strokes += stim_strokes
-                                        stroke_strings += stim_strings
-                                        stroke_dicts += stim_dicts
+                                    yield (ANTENNA_BASES, base_parameters)
 
                                 # Small and large dials with the lever sticking out.
                                 for dial_size in [SMALL, LARGE]:
                                     for dial_angle in [STR_VERTICAL, STR_RIGHT]:
                                         for shape_specification in [
                                             None,
-                                            [c_string, r_string],
-                                            [c_string, c_string],
+                                            ("c", "r"),
+                                            ("c", "c"),
                                         ]:
                                             if (
                                                 dial_size == LARGE
                                                 and dial_angle == STR_VERTICAL
                                             ):
                                                 continue
-
-                                            (
-                                                stimuli,
-                                                stimuli_string,
-                                                total_base_width,
-                                                total_base_height,
-                                                stimuli_dict,
-                                            ) = self._generate_base_with_dials(
-                                                max_dials=total_dials,
-                                                n_dials=total_dials,
-                                                n_circles=1,
-                                                dial_size=str(dial_size),
-                                                circle_size=str(dial_size),
-                                                dial_angle=dial_angle,
-                                                base_columns=str(base_columns),
-                                                base_height=str(base_height),
-                                                centered=centered,
-                                                n_dial_rows=rows,
-                                                n_base_tiers=tiers,
-                                                spacing=spacing,
-                                                base_end_filials=base_end_filials,
-                                                shape_specification=shape_specification,
+                                            yield (
+                                                DIALS,
+                                                base_parameters
+                                                + (
+                                                    ("dial_size", dial_size),
+                                                    ("dial_angle", dial_angle),
+                                                    (
+                                                        "shape_specification",
+                                                        shape_specification,
+                                                    ),
+                                                    ("spacing", spacing),
+                                                    (
+                                                        "generation_probability",
+                                                        generation_probability,
+                                                    ),
+                                                ),
                                             )
-                                            if (
-                                                random.uniform(0, 1)
-                                                < generation_probability
-                                            ):
-                                                strokes.append(stimuli)
-                                                stroke_strings.append(stimuli_string)
-                                                stroke_dicts.append(stimuli_dict)
 
-                                            add_side_antenna = (
-                                                base_columns
-                                                < MAX_BASE_COLUMNS_FOR_ANTENNA
-                                            )
-                                            add_double_antenna = (
-                                                base_columns
-                                                > MAX_BASE_COLUMNS_FOR_ANTENNA
-                                            )
+    def _generate_stimuli_descriptors(self):
+        yield from self._generate_dials_descriptors()
+        yield from self._generate_parts_descriptors()
 
-                                            antenna_stimuli = self._add_antenna_to_stimuli(
-                                                stimuli,
-                                                stimuli_string,
-                                                base_width=total_base_width,
-                                                base_height=total_base_height,
-                                                add_double_antenna=add_double_antenna,
-                                                add_side_antenna=add_side_antenna,
-                                                generation_probability=generation_probability,
-                                                stimuli_synthetic_dict=stimuli_dict,
-                                            )
-                                            if antenna_stimuli is not None:
-                                                (
-                                                    stim_strokes,
-                                                    stim_strings,
-                                                    stim_dicts,
-                                                ) = antenna_stimuli
+    def _get_shape_specification(self, shape_specification):
+        """:ret: the shapes named in a descriptor's shape specification, or None."""
+        if shape_specification is None:
+            return None
+        return [DIALS_SHAPES[shape] for shape in shape_specification]
+
+    def _sample_stimuli(self, descriptor):
+        """Draws whether to generate a descriptor, and which antenna to add to bases. Samples before building, so bases are only built if they or any of their antenna are kept.
+        :ret: None if no stimuli are generated, () for parts, or (add_stimuli, antenna_choices) for bases, where antenna_choices is None if no antenna are added."""
+        sub_family, parameters = descriptor
+        parameters = dict(parameters)
+        if sub_family == ANTENNA_PARTS:
+            return ()
+        if sub_family == DIALS_PARTS:
+            if parameters["total_dials"] > 1 or parameters["rows"] > 1:
+                if random.uniform(0, 1) > parameters["generation_probability"]:
+                    return None
+            return ()
+        n_antenna = self._n_antenna(ANTENNA_END_SHAPES)
+        if sub_family == ANTENNA_BASES:
+            antenna_choices = self._sample_antenna_choices(
+                generation_probability=1.0,
+                antenna_generation_probability=0.5,
+                n_antenna=n_antenna,
+            )
+            if not self._antenna_choices_add_stimuli(antenna_choices):
+                return None
+            return False, antenna_choices
+
+        generation_probability = parameters["generation_probability"]
+        add_stimuli = random.uniform(0, 1) < generation_probability
+        antenna_choices = self._sample_antenna_choices(
+            generation_probability=generation_probability,
+            antenna_generation_probability=ANTENNA_GENERATION_PROBABILITY,
+            n_antenna=n_antenna,
+        )
+        base_columns = parameters["base_columns"]
+        add_antenna = self._antenna_choices_add_stimuli(
+            antenna_choices,
+            add_double_antenna=base_columns > MAX_BASE_COLUMNS_FOR_ANTENNA,
+            add_side_antenna=base_columns < MAX_BASE_COLUMNS_FOR_ANTENNA,
+        )
+        if not (add_stimuli or add_antenna):
+            return None
+        return add_stimuli, antenna_choices if add_antenna else None
+
+    def _build_stimuli(self, descriptor, sample):
+        """Builds the stimuli for a descriptor and its draws from _sample_stimuli. :ret: [(strokes, program string, SyntheticAbstractions)]."""
+        sub_family, parameters = descriptor
+        parameters = dict(parameters)
+        if sub_family == ANTENNA_PARTS:
+            (
+                antenna_stimuli,
+                antenna_string,
+                antenna_dict,
+            ) = self._generate_stacked_antenna_strings(
+                n_wires=parameters["n_wires"],
+                scale_wires=parameters["scale_wires"],
+                end_shape=DIALS_SHAPES.get(parameters["end_shape"]),
+            )
+            return [(antenna_stimuli[0], antenna_string, antenna_dict)]
+        if sub_family == DIALS_PARTS:
+            (
+                stimuli,
+                stimuli_string,
+                total_base_width,
+                total_base_height,
+                stimuli_dict,
+            ) = self._generate_base_with_dials(
+                max_dials=parameters["total_dials"],
+                n_dials=parameters["total_dials"],
+                n_circles=1,
+                dial_size=str(parameters["dial_size"]),
+                circle_size=str(parameters["dial_size"]),
+                dial_angle=parameters["dial_angle"],
+                base_columns=str(parameters["base_columns"]),
+                base_height=str(parameters["base_height"]),
+                centered=parameters["centered"],
+                n_dial_rows=parameters["rows"],
+                n_base_tiers=STR_ZERO,
+                spacing=parameters["spacing"],
+                base_end_filials=False,
+                shape_specification=self._get_shape_specification(
+                    parameters["shape_specification"]
+                ),
+                no_base=True,
+            )
+            return [(stimuli, stimuli_string, stimuli_dict)]
+
+        add_stimuli, antenna_choices = sample
+        add_side_antenna, add_double_antenna = False, False
+        if sub_family == ANTENNA_BASES:
+            (
+                stimuli,
+                stimuli_string,
+                total_base_width,
+                total_base_height,
+                stimuli_dict,
+            ) = self._generate_base_with_dials(
+                n_dials=0,
+                n_circles=1,
+                dial_size=STR_ZERO,
+                circle_size=STR_ZERO,
+                dial_angle=STR_ZERO,
+                base_columns=parameters["base_columns"],
+                base_height=parameters["base_height"],
+                centered=parameters["centered"],
+                n_dial_rows=parameters["rows"],
+            )
+        else:
+            add_side_antenna = parameters["base_columns"] < MAX_BASE_COLUMNS_FOR_ANTENNA
+            add_double_antenna = (
+                parameters["base_columns"] > MAX_BASE_COLUMNS_FOR_ANTENNA
+            )
+            (
+                stimuli,
+                stimuli_string,
+                total_base_width,
+                total_base_height,
+                stimuli_dict,
+            ) = self._generate_base_with_dials(
+                max_dials=parameters["total_dials"],
+                n_dials=parameters["total_dials"],
+                n_circles=1,
+                dial_size=str(parameters["dial_size"]),
+                circle_size=str(parameters["dial_size"]),
+                dial_angle=parameters["dial_angle"],
+                base_columns=str(parameters["base_columns"]),
+                base_height=str(parameters["base_height"]),
+                centered=parameters["centered"],
+                n_dial_rows=parameters["rows"],
+                n_base_tiers=parameters["tiers"],
+                spacing=parameters["spacing"],
+                base_end_filials=parameters["base_end_filials"],
+                shape_specification=self._get_shape_specification(
+                    parameters["shape_specification"]
+                ),
+            )
+
+        built_stimuli = []
+        if add_stimuli:
+            built_stimuli.append((stimuli, stimuli_string, stimuli_dict))
+        if antenna_choices is not None:
+            antenna_stimuli = self._build_antenna_stimuli(
+                stimuli,
+                stimuli_string,
+                base_width=total_base_width,
+                base_height=total_base_height,
+                antenna_choices=antenna_choices,
+                antenna_end_shapes=[
+                    DIALS_SHAPES.get(end_shape) for end_shape in ANTENNA_END_SHAPES
+                ],
+                add_double_antenna=add_double_antenna,
+                add_side_antenna=add_side_antenna,
+                stimuli_synthetic_dict=stimuli_dict,
+            )
+            if antenna_stimuli is not None:
+                built_stimuli += list(zip(*antenna_stimuli))
+        return built_stimuli
+
+    def _generate_strokes_strings_for_stimuli(
+        self,
+        train_ratio=1.0,
+        max_dials=5,
+        spacing=f"(+ {LARGE} {SCALE_UNIT})",
+        generation_probability=0.14,  # Probabilistically generate from space
+    ):
+        """
+        Main generator function. Returns strokes and strings for stimuli.
+        Samples every base before building any of them, and builds them before the parts are sampled, so that the draws are the same as in the original implementation.
 
-                                                strokes += stim_strokes
-                                                stroke_strings += stim_strings
-                                                stroke_dicts += stim_dicts
+        See dials_task_generator.generate_strokes_for_stimuli for original implementation.
+        """
+        strokes, strings_array = self._build_sampled_descriptors(
+            self._sample_descriptors(
+                self._generate_dials_descriptors(
+                    max_dials=max_dials,
+                    spacing=spacing,
+                    generation_probability=generation_probability,
+                    shuffle=True,
+                )
+            )
+        )
 
         (
             train_parts,
@@ -914,8 +1090,8 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
             test_main,
             train_main_strings,
             test_main_strings,
-        ) = random_sample_ratio_ordered_array(
-            strokes, train_ratio, strings_array=list(zip(stroke_strings, stroke_dicts))
+        ) = self._split_stimuli_strings(
+            strokes, train_ratio, strings_array=strings_array
         )
 
         return (
@@ -933,16 +1109,15 @@ class DialProgramsTasksGenerator(AbstractTasksGenerator):
         max_test=50,
     ):
         # Currently generates all tasks as single entities. Does not generate a curriculum.
-        train_tasks, test_tasks = self._generate_drawing_tasks_from_strokes(
+        return self._generate_drawing_tasks_from_strokes(
             num_tasks_to_generate_per_condition,
             request_type=object_primitives.tstroke,
-            render_parsed_program_fn=object_primitives.render_parsed_program,
+            render_parsed_program_fn=gadgets_compiler.render_parsed_program,
             task_generator_name=self.name,
             train_ratio=train_ratio,
+            max_train=max_train,
+            max_test=max_test,
         )
-        max_train = len(train_tasks) if max_train == None else max_train
-        max_test = len(test_tasks) if max_test == None else max_test
-        return train_tasks[:max_train], test_tasks[:max_test]
 
     def generate_tasks_curriculum(
         self, num_tasks_to_generate_per_condition, train_ratio=0.8
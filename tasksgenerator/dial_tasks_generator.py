@@ -703,16 +703,15 @@ class DialsTasksGenerator(SimpleDialTasksGenerator):
         max_test=50,
     ):
         # Currently generates all tasks as single entities. Does not generate a curriculum.
-        train_tasks, test_tasks = self._generate_drawing_tasks_from_strokes(
+        return self._generate_drawing_tasks_from_strokes(
             num_tasks_to_generate_per_condition,
             request_type=object_primitives.tstroke,
             render_strokes_fn=object_primitives.render_stroke_arrays_to_canvas,
             task_generator_name=self.name,
             train_ratio=train_ratio,
+            max_train=max_train,
+            max_test=max_test,
         )
-        max_train = len(train_tasks) if max_train == None else max_train
-        max_test = len(test_tasks) if max_test == None else max_test
-        return train_tasks[:max_train], test_tasks[:max_test]
 
     def generate_tasks_curriculum(
         self, num_tasks_to_generate_per_condition, train_ratio=0.8
@@ -0,0 +1,142 @@
+"""
+export_pipeline.py | Author : Catherine Wong.
+
+Defines the ExportPipeline, which runs the export stages for a curriculum concurrently over a single walk of its tasks.
+
+The tasks are walked once in the main thread, which prepares each task (eg. renders it) and puts it on a bounded queue for each stage. Each stage runs in its own worker threads, so a slow stage only holds back the walk once its queue is full, and the export takes about as long as its slowest stage. Stages can be:
+    task stages, which call a function on each task, in one or more worker threads.
+    stream stages, which call a function once on an iterator over all of the tasks, in order, in one thread.
+    jobs, which call a function once, in their own thread, and are not part of the walk. A job that uses the tasks walks them itself, concurrently with the stages, so it must not change anything that the stages read.
+
+The pipeline records the CPU time of the threads of each stage, so that the time that a stage waits for tasks or for other threads is not counted.
+"""
+import time
+import queue
+import threading
+
+DEFAULT_QUEUE_SIZE = 64
+PREPARE_STAGE = "prepare"
+TOTAL_TIME = "total"
+
+_END_OF_TASKS = object()
+
+
+class ExportPipeline:
+    """
+    ExportPipeline: concurrent export stages over one walk of the tasks.
+    :queue_size: maximum number of tasks waiting for each stage.
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._stages = []
+        self._jobs = []
+        self.timings = {}
+        self._timings_lock = threading.Lock()
+
+    def add_task_stage(self, name, task_fn, num_workers=1):
+        """Adds a stage that calls task_fn(task) on each task in num_workers threads."""
+        self._stages.append((name, task_fn, max(1, num_workers), False))
+
+    def add_stream_stage(self, name, stream_fn):
+        """Adds a stage that calls stream_fn(tasks) once, with an iterator over the tasks in order."""
+        self._stages.append((name, stream_fn, 1, True))
+
+    def add_job(self, name, job_fn):
+        """Adds a job that calls job_fn() once, alongside the stages."""
+        self._jobs.append((name, job_fn))
+
+    def _add_time(self, name, seconds):
+        with self._timings_lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def _run_task_worker(self, name, task_fn, task_queue, errors):
+        while True:
+            task = task_queue.get()
+            if task is _END_OF_TASKS:
+                return
+            if errors:
+                # Keep draining the queue so that the walk is not blocked.
+                continue
+            start = time.thread_time()
+            try:
+                task_fn(task)
+            except BaseException as e:
+                errors.append(e)
+            self._add_time(name, time.thread_time() - start)
+
+    def _run_stream_worker(self, name, stream_fn, task_queue, errors):
+        start = time.thread_time()
+
+        def iter_tasks():
+            while True:
+                task = task_queue.get()
+                if task is _END_OF_TASKS:
+                    return
+                yield task
+
+        tasks = iter_tasks()
+        try:
+            stream_fn(tasks)
+        except BaseException as e:
+            errors.append(e)
+        # Drain any tasks that the stage did not consume.
+        for _ in tasks:
+            pass
+        self._add_time(name, time.thread_time() - start)
+
+    def _run_job(self, name, job_fn, errors):
+        start = time.thread_time()
+        try:
+            job_fn()
+        except BaseException as e:
+            errors.append(e)
+        self._add_time(name, time.thread_time() - start)
+
+    def run(self, tasks, prepare_fn=None):
+        """
+        Walks the tasks once and runs every stage and job on them.
+        :prepare_fn: if not None, called on each task in the walk before it is put on the stage queues. Its time is recorded as the PREPARE_STAGE.
+        :ret: {stage or job name : CPU seconds}, and the TOTAL_TIME of the export in wall clock seconds.
+        """
+        start = time.time()
+        self.timings = {}
+        errors = []
+        threads, queues = [], []
+        for name, job_fn in self._jobs:
+            threads.append(
+                threading.Thread(target=self._run_job, args=(name, job_fn, errors))
+            )
+        for name, stage_fn, num_workers, is_stream in self._stages:
+            task_queue = queue.Queue(maxsize=self.queue_size)
+            queues.append((task_queue, num_workers))
+            worker_fn = self._run_stream_worker if is_stream else self._run_task_worker
+            for _ in range(num_workers):
+                threads.append(
+                    threading.Thread(
+                        target=worker_fn, args=(name, stage_fn, task_queue, errors)
+                    )
+                )
+        for thread in threads:
+            thread.start()
+
+        try:
+            for task in tasks:
+                if errors:
+                    break
+                if prepare_fn is not None:
+                    prepare_start = time.thread_time()
+                    prepare_fn(task)
+                    self._add_time(PREPARE_STAGE, time.thread_time() - prepare_start)
+                for task_queue, _ in queues:
+                    task_queue.put(task)
+        finally:
+            for task_queue, num_workers in queues:
+                for _ in range(num_workers):
+                    task_queue.put(_END_OF_TASKS)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+        self.timings[TOTAL_TIME] = time.time() - start
+        return self.timings
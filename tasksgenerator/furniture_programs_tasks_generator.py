@@ -12,6 +12,7 @@ import random
 
 from dreamcoder.grammar import Grammar
 from primitives.gadgets_primitives import *
+import primitives.gadgets_compiler as gadgets_compiler
 
 from tasksgenerator.bases_parts_tasks_generator import *
 from tasksgenerator.s12_s13_tasks_generator import RANDOM_SEED
@@ -21,329 +22,595 @@ from tasksgenerator.tasks_generator import (
     ManualCurriculumTasksGenerator,
     TaskCurriculum,
     TasksGeneratorRegistry,
-    random_sample_ratio_ordered_array,
+    get_part_generator,
 )
 from tasksgenerator.wheels_programs_tasks_generator import *
 from tasksgenerator.furniture_tasks_generator import FurnitureTasksGenerator
 
 octagon_string = T_string(octagon_string[0], octagon_string[1], s=THREE_QUARTER_SCALE)
 
+# Sub-families and shapes named in the stimuli descriptors.
+DRAWER_PULLS, STACKED_DRAWERS = "drawer_pulls", "stacked_drawers"
+DRAWERS_WITH_FEET, LOUNGES = "drawers_with_feet", "lounges"
+SEAT_DRAWERS = "seat_drawers"
+FURNITURE_SHAPES = {
+    "c": c_string,
+    "cc": cc_string,
+    "r": r_string,
+    "octagon": octagon_string,
+}
+# Where the drawers of each sub-family float inside their enclosure.
+DRAWERS_FLOAT_LOCATIONS = {
+    STACKED_DRAWERS: FLOAT_CENTER,
+    DRAWERS_WITH_FEET: FLOAT_TOP,
+    LOUNGES: FLOAT_BOTTOM,
+    SEAT_DRAWERS: FLOAT_TOP,
+}
+DRAWER_BASE_HEIGHTS_AND_WIDTHS = [
+    (SMALL * 3, MEDIUM * 9),
+    (SMALL * 4, SMALL * 9),
+    (SMALL * 5, SMALL * 12),
+]
+
 
 @TasksGeneratorRegistry.register
 class FurnitureProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
     name = "furniture_programs"
 
-    def _generate_drawer_pulls_strings_iterator(
+    def _get_drawer_pulls_shapes(self):
+        """:ret: [(outer shapes, inner shapes)] for each kind of drawer pull, with the shapes named as in FURNITURE_SHAPES."""
+        drawer_pulls_shapes = []
+        for outer_shapes in [("cc",), ("cc", "cc"), ("r",), ("octagon",), ()]:
+            for inner_shapes in [("c",), ("r",)]:
+                if outer_shapes + inner_shapes == ("r", "r"):
+                    continue
+                drawer_pulls_shapes.append((outer_shapes, inner_shapes))
+        return drawer_pulls_shapes
+
+    def _generate_drawer_pull_strings(
         self,
+        drawer_pull_shapes,
         min_x,
         max_x,
         n_drawer_pulls,
         float_location=FLOAT_CENTER,
         drawer_pull_scale=str(SCALE_UNIT),
     ):
-        wheels_generator = WheelsProgramsTasksGenerator()
-
+        """:ret: a row of one kind of drawer pull from _get_drawer_pulls_shapes."""
+        wheels_generator = get_part_generator(WheelsProgramsTasksGenerator)
+        outer_shapes, inner_shapes = drawer_pull_shapes
         base_min_size = MEDIUM * MEDIUM
-        for outer_shapes in [
-            [cc_string],
-            [cc_string, cc_string],
-            [r_string],
-            [octagon_string],
-            [],
-        ]:
-            for outer_shapes_min_size in [base_min_size]:
-                for inner_shapes in [[c_string], [r_string]]:
-                    for inner_shapes_max_size in [base_min_size * THREE_QUARTER_SCALE]:
-                        for n_decorators in [0]:
-                            if outer_shapes + inner_shapes == [r_string, r_string]:
-                                continue
-                            # Row of wheels is very similar to a set of drawer pulls.
-                            yield wheels_generator._generate_row_of_wheels_strings(
-                                outer_shapes=outer_shapes,
-                                outer_shapes_min_size=outer_shapes_min_size,
-                                inner_shapes=inner_shapes,
-                                inner_shapes_max_size=inner_shapes_max_size,
-                                n_decorators=n_decorators,
-                                n_spokes=0,
-                                min_x=min_x,
-                                max_x=max_x,
-                                paired_wheels=False,
-                                n_wheels=n_drawer_pulls,
-                                float_location=float_location,
-                                wheel_scale=drawer_pull_scale,
-                            )
+        # Row of wheels is very similar to a set of drawer pulls.
+        return wheels_generator._generate_row_of_wheels_strings(
+            outer_shapes=[FURNITURE_SHAPES[shape] for shape in outer_shapes],
+            outer_shapes_min_size=base_min_size,
+            inner_shapes=[FURNITURE_SHAPES[shape] for shape in inner_shapes],
+            inner_shapes_max_size=base_min_size * THREE_QUARTER_SCALE,
+            n_decorators=0,
+            n_spokes=0,
+            min_x=min_x,
+            max_x=max_x,
+            paired_wheels=False,
+            n_wheels=n_drawer_pulls,
+            float_location=float_location,
+            wheel_scale=drawer_pull_scale,
+        )
 
-    def _generate_drawers_strings_iterator(
+    def _generate_drawer_pulls_strings_iterator(
         self,
-        n_drawers=1,
-        base_heights_and_widths=[
-            (SMALL * 3, MEDIUM * 9),
-            (SMALL * 4, SMALL * 9),
-            (SMALL * 5, SMALL * 12),
-        ],
-        stack_float_locations=FLOAT_CENTER,
-        generation_probability=1.0,
+        min_x,
+        max_x,
+        n_drawer_pulls,
+        float_location=FLOAT_CENTER,
+        drawer_pull_scale=str(SCALE_UNIT),
     ):
-        original_generator = generator = TasksGeneratorRegistry[
-            FurnitureTasksGenerator.name
-        ]
-        # Generates strokes for drawers with and without drawer pulls. Returns strokes at the center.
+        for drawer_pull_shapes in self._get_drawer_pulls_shapes():
+            yield self._generate_drawer_pull_strings(
+                drawer_pull_shapes,
+                min_x=min_x,
+                max_x=max_x,
+                n_drawer_pulls=n_drawer_pulls,
+                float_location=float_location,
+                drawer_pull_scale=drawer_pull_scale,
+            )
+
+    def _generate_drawer_base_string(self, base_height, base_width):
+        return self._generate_basic_n_segment_bases_string(
+            primitives=[RECTANGLE],
+            heights=[base_height],
+            widths=[base_width],
+            float_locations=[FLOAT_CENTER],
+        )
+
+    def _get_drawer_pulls_in_drawer(self, base_height, base_width, n_drawer_pulls):
+        """:ret: the drawer pull shapes whose drawer pulls fit inside a drawer. Drawer pulls are measured with the original generator."""
+        original_generator = get_part_generator(FurnitureTasksGenerator)
+        (
+            base_strokes,
+            base_stroke_strings,
+            base_synthetic_dict,
+            base_min_x,
+            base_max_x,
+            base_min_y,
+            base_max_y,
+        ) = self._generate_drawer_base_string(base_height, base_width)
+        original_drawer_pulls = original_generator._generate_drawer_pulls_iterator(
+            min_x=base_min_x + (base_width * QUARTER_SCALE),
+            max_x=base_max_x - (base_width * QUARTER_SCALE),
+            n_drawer_pulls=n_drawer_pulls,
+            float_location=FLOAT_CENTER,
+            drawer_pull_scale=SCALE_UNIT,
+        )
+        drawer_spacing = base_height * QUARTER_SCALE
+        drawer_pulls_shapes = []
+        for (
+            drawer_pull_shapes,
+            (
+                _,
+                original_drawer_pull_strokes_min_x,
+                original_drawer_pull_strokes_max_x,
+                original_drawer_pull_strokes_min_y,
+                original_drawer_pull_strokes_max_y,
+            ),
+        ) in zip(self._get_drawer_pulls_shapes(), original_drawer_pulls):
+            if original_drawer_pull_strokes_max_y >= (
+                base_max_y - (drawer_spacing)
+            ) or original_drawer_pull_strokes_max_x >= (base_max_x - (drawer_spacing)):
+                continue
+            drawer_pulls_shapes.append(drawer_pull_shapes)
+        return drawer_pulls_shapes
+
+    def _generate_drawers_parameters(
+        self, n_drawers=1, base_heights_and_widths=DRAWER_BASE_HEIGHTS_AND_WIDTHS
+    ):
+        """Yields (base_height, base_width, n_drawer_pulls, drawer_pull_shapes) for each drawer, with and without drawer pulls. Drawer pulls must fit inside the drawer, and only one drawer without drawer pulls is drawn for each base."""
         for (base_height, base_width) in base_heights_and_widths:
             if base_height > SMALL * 4 and n_drawers > 3:
                 continue
-            (
-                base_strokes,
-                base_stroke_strings,
-                base_synthetic_dict,
-                base_min_x,
-                base_max_x,
-                base_min_y,
-                base_max_y,
-            ) = self._generate_basic_n_segment_bases_string(
-                primitives=[RECTANGLE],
-                heights=[base_height],
-                widths=[base_width],
-                float_locations=[FLOAT_CENTER],
-            )
             drawn_blank = False
-
             for n_drawer_pulls in [0, 2]:
-                for drawer_pull_idx, (
-                    drawer_pull_strokes,
-                    drawer_pull_strings,
-                    drawer_pull_synthetic_dict,
-                    drawer_pull_strokes_min_x,
-                    drawer_pull_strokes_max_x,
-                    drawer_pull_strokes_min_y,
-                    drawer_pull_strokes_max_y,
-                ) in enumerate(
-                    self._generate_drawer_pulls_strings_iterator(
-                        min_x=base_min_x + (base_width * QUARTER_SCALE),
-                        max_x=base_max_x - (base_width * QUARTER_SCALE),
-                        n_drawer_pulls=n_drawer_pulls,
-                        float_location=FLOAT_CENTER,
-                        drawer_pull_scale=SCALE_UNIT,
-                    )
+                for drawer_pull_shapes in self._get_drawer_pulls_in_drawer(
+                    base_height, base_width, n_drawer_pulls
                 ):
-                    drawer_spacing = base_height * QUARTER_SCALE
-
-                    original_drawer_pulls = list(
-                        original_generator._generate_drawer_pulls_iterator(
-                            min_x=base_min_x + (base_width * QUARTER_SCALE),
-                            max_x=base_max_x - (base_width * QUARTER_SCALE),
-                            n_drawer_pulls=n_drawer_pulls,
-                            float_location=FLOAT_CENTER,
-                            drawer_pull_scale=SCALE_UNIT,
-                        )
-                    )
+                    if n_drawer_pulls < 1 and drawn_blank:
+                        continue
+                    if n_drawer_pulls < 1:
+                        drawn_blank = True
+                    yield base_height, base_width, n_drawer_pulls, drawer_pull_shapes
 
-                    (
-                        _,
-                        original_drawer_pull_strokes_min_x,
-                        original_drawer_pull_strokes_max_x,
-                        original_drawer_pull_strokes_min_y,
-                        original_drawer_pull_strokes_max_y,
-                    ) = original_drawer_pulls[drawer_pull_idx]
-
-                    if original_drawer_pull_strokes_max_y >= (
-                        base_max_y - (drawer_spacing)
-                    ) or original_drawer_pull_strokes_max_x >= (
-                        base_max_x - (drawer_spacing)
-                    ):
+    def _generate_drawers_string(
+        self,
+        n_drawers,
+        base_height,
+        base_width,
+        n_drawer_pulls,
+        drawer_pull_shapes,
+        stack_float_locations=FLOAT_CENTER,
+    ):
+        """Generates strokes for a stack of n_drawers drawers inside an enclosure, from the parameters of _generate_drawers_parameters."""
+        (
+            base_strokes,
+            base_stroke_strings,
+            base_synthetic_dict,
+            base_min_x,
+            base_max_x,
+            base_min_y,
+            base_max_y,
+        ) = self._generate_drawer_base_string(base_height, base_width)
+        (
+            drawer_pull_strokes,
+            drawer_pull_strings,
+            drawer_pull_synthetic_dict,
+            drawer_pull_strokes_min_x,
+            drawer_pull_strokes_max_x,
+            drawer_pull_strokes_min_y,
+            drawer_pull_strokes_max_y,
+        ) = self._generate_drawer_pull_strings(
+            drawer_pull_shapes,
+            min_x=base_min_x + (base_width * QUARTER_SCALE),
+            max_x=base_max_x - (base_width * QUARTER_SCALE),
+            n_drawer_pulls=n_drawer_pulls,
+            float_location=FLOAT_CENTER,
+            drawer_pull_scale=SCALE_UNIT,
+        )
+        drawer_spacing = base_height * QUARTER_SCALE
 
-                        continue
-                    # if peval(drawer_pull_strokes_max_y) >= (
-                    #     base_max_y - (drawer_spacing)
-                    # ) or peval(drawer_pull_strokes_max_x) >= (
-                    #     base_max_x - (drawer_spacing)
-                    # ):
-                    #     print(
-                    #         peval(drawer_pull_strokes_max_y),
-                    #         peval(drawer_pull_strokes_max_x),
-                    #     )
-                    #     continue
-
-                    # Insanely, let's copy the logic.
+        drawer_strokes = [base_strokes[0] + drawer_pull_strokes[0]]
+        drawer_stroke_string = connect_strokes(
+            [base_stroke_strings, drawer_pull_strings]
+        )
 
-                    if n_drawer_pulls < 1 and drawn_blank:
-                        continue
+        # Draw the grid of drawers.
+        total_height = (n_drawers - 1) * (base_height + drawer_spacing)
+        min_y, max_y = (
+            -total_height * 0.5,
+            total_height * 0.5,
+        )
 
-                    drawer_strokes = [base_strokes[0] + drawer_pull_strokes[0]]
-                    drawer_stroke_string = connect_strokes(
-                        [base_stroke_strings, drawer_pull_strings]
-                    )
+        drawer_synthetic_dict = SyntheticAbstractions()
+        # Add the drawer pulls.
+        drawer_synthetic_dict.merge(drawer_pull_synthetic_dict)
+        # Add the base.
+        drawer_synthetic_dict.merge(base_synthetic_dict)
 
-                    if n_drawer_pulls < 1:
-                        drawn_blank = True
+        (
+            drawer_stack_strokes,
+            drawer_stack_stroke_strings,
+            drawer_stack_synthetic_dict,
+            drawer_stack_strokes_min_x,
+            drawer_stack_strokes_max_x,
+            drawer_stack_strokes_min_y,
+            drawer_stack_strokes_max_y,
+        ) = self._generate_n_objects_on_grid_x_y_limits_string(
+            object=drawer_strokes[0],
+            object_string=drawer_stroke_string,
+            object_center=(0, 0),
+            object_height=base_height,
+            object_width=base_width,
+            min_x=0,
+            max_x=0,
+            min_y=min_y,
+            max_y=max_y,
+            n_rows=n_drawers,
+            n_columns=1,
+            float_location=stack_float_locations,
+            grid_indices=range(n_drawers * n_drawers),
+            object_synthetic_dict=drawer_synthetic_dict,
+        )
+        if stack_float_locations in [FLOAT_TOP, FLOAT_BOTTOM]:
 
-                    # Draw the grid of drawers.
-                    total_height = (n_drawers - 1) * (base_height + drawer_spacing)
-                    min_y, max_y = (
-                        -total_height * 0.5,
-                        total_height * 0.5,
-                    )
+            (drawer_stack_strokes, drawer_stack_stroke_strings,) = T_string(
+                drawer_stack_strokes[0],
+                drawer_stack_stroke_strings,
+                y=drawer_spacing,
+            )
+            drawer_stack_strokes = [drawer_stack_strokes]
 
-                    drawer_synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
-                    # Add the drawer pulls.
-                    for k in drawer_pull_synthetic_dict:
-                        drawer_synthetic_dict[k] += drawer_pull_synthetic_dict[k]
-                    # Add the base.
-                    for k in base_synthetic_dict:
-                        drawer_synthetic_dict[k] += base_synthetic_dict[k]
+        # Draw the enclosing around them.
+        total_height = (n_drawers * base_height) + ((n_drawers + 1) * drawer_spacing)
+        enclosure_width = base_width + (2 * drawer_spacing)
+        (
+            enclosure_strokes,
+            enclosure_stroke_string,
+            enclosure_synthetic_dict,
+            enclosure_min_x,
+            enclosure_max_x,
+            enclosure_min_y,
+            enclosure_max_y,
+        ) = self._generate_basic_n_segment_bases_string(
+            primitives=[RECTANGLE],
+            heights=[total_height],
+            widths=[enclosure_width],
+            float_locations=[stack_float_locations],
+        )
+        drawer_strokes = [drawer_stack_strokes[0] + enclosure_strokes[0]]
+        drawer_stroke_string = connect_strokes(
+            [drawer_stack_stroke_strings, enclosure_stroke_string]
+        )
+        drawer_synthetic_dict = drawer_stack_synthetic_dict
+        drawer_stack_synthetic_dict.merge(enclosure_synthetic_dict)
 
-                    (
-                        drawer_stack_strokes,
-                        drawer_stack_stroke_strings,
-                        drawer_stack_synthetic_dict,
-                        drawer_stack_strokes_min_x,
-                        drawer_stack_strokes_max_x,
-                        drawer_stack_strokes_min_y,
-                        drawer_stack_strokes_max_y,
-                    ) = self._generate_n_objects_on_grid_x_y_limits_string(
-                        object=drawer_strokes[0],
-                        object_string=drawer_stroke_string,
-                        object_center=(0, 0),
-                        object_height=base_height,
-                        object_width=base_width,
-                        min_x=0,
-                        max_x=0,
-                        min_y=min_y,
-                        max_y=max_y,
-                        n_rows=n_drawers,
-                        n_columns=1,
-                        float_location=stack_float_locations,
-                        grid_indices=range(n_drawers * n_drawers),
-                        object_synthetic_dict=drawer_synthetic_dict,
-                    )
-                    if stack_float_locations in [FLOAT_TOP, FLOAT_BOTTOM]:
-
-                        (drawer_stack_strokes, drawer_stack_stroke_strings,) = T_string(
-                            drawer_stack_strokes[0],
-                            drawer_stack_stroke_strings,
-                            y=drawer_spacing,
-                        )
-                        drawer_stack_strokes = [drawer_stack_strokes]
-
-                    # Draw the enclosing around them.
-                    total_height = (n_drawers * base_height) + (
-                        (n_drawers + 1) * drawer_spacing
-                    )
-                    enclosure_width = base_width + (2 * drawer_spacing)
-                    (
-                        enclosure_strokes,
-                        enclosure_stroke_string,
-                        enclosure_synthetic_dict,
-                        enclosure_min_x,
-                        enclosure_max_x,
-                        enclosure_min_y,
-                        enclosure_max_y,
-                    ) = self._generate_basic_n_segment_bases_string(
-                        primitives=[RECTANGLE],
-                        heights=[total_height],
-                        widths=[enclosure_width],
-                        float_locations=[stack_float_locations],
-                    )
-                    drawer_strokes = [drawer_stack_strokes[0] + enclosure_strokes[0]]
-                    drawer_stroke_string = connect_strokes(
-                        [drawer_stack_stroke_strings, enclosure_stroke_string]
-                    )
-                    drawer_synthetic_dict = drawer_stack_synthetic_dict
-                    for k in enclosure_synthetic_dict:
-                        drawer_stack_synthetic_dict[k] += enclosure_synthetic_dict[k]
+        return (
+            drawer_strokes,
+            drawer_stroke_string,
+            drawer_synthetic_dict,
+            enclosure_min_x,
+            enclosure_max_x,
+            enclosure_min_y,
+            enclosure_max_y,
+        )
 
-                    if random.uniform(0, 1) > generation_probability:
-                        continue
+    def _generate_drawers_strings_iterator(
+        self,
+        n_drawers=1,
+        base_heights_and_widths=DRAWER_BASE_HEIGHTS_AND_WIDTHS,
+        stack_float_locations=FLOAT_CENTER,
+        generation_probability=1.0,
+    ):
+        # Generates strokes for drawers with and without drawer pulls. Returns strokes at the center.
+        for (
+            base_height,
+            base_width,
+            n_drawer_pulls,
+            drawer_pull_shapes,
+        ) in self._generate_drawers_parameters(n_drawers, base_heights_and_widths):
+            # Sample before building the stack and the enclosure.
+            if not self._sample_is_generated(generation_probability):
+                continue
+            yield self._generate_drawers_string(
+                n_drawers,
+                base_height,
+                base_width,
+                n_drawer_pulls,
+                drawer_pull_shapes,
+                stack_float_locations=stack_float_locations,
+            )
 
-                    yield (
-                        drawer_strokes,
-                        drawer_stroke_string,
-                        drawer_synthetic_dict,
-                        enclosure_min_x,
-                        enclosure_max_x,
-                        enclosure_min_y,
-                        enclosure_max_y,
-                    )
+    def _generate_feet_parameters(self, n_feet, feet_heights):
+        """Yields (foot_primitive, foot_height) for each row of feet. Rectangular feet are only used for up to two feet."""
+        for foot_primitive in [RECTANGLE, LINE]:
+            for foot_height in feet_heights:
+                if foot_primitive == RECTANGLE and n_feet > 2:
+                    continue
+                yield foot_primitive, foot_height
 
-    def _generate_feet_strings_iterator(
+    def _generate_feet_string(
         self,
         n_feet,
+        foot_primitive,
+        foot_height,
         min_x,
         max_x,
         min_y,
         max_y,
-        feet_heights=[SMALL, MEDIUM * 2, MEDIUM * 4],
-        generation_probability=1.0,
     ):
+        """Generates a row of n_feet feet, from the parameters of _generate_feet_parameters."""
         short_v_line = T_string(
             short_l_string[0], short_l_string[1], theta=STR_VERTICAL
         )
+        foot_synthetic_dict = SyntheticAbstractions()
+        if foot_primitive == RECTANGLE:
+            foot_width = SMALL
+
+            foot = scaled_rectangle_string(w=foot_width, h=foot_height)
+
+            shape_abstraction = "foot"
+            foot_synthetic_dict[LOW_LEVEL] = [shape_abstraction]
+            foot_synthetic_dict[LOW_LEVEL_PARTS] = ["r_s"]
+            foot_synthetic_dict[LOW_LEVEL_PARAMS] = [foot_width, foot_height]
+
+            foot_synthetic_dict[MID_LEVEL] = [shape_abstraction]
+            foot_synthetic_dict[MID_LEVEL_PARTS] = ["r_s"]
+            foot_synthetic_dict[MID_LEVEL_PARAMS] = [foot_width, foot_height]
+        else:
+            foot_width = 0
+            foot = T_string(short_v_line[0], short_v_line[1], s=foot_height)
+            shape_abstraction = "foot"
+            foot_synthetic_dict[LOW_LEVEL] = [shape_abstraction]
+            foot_synthetic_dict[LOW_LEVEL_PARTS] = [short_v_line[-1]]
+            foot_synthetic_dict[LOW_LEVEL_PARAMS] = [foot_height]
+
+            foot_synthetic_dict[MID_LEVEL] = [shape_abstraction]
+            foot_synthetic_dict[MID_LEVEL_PARTS] = [short_v_line[-1]]
+            foot_synthetic_dict[MID_LEVEL_PARAMS] = [foot_height]
+
+        (
+            feet_strokes,
+            feet_strokes_string,
+            feet_strokes_synthetic_dict,
+            feet_strokes_min_x,
+            feet_strokes_max_x,
+            feet_strokes_min_y,
+            feet_strokes_max_y,
+        ) = self._generate_n_objects_on_grid_x_y_limits_string(
+            object=foot[0],
+            object_string=foot[1],
+            object_center=(0, 0),
+            object_height=foot_height * 0.5,  # TODO: figure out what's going on.
+            object_width=foot_width if foot_width > 0 else 1,
+            min_x=peval(min_x) + foot_width * 0.5,
+            max_x=peval(max_x) - foot_width * 0.5,
+            min_y=min_y,
+            max_y=max_y,
+            n_rows=1,
+            n_columns=n_feet,
+            float_location=FLOAT_BOTTOM,
+            grid_indices=range(n_feet),
+            object_synthetic_dict=foot_synthetic_dict,
+        )
+        return feet_strokes, feet_strokes_string, feet_strokes_synthetic_dict
+
+    def _generate_feet_strings_iterator(
+        self,
+        n_feet,
+        min_x,
+        max_x,
+        min_y,
+        max_y,
+        feet_heights=[SMALL, MEDIUM * 2, MEDIUM * 4],
+        generation_probability=1.0,
+    ):
         # Adds a row of feet to the object. These can be short or tall.
-        for foot_primitive in [RECTANGLE, LINE]:
-            for foot_height in feet_heights:
-                foot_synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
-                if foot_primitive == RECTANGLE:
-                    foot_width = SMALL
+        for foot_primitive, foot_height in self._generate_feet_parameters(
+            n_feet, feet_heights
+        ):
+            # Sample before placing the feet.
+            if not self._sample_is_generated(generation_probability):
+                continue
+            yield self._generate_feet_string(
+                n_feet, foot_primitive, foot_height, min_x, max_x, min_y, max_y
+            )
 
-                    foot = scaled_rectangle_string(w=foot_width, h=foot_height)
+    def _get_seat_back_primitives(self):
+        """:ret: the primitives for each kind of lounge seat back."""
+        return [
+            [CIRCLE, CIRCLE, ([], "empt")],
+            [RECTANGLE, ([], "empt"), RECTANGLE],
+            [RECTANGLE, CIRCLE, ([], "empt"), RECTANGLE],
+        ]
 
-                    if n_feet > 2:
-                        continue
+    def _generate_seat_back_string(self, seat_back_primitives, base_height, width):
+        """Generates the pillows on top of a lounge of the given width."""
+        n_segments = len(seat_back_primitives)
+        shape_heights = [base_height] * n_segments
 
-                    shape_abstraction = "foot"
-                    foot_synthetic_dict[LOW_LEVEL] = [shape_abstraction]
-                    foot_synthetic_dict[LOW_LEVEL_PARTS] = ["r_s"]
-                    foot_synthetic_dict[LOW_LEVEL_PARAMS] = [foot_width, foot_height]
-
-                    foot_synthetic_dict[MID_LEVEL] = [shape_abstraction]
-                    foot_synthetic_dict[MID_LEVEL_PARTS] = ["r_s"]
-                    foot_synthetic_dict[MID_LEVEL_PARAMS] = [foot_width, foot_height]
-                else:
-                    foot_width = 0
-                    foot = T_string(short_v_line[0], short_v_line[1], s=foot_height)
-                    shape_abstraction = "foot"
-                    foot_synthetic_dict[LOW_LEVEL] = [shape_abstraction]
-                    foot_synthetic_dict[LOW_LEVEL_PARTS] = [short_v_line[-1]]
-                    foot_synthetic_dict[LOW_LEVEL_PARAMS] = [foot_height]
-
-                    foot_synthetic_dict[MID_LEVEL] = [shape_abstraction]
-                    foot_synthetic_dict[MID_LEVEL_PARTS] = [short_v_line[-1]]
-                    foot_synthetic_dict[MID_LEVEL_PARAMS] = [foot_height]
+        def get_width(shape, base_height):
+            if type(shape) == tuple:
+                return 0
+            elif shape == RECTANGLE:
+                return base_height * 0.5
+            else:
+                return base_height
 
-                (
-                    feet_strokes,
-                    feet_strokes_string,
-                    feet_strokes_synthetic_dict,
-                    feet_strokes_min_x,
-                    feet_strokes_max_x,
-                    feet_strokes_min_y,
-                    feet_strokes_max_y,
-                ) = self._generate_n_objects_on_grid_x_y_limits_string(
-                    object=foot[0],
-                    object_string=foot[1],
-                    object_center=(0, 0),
-                    object_height=foot_height
-                    * 0.5,  # TODO: figure out what's going on.
-                    object_width=foot_width if foot_width > 0 else 1,
-                    min_x=peval(min_x) + foot_width * 0.5,
-                    max_x=peval(max_x) - foot_width * 0.5,
-                    min_y=min_y,
-                    max_y=max_y,
-                    n_rows=1,
-                    n_columns=n_feet,
-                    float_location=FLOAT_BOTTOM,
-                    grid_indices=range(n_feet),
-                    object_synthetic_dict=foot_synthetic_dict,
-                )
-                if random.uniform(0, 1) > generation_probability:
-                    continue
-                yield feet_strokes, feet_strokes_string, feet_strokes_synthetic_dict
+        shape_widths = [get_width(shape, base_height) for shape in seat_back_primitives]
 
-    def _generate_parts_stimuli_strings(self, train_ratio=1.0):
-        strokes, stroke_strings, stroke_dicts = [], [], []
-        # Generate wheels.
+        seat_spacer_width = width - np.sum(shape_widths)
+
+        shape_widths = [w if w > 0 else seat_spacer_width for w in shape_widths]
+
+        return self._generate_basic_n_segment_bases_string(
+            primitives=seat_back_primitives,
+            heights=shape_heights,
+            widths=shape_widths,
+            float_locations=[FLOAT_TOP for x in range(n_segments)],
+            right_margins=[0 for x in range(n_segments)],
+        )
+
+    def _sample_is_generated(self, generation_probability):
+        """:ret: whether to generate a stimulus with generation_probability. Always draws once from random, even if generation_probability is 1.0."""
+        return not random.uniform(0, 1) > generation_probability
+
+    def _generate_parts_descriptors(self):
+        """Yields descriptors for the individual parts in the domain: rows of drawer pulls."""
         n_drawer_pulls = [1, 2]
         for n_pulls in n_drawer_pulls:
-            for (
+            for drawer_pull_shapes in self._get_drawer_pulls_shapes():
+                yield (
+                    DRAWER_PULLS,
+                    (
+                        ("n_drawer_pulls", n_pulls),
+                        ("drawer_pull_shapes", drawer_pull_shapes),
+                    ),
+                )
+
+    def _generate_drawers_descriptors(
+        self,
+        sub_family,
+        n_drawers,
+        base_heights_and_widths,
+        generation_probability,
+    ):
+        """Yields descriptors for each drawer of a sub-family from _generate_drawers_parameters. Measures the drawer pulls, but does not build any stimuli."""
+        for (
+            base_height,
+            base_width,
+            n_drawer_pulls,
+            drawer_pull_shapes,
+        ) in self._generate_drawers_parameters(n_drawers, base_heights_and_widths):
+            yield (
+                sub_family,
+                (
+                    ("n_drawers", n_drawers),
+                    ("base_height", base_height),
+                    ("base_width", base_width),
+                    ("n_drawer_pulls", n_drawer_pulls),
+                    ("drawer_pull_shapes", drawer_pull_shapes),
+                    ("generation_probability", generation_probability),
+                ),
+            )
+
+    def _generate_stacked_drawers_descriptors(
+        self, total_drawers=4, generation_probability=0.45
+    ):
+        """Yields descriptors for stacked bookshelves with no legs, then for short drawers with long legs."""
+        for n_drawers in range(2, int(total_drawers) + 1):
+            yield from self._generate_drawers_descriptors(
+                STACKED_DRAWERS,
+                n_drawers,
+                DRAWER_BASE_HEIGHTS_AND_WIDTHS,
+                generation_probability,
+            )
+        max_short_drawers = 2
+        for n_drawers in range(1, max_short_drawers + 1):
+            yield from self._generate_drawers_descriptors(
+                DRAWERS_WITH_FEET,
+                n_drawers,
+                [(SMALL * 3, MEDIUM * 9)],
+                generation_probability,
+            )
+
+    def _generate_lounges_descriptors(self, generation_probability=0.6):
+        """Yields descriptors for lounges: a large base that may have a drawer, with pillows on top and feet."""
+        yield from self._generate_drawers_descriptors(
+            LOUNGES,
+            1,
+            [(SMALL * 3, MEDIUM * 9), (SMALL * 3, MEDIUM * 10)],
+            generation_probability,
+        )
+
+    def _generate_seat_drawers_descriptors(self, generation_probability=0.7):
+        """Yields descriptors for seats with a drawer shifted to one side."""
+        yield from self._generate_drawers_descriptors(
+            SEAT_DRAWERS,
+            1,
+            [(SMALL * 2, SMALL * 5), (SMALL * 4, SMALL * 8)],
+            generation_probability,
+        )
+
+    def _generate_stimuli_descriptors(self):
+        yield from self._generate_parts_descriptors()
+        yield from self._generate_stacked_drawers_descriptors()
+        yield from self._generate_lounges_descriptors()
+        yield from self._generate_seat_drawers_descriptors()
+
+    def _sample_stimuli(self, descriptor):
+        """Draws whether to generate a drawer, and which feet to add to it, in the order of the original implementation.
+        :ret: None if no stimuli are generated, () for drawer pulls and stacked drawers, or the parameters of each piece of furniture to build on the drawer."""
+        sub_family, parameters = descriptor
+        if sub_family == DRAWER_PULLS:
+            return ()
+        generation_probability = dict(parameters)["generation_probability"]
+        if sub_family == STACKED_DRAWERS:
+            if not self._sample_is_generated(generation_probability):
+                return None
+            return ()
+
+        furniture = []
+        if sub_family == DRAWERS_WITH_FEET:
+            if not self._sample_is_generated(generation_probability):
+                return None
+            for n_feet in [2, 3, 4]:
+                for foot_primitive, foot_height in self._generate_feet_parameters(
+                    n_feet, [SMALL, MEDIUM * 2, MEDIUM * 4]
+                ):
+                    if self._sample_is_generated(generation_probability):
+                        furniture.append((n_feet, foot_primitive, foot_height))
+        elif sub_family == LOUNGES:
+            # Lounges generate every drawer and feet, and then sample whole lounges. Generating still draws.
+            self._sample_is_generated(1.0)
+            for seat_back_index in range(len(self._get_seat_back_primitives())):
+                for base_height in [MEDIUM, MEDIUM * 2]:
+                    for n_feet in [2, 3, 4]:
+                        for (
+                            foot_primitive,
+                            foot_height,
+                        ) in self._generate_feet_parameters(
+                            n_feet, [SMALL, MEDIUM * 2]
+                        ):
+                            self._sample_is_generated(1.0)
+                            if self._sample_is_generated(generation_probability):
+                                furniture.append(
+                                    (
+                                        seat_back_index,
+                                        base_height,
+                                        n_feet,
+                                        foot_primitive,
+                                        foot_height,
+                                    )
+                                )
+        else:
+            # Seat drawers generate every drawer and feet, and then sample whole seats. Generating still draws.
+            self._sample_is_generated(1.0)
+            for shift_index in range(2):
+                for n_feet in [2]:
+                    for foot_primitive, foot_height in self._generate_feet_parameters(
+                        n_feet, [SMALL, SMALL * 4]
+                    ):
+                        self._sample_is_generated(1.0)
+                        if self._sample_is_generated(generation_probability):
+                            furniture.append(
+                                (shift_index, n_feet, foot_primitive, foot_height)
+                            )
+        if not furniture:
+            return None
+        return tuple(furniture)
+
+    def _build_stimuli(self, descriptor, sample):
+        """Builds the stimuli for a descriptor and its draws from _sample_stimuli. :ret: [(strokes, program string, SyntheticAbstractions)]."""
+        sub_family, parameters = descriptor
+        parameters = dict(parameters)
+        if sub_family == DRAWER_PULLS:
+            (
                 drawer_pull_strokes,
                 drawer_pull_stroke_strings,
                 drawer_pull_stroke_dicts,
@@ -351,115 +618,23 @@ class FurnitureProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerato
                 drawer_pull_strokes_max_x,
                 drawer_pull_strokes_min_y,
                 drawer_pull_strokes_max_y,
-            ) in self._generate_drawer_pulls_strings_iterator(
+            ) = self._generate_drawer_pull_strings(
+                parameters["drawer_pull_shapes"],
                 min_x=-LARGE * 4,
                 max_x=LARGE * 4,
-                n_drawer_pulls=n_pulls,
+                n_drawer_pulls=parameters["n_drawer_pulls"],
                 float_location=FLOAT_CENTER,
                 drawer_pull_scale=SCALE_UNIT,
-            ):
-                strokes += drawer_pull_strokes
-                stroke_strings.append(drawer_pull_stroke_strings)
-                stroke_dicts.append(drawer_pull_stroke_dicts)
-        return random_sample_ratio_ordered_array(
-            strokes, train_ratio, strings_array=list(zip(stroke_strings, stroke_dicts))
-        )
-
-    def _generate_stacked_drawers_stimuli_strings(
-        self, total_drawers=4, train_ratio=1.0, generation_probability=0.45
-    ):
-        stimuli_strokes, stimuli_strings, stroke_dicts = [], [], []
-        # Draw stacked bookshelves with no legs.
-        for n_drawers in range(2, int(total_drawers) + 1):
-            for (
-                drawer_strokes,
-                drawer_strings,
-                drawer_synthetic_dict,
-                enclosure_min_x,
-                enclosure_max_x,
-                enclosure_min_y,
-                enclosure_max_y,
-            ) in self._generate_drawers_strings_iterator(
-                n_drawers=n_drawers,
-                generation_probability=generation_probability,
-            ):
-                if drawer_strokes:
-                    stimuli_strokes += drawer_strokes
-                    stimuli_strings.append(drawer_strings)
-                    stroke_dicts.append(drawer_synthetic_dict)
-        # Draw short drawers with long legs.
-        max_short_drawers = 2
-        for n_drawers in range(1, max_short_drawers + 1):
-            base_heights_and_widths = [
-                (SMALL * 3, MEDIUM * 9),
+            )
+            return [
+                (
+                    drawer_pull_strokes[0],
+                    drawer_pull_stroke_strings,
+                    drawer_pull_stroke_dicts,
+                )
             ]
-            for (
-                enclosure_strokes,
-                enclosure_stroke_strings,
-                enclosure_synthetic_dict,
-                enclosure_min_x,
-                enclosure_max_x,
-                enclosure_min_y,
-                enclosure_max_y,
-            ) in self._generate_drawers_strings_iterator(
-                n_drawers=n_drawers,
-                base_heights_and_widths=base_heights_and_widths,
-                stack_float_locations=FLOAT_TOP,
-                generation_probability=generation_probability,
-            ):
-
-                if enclosure_strokes:
-                    for n_feet in [2, 3, 4]:
-                        for (
-                            feet_strokes,
-                            feet_string,
-                            feet_synthetic_dict,
-                        ) in self._generate_feet_strings_iterator(
-                            n_feet=n_feet,
-                            min_x=enclosure_min_x,
-                            max_x=enclosure_max_x,
-                            min_y=enclosure_min_y,
-                            max_y=enclosure_max_y,
-                            feet_heights=[SMALL, MEDIUM * 2, MEDIUM * 4],
-                            generation_probability=generation_probability,
-                        ):
-                            drawer_strokes = [enclosure_strokes[0] + feet_strokes[0]]
-                            stimuli_strokes += drawer_strokes
-                            drawer_string = connect_strokes(
-                                [enclosure_stroke_strings, feet_string]
-                            )
-                            stimuli_strings.append(drawer_string)
 
-                            synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
-                            for k in enclosure_synthetic_dict:
-                                synthetic_dict[k] += enclosure_synthetic_dict[k]
-                            for k in feet_synthetic_dict:
-                                synthetic_dict[k] += enclosure_synthetic_dict[k]
-                            stroke_dicts.append(synthetic_dict)
-
-        # Shuffle before returning.
-        stimuli_data = list(zip(stimuli_strokes, stimuli_strings, stroke_dicts))
-        random.shuffle(stimuli_data)
-        stimuli_strokes, stimuli_strings, stroke_dicts = zip(*stimuli_data)
-
-        return random_sample_ratio_ordered_array(
-            stimuli_strokes,
-            train_ratio,
-            strings_array=list(zip(stimuli_strings, stroke_dicts)),
-        )
-
-    def _generate_lounges_stimuli_strings(
-        self, train_ratio=1.0, generation_probability=0.6
-    ):
-        # Generates lounges containing a large base and one or more rectangular pillows on top. Lounges may or may not have an inset drawer.
-        # Grab the drawer stack enclosure and add pillows, etc.
-        stimuli_strokes, stimuli_strings, stroke_dicts = [], [], []
-        # Draw short drawers with long legs.
-        base_heights_and_widths = [
-            (SMALL * 3, MEDIUM * 9),
-            (SMALL * 3, MEDIUM * 10),
-        ]
-        for (
+        (
             enclosure_strokes,
             enclosure_stroke_strings,
             enclosure_synthetic_dict,
@@ -467,148 +642,117 @@ class FurnitureProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerato
             enclosure_max_x,
             enclosure_min_y,
             enclosure_max_y,
-        ) in self._generate_drawers_strings_iterator(
-            n_drawers=1,
-            base_heights_and_widths=base_heights_and_widths,
-            stack_float_locations=FLOAT_BOTTOM,
-            generation_probability=1.0,
-        ):
-            enclosure_width = enclosure_max_x - enclosure_min_x
-            if enclosure_strokes:
-                # Now add pillows.
-                all_seat_back_primitives = [
-                    [CIRCLE, CIRCLE, ([], "empt")],
-                    [RECTANGLE, ([], "empt"), RECTANGLE],
-                    [RECTANGLE, CIRCLE, ([], "empt"), RECTANGLE],
-                ]
-                for seat_back_primitives in all_seat_back_primitives:
-                    for base_height in [MEDIUM, MEDIUM * 2]:
-                        n_segments = len(seat_back_primitives)
-                        shape_heights = [base_height] * n_segments
-
-                        def get_width(shape, base_height):
-                            if type(shape) == tuple:
-                                return 0
-                            elif shape == RECTANGLE:
-                                return base_height * 0.5
-                            else:
-                                return base_height
-
-                        shape_widths = [
-                            get_width(shape, base_height)
-                            for shape in seat_back_primitives
-                        ]
-
-                        seat_spacer_width = enclosure_width - np.sum(shape_widths)
-
-                        shape_widths = [
-                            w if w > 0 else seat_spacer_width for w in shape_widths
-                        ]
-
-                        (
-                            seat_back_strokes,
-                            seat_back_strokes_string,
-                            seat_back_synthetic_dict,
-                            _,
-                            _,
-                            _,
-                            _,
-                        ) = self._generate_basic_n_segment_bases_string(
-                            primitives=seat_back_primitives,
-                            heights=shape_heights,
-                            widths=shape_widths,
-                            float_locations=[FLOAT_TOP for x in range(n_segments)],
-                            right_margins=[0 for x in range(n_segments)],
-                        )
-
-                        for n_feet in [2, 3, 4]:
-                            for (
-                                feet_strokes,
-                                feet_string,
-                                feet_synthetic_dict,
-                            ) in self._generate_feet_strings_iterator(
-                                n_feet=n_feet,
-                                min_x=enclosure_min_x,
-                                max_x=enclosure_max_x,
-                                min_y=enclosure_min_y,
-                                max_y=enclosure_max_y,
-                                feet_heights=[SMALL, MEDIUM * 2],
-                                generation_probability=1.0,
-                            ):
-                                feet_strokes, feet_string = T_string(
-                                    feet_strokes, feet_string, y=float(enclosure_min_y)
-                                )
-                                drawer_strokes = [
-                                    seat_back_strokes[0]
-                                    + enclosure_strokes[0]
-                                    + feet_strokes[0]
-                                ]
-                                drawer_string = connect_strokes(
-                                    [
-                                        seat_back_strokes_string,
-                                        enclosure_stroke_strings,
-                                        feet_string,
-                                    ]
-                                )
-                                drawer_synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
-                                for k in seat_back_synthetic_dict:
-                                    drawer_synthetic_dict[
-                                        k
-                                    ] += seat_back_synthetic_dict[k]
-                                for k in enclosure_synthetic_dict:
-                                    drawer_synthetic_dict[
-                                        k
-                                    ] += enclosure_synthetic_dict[k]
-                                for k in feet_synthetic_dict:
-                                    drawer_synthetic_dict[k] += feet_synthetic_dict[k]
-                                if random.uniform(0, 1) > generation_probability:
-                                    continue
-
-                                stimuli_strokes += drawer_strokes
-                                stimuli_strings.append(drawer_string)
-                                stroke_dicts.append(drawer_synthetic_dict)
-
-        # Shuffle before returning.
-        stimuli_data = list(zip(stimuli_strokes, stimuli_strings, stroke_dicts))
-        random.shuffle(stimuli_data)
-        stimuli_strokes, stimuli_strings, stroke_dicts = zip(*stimuli_data)
-
-        return random_sample_ratio_ordered_array(
-            stimuli_strokes,
-            train_ratio,
-            strings_array=list(zip(stimuli_strings, stroke_dicts)),
+        ) = self._generate_drawers_string(
+            parameters["n_drawers"],
+            parameters["base_height"],
+            parameters["base_width"],
+            parameters["n_drawer_pulls"],
+            parameters["drawer_pull_shapes"],
+            stack_float_locations=DRAWERS_FLOAT_LOCATIONS[sub_family],
         )
+        if sub_family == STACKED_DRAWERS:
+            return [
+                (
+                    enclosure_strokes[0],
+                    enclosure_stroke_strings,
+                    enclosure_synthetic_dict,
+                )
+            ]
 
-    def _generate_seat_drawers_stimuli_strings(
-        self, train_ratio=1.0, generation_probability=0.7
-    ):
-        # Generates lounges containing a large base and one or more rectangular pillows on top. Lounges may or may not have an inset drawer.
-        # Grab the drawer stack enclosure and add pillows, etc.
-        stimuli_strokes, stimuli_strings, stroke_dicts = [], [], []
-        # Draw short drawers with long legs.
-        base_heights_and_widths = [
-            (SMALL * 2, SMALL * 5),
-            (SMALL * 4, SMALL * 8),
-        ]
-        for (
-            enclosure_strokes,
-            enclosure_strokes_strings,
-            enclosure_synthetic_dict,
-            enclosure_min_x,
-            enclosure_max_x,
-            enclosure_min_y,
-            enclosure_max_y,
-        ) in self._generate_drawers_strings_iterator(
-            n_drawers=1,
-            base_heights_and_widths=base_heights_and_widths,
-            stack_float_locations=FLOAT_TOP,
-            generation_probability=1.0,
-        ):
+        stimuli = []
+        if sub_family == DRAWERS_WITH_FEET:
+            for n_feet, foot_primitive, foot_height in sample:
+                (
+                    feet_strokes,
+                    feet_string,
+                    feet_synthetic_dict,
+                ) = self._generate_feet_string(
+                    n_feet,
+                    foot_primitive,
+                    foot_height,
+                    min_x=enclosure_min_x,
+                    max_x=enclosure_max_x,
+                    min_y=enclosure_min_y,
+                    max_y=enclosure_max_y,
+                )
+                drawer_string = connect_strokes([enclosure_stroke_strings, feet_string])
+                synthetic_dict = SyntheticAbstractions()
+                synthetic_dict.merge(enclosure_synthetic_dict)
+                synthetic_dict.merge(enclosure_synthetic_dict)
+                stimuli.append(
+                    (
+                        enclosure_strokes[0] + feet_strokes[0],
+                        drawer_string,
+                        synthetic_dict,
+                    )
+                )
+        elif sub_family == LOUNGES:
+            enclosure_width = enclosure_max_x - enclosure_min_x
+            # Now add pillows.
+            all_seat_back_primitives = self._get_seat_back_primitives()
+            for (
+                seat_back_index,
+                base_height,
+                n_feet,
+                foot_primitive,
+                foot_height,
+            ) in sample:
+                (
+                    seat_back_strokes,
+                    seat_back_strokes_string,
+                    seat_back_synthetic_dict,
+                    _,
+                    _,
+                    _,
+                    _,
+                ) = self._generate_seat_back_string(
+                    all_seat_back_primitives[seat_back_index],
+                    base_height,
+                    enclosure_width,
+                )
+                (
+                    feet_strokes,
+                    feet_string,
+                    feet_synthetic_dict,
+                ) = self._generate_feet_string(
+                    n_feet,
+                    foot_primitive,
+                    foot_height,
+                    min_x=enclosure_min_x,
+                    max_x=enclosure_max_x,
+                    min_y=enclosure_min_y,
+                    max_y=enclosure_max_y,
+                )
+                feet_strokes, feet_string = T_string(
+                    feet_strokes, feet_string, y=float(enclosure_min_y)
+                )
+                drawer_string = connect_strokes(
+                    [
+                        seat_back_strokes_string,
+                        enclosure_stroke_strings,
+                        feet_string,
+                    ]
+                )
+                drawer_synthetic_dict = SyntheticAbstractions()
+                drawer_synthetic_dict.merge(seat_back_synthetic_dict)
+                drawer_synthetic_dict.merge(enclosure_synthetic_dict)
+                drawer_synthetic_dict.merge(feet_synthetic_dict)
+                stimuli.append(
+                    (
+                        seat_back_strokes[0] + enclosure_strokes[0] + feet_strokes[0],
+                        drawer_string,
+                        drawer_synthetic_dict,
+                    )
+                )
+        else:
             enclosure_width = enclosure_max_x - enclosure_min_x
             # Shift it to one side.
-            for shifted_location in [enclosure_width * 0.5, -enclosure_width * 0.5]:
+            shifted_locations = [enclosure_width * 0.5, -enclosure_width * 0.5]
+            for shift_index, n_feet, foot_primitive, foot_height in sample:
                 shifted_enclosure_strokes, shifted_enclosure_string = T_string(
-                    enclosure_strokes, enclosure_strokes_strings, x=shifted_location
+                    enclosure_strokes,
+                    enclosure_stroke_strings,
+                    x=shifted_locations[shift_index],
                 )
 
                 # Generate a seat base.
@@ -628,60 +772,88 @@ class FurnitureProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerato
                     float_locations=[FLOAT_BOTTOM],
                     right_margins=[0],
                 )
-
-                # Add feet.
-                for n_feet in [2]:
-                    for (
-                        feet_strokes,
+                (
+                    feet_strokes,
+                    feet_string,
+                    feet_synthetic_dict,
+                ) = self._generate_feet_string(
+                    n_feet,
+                    foot_primitive,
+                    foot_height,
+                    min_x=seat_min_x,
+                    max_x=seat_max_x,
+                    min_y=seat_min_y,
+                    max_y=seat_max_y,
+                )
+                feet_strokes, feet_string = T_string(
+                    feet_strokes, feet_string, y=float(seat_min_y)
+                )
+                drawer_string = connect_strokes(
+                    [
+                        seat_strokes_string,
+                        shifted_enclosure_string,
                         feet_string,
-                        feet_synthetic_dict,
-                    ) in self._generate_feet_strings_iterator(
-                        n_feet=n_feet,
-                        min_x=seat_min_x,
-                        max_x=seat_max_x,
-                        min_y=seat_min_y,
-                        max_y=seat_max_y,
-                        feet_heights=[SMALL, SMALL * 4],
-                        generation_probability=1.0,
-                    ):
-                        feet_strokes, feet_string = T_string(
-                            feet_strokes, feet_string, y=float(seat_min_y)
-                        )
-                        drawer_strokes = [
-                            seat_strokes[0]
-                            + shifted_enclosure_strokes[0]
-                            + feet_strokes[0]
-                        ]
-                        drawer_string = connect_strokes(
-                            [
-                                seat_strokes_string,
-                                shifted_enclosure_string,
-                                feet_string,
-                            ]
-                        )
-                        drawer_synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
-                        for k in seat_strokes_dict:
-                            drawer_synthetic_dict[k] += seat_strokes_dict[k]
-                        for k in enclosure_synthetic_dict:
-                            drawer_synthetic_dict[k] += enclosure_synthetic_dict[k]
-                        for k in feet_synthetic_dict:
-                            drawer_synthetic_dict[k] += feet_synthetic_dict[k]
-                        if random.uniform(0, 1) > generation_probability:
-                            continue
-
-                        stimuli_strokes += drawer_strokes
-                        stimuli_strings.append(drawer_string)
-                        stroke_dicts.append(drawer_synthetic_dict)
+                    ]
+                )
+                drawer_synthetic_dict = SyntheticAbstractions()
+                drawer_synthetic_dict.merge(seat_strokes_dict)
+                drawer_synthetic_dict.merge(enclosure_synthetic_dict)
+                drawer_synthetic_dict.merge(feet_synthetic_dict)
+                stimuli.append(
+                    (
+                        seat_strokes[0]
+                        + shifted_enclosure_strokes[0]
+                        + feet_strokes[0],
+                        drawer_string,
+                        drawer_synthetic_dict,
+                    )
+                )
+        return stimuli
 
+    def _shuffle_and_split_stimuli_strings(self, descriptors, train_ratio):
+        """Samples and builds descriptors, and shuffles their stimuli before splitting them."""
+        strokes, strings_array = self._build_sampled_descriptors(
+            self._sample_descriptors(descriptors)
+        )
         # Shuffle before returning.
-        stimuli_data = list(zip(stimuli_strokes, stimuli_strings, stroke_dicts))
+        stimuli_data = list(zip(strokes, strings_array))
         random.shuffle(stimuli_data)
-        stimuli_strokes, stimuli_strings, stroke_dicts = zip(*stimuli_data)
+        strokes, strings_array = zip(*stimuli_data)
+        return self._split_stimuli_strings(
+            strokes,
+            train_ratio,
+            strings_array=list(strings_array),
+        )
 
-        return random_sample_ratio_ordered_array(
-            stimuli_strokes,
+    def _generate_parts_stimuli_strings(self, train_ratio=1.0):
+        return self._build_stimuli_from_descriptors(
+            self._generate_parts_descriptors(), train_ratio
+        )
+
+    def _generate_stacked_drawers_stimuli_strings(
+        self, total_drawers=4, train_ratio=1.0, generation_probability=0.45
+    ):
+        return self._shuffle_and_split_stimuli_strings(
+            self._generate_stacked_drawers_descriptors(
+                total_drawers, generation_probability
+            ),
+            train_ratio,
+        )
+
+    def _generate_lounges_stimuli_strings(
+        self, train_ratio=1.0, generation_probability=0.6
+    ):
+        # Generates lounges containing a large base and one or more rectangular pillows on top. Lounges may or may not have an inset drawer.
+        return self._shuffle_and_split_stimuli_strings(
+            self._generate_lounges_descriptors(generation_probability), train_ratio
+        )
+
+    def _generate_seat_drawers_stimuli_strings(
+        self, train_ratio=1.0, generation_probability=0.7
+    ):
+        return self._shuffle_and_split_stimuli_strings(
+            self._generate_seat_drawers_descriptors(generation_probability),
             train_ratio,
-            strings_array=list(zip(stimuli_strings, stroke_dicts)),
         )
 
     def _generate_strokes_strings_for_stimuli(
@@ -719,16 +891,15 @@ class FurnitureProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerato
         max_test=50,
     ):
         # Currently generates all tasks as single entities. Does not generate a curriculum.
-        train_tasks, test_tasks = self._generate_drawing_tasks_from_strokes(
+        return self._generate_drawing_tasks_from_strokes(
             num_tasks_to_generate_per_condition,
             request_type=object_primitives.tstroke,
-            render_parsed_program_fn=object_primitives.render_parsed_program,
+            render_parsed_program_fn=gadgets_compiler.render_parsed_program,
             task_generator_name=self.name,
             train_ratio=train_ratio,
+            max_train=max_train,
+            max_test=max_test,
         )
-        max_train = len(train_tasks) if max_train == None else max_train
-        max_test = len(test_tasks) if max_test == None else max_test
-        return train_tasks[:max_train], test_tasks[:max_test]
 
     def generate_tasks_curriculum(
         self, num_tasks_to_generate_per_condition, train_ratio=0.8
@@ -2,21 +2,35 @@
 gadgets_1k_tasks_generator.py | Author : Catherine Wong and Yoni Friedman.
 Defines a TaskGenerator that produces compositional gadget stimuli. This generator has four separate subclasses: nuts_bolts, furniture, dials, and wheeled_vehicles.
 
-Each subclass has 250 total stimuli: 200 train, and 50 test. 
+Each subclass has 250 total stimuli: 200 train, and 50 test.
+
+Subdomains are generated concurrently in a pool of num_workers processes, and merged into one curriculum with one condition for each subdomain.
 """
 import math, random, itertools
-import primitives.object_primitives as object_primitives
-from dreamcoder.grammar import Grammar
+from primitives.gadgets_primitives import *
 from tasksgenerator.tasks_generator import (
     AbstractTasksGenerator,
-    ManualCurriculumTasksGenerator,
     TasksGeneratorRegistry,
     TaskCurriculum,
-    DrawingTask,
+    get_pool,
+)
+from tasksgenerator.s12_s13_tasks_generator import RANDOM_SEED
+from tasksgenerator.nuts_bolts_programs_tasks_generator import (
+    NutsBoltsProgramsTasksGenerator,
+)
+from tasksgenerator.dial_programs_task_generator import DialProgramsTasksGenerator
+from tasksgenerator.wheels_programs_tasks_generator import (
+    WheelsProgramsTasksGenerator,
+)
+from tasksgenerator.furniture_programs_tasks_generator import (
+    FurnitureProgramsTasksGenerator,
 )
 
 random.seed(RANDOM_SEED)
 
+# Options that are passed on to each subgenerator.
+SUBGENERATOR_OPTIONS = ["dedup_similarity", "stratify_split"]
+
 
 @TasksGeneratorRegistry.register
 class Gadgets1KTasksGenerator(AbstractTasksGenerator):
@@ -25,21 +39,94 @@ class Gadgets1KTasksGenerator(AbstractTasksGenerator):
     name = "gadgets_1k"
 
     def __init__(self):
-        grammar = Grammar.uniform(object_primitives.objects)
         super().__init__(
-            grammar=object_primitives.constants
-            + object_primitives.some_none
-            + object_primitives.objects
-            + object_primitives.transformations
+            grammar=constants + math_operations + some_none + objects + transformations
         )
 
-        self.subgenerator_names = []
+        # Slowest subdomains first, so that they start first in the pool.
+        self.subgenerator_names = [
+            FurnitureProgramsTasksGenerator.name,
+            WheelsProgramsTasksGenerator.name,
+            DialProgramsTasksGenerator.name,
+            NutsBoltsProgramsTasksGenerator.name,
+        ]
+
+    def _generate_subdomains(self, num_tasks_to_generate_per_condition, train_ratio):
+        """Generates the curriculum for each subgenerator, concurrently if there is more than one worker. Each subdomain starts from the current random state, so it is the same as generating that subdomain on its own.
+        :ret: [curriculum for each subgenerator], as returned by TaskCurriculum.get_curriculum."""
+        options = {option: getattr(self, option) for option in SUBGENERATOR_OPTIONS}
+        subdomains = [
+            (
+                subgenerator_name,
+                num_tasks_to_generate_per_condition,
+                train_ratio,
+                random.getstate(),
+                options,
+            )
+            for subgenerator_name in self.subgenerator_names
+        ]
+        num_workers = min(self.num_workers, len(subdomains))
+        if num_workers <= 1:
+            return [
+                _generate_subdomain_curriculum(subdomain) for subdomain in subdomains
+            ]
+        with get_pool(num_workers) as pool:
+            return pool.map(
+                _generate_packed_subdomain_curriculum, subdomains, chunksize=1
+            )
 
-    def generate_tasks_curriculum(self, num_tasks_to_generate_per_condition):
+    def generate_tasks_curriculum(
+        self, num_tasks_to_generate_per_condition, train_ratio=0.8
+    ):
+        """:ret: a curriculum with the train and test tasks of each subgenerator, in a condition for each subgenerator."""
         task_curriculum = TaskCurriculum(
-            curriculum_id=AbstractTasksGenerator.GENERATE_ALL,
+            curriculum_id=num_tasks_to_generate_per_condition,
             task_generator_name=self.name,
+            grammar=self.grammar,
         )
+        for subdomain_curriculum in self._generate_subdomains(
+            num_tasks_to_generate_per_condition, train_ratio
+        ):
+            task_curriculum.add_curriculum(subdomain_curriculum)
+        return task_curriculum
+
+
+def _generate_subdomain_curriculum(subdomain):
+    """Worker function for Gadgets1KTasksGenerator._generate_subdomains. Generates the curriculum of a registered subgenerator from the given random state. Subgenerators build and render their tasks in a single process.
+    :ret: curriculum, as returned by TaskCurriculum.get_curriculum, as plain dicts so that it can be pickled."""
+    (
+        subgenerator_name,
+        num_tasks_to_generate_per_condition,
+        train_ratio,
+        random_state,
+        options,
+    ) = subdomain
+    random.setstate(random_state)
+    subgenerator = TasksGeneratorRegistry[subgenerator_name]
+    for option, value in options.items():
+        setattr(subgenerator, option, value)
+    curriculum = subgenerator.generate_tasks_curriculum(
+        num_tasks_to_generate_per_condition, train_ratio
+    ).get_curriculum()
+    return {
+        split: {
+            condition: dict(curriculum[split][condition])
+            for condition in curriculum[split]
+        }
+        for split in curriculum
+    }
+
+
+def _generate_packed_subdomain_curriculum(subdomain):
+    """Worker function for Gadgets1KTasksGenerator._generate_subdomains in a pool. Tasks are rendered in the worker when they are pickled, and are sent back to the parent process with compact renderings, as renderings are mostly blank."""
+    curriculum = _generate_subdomain_curriculum(subdomain)
+    for task in _get_curriculum_tasks(curriculum):
+        task.compact_rendering = True
+    return curriculum
+
 
-        for subgenerator_name in self.subgenerator_names:
-            subgenerator = TasksGeneratorRegistry[subgenerator_name]
+def _get_curriculum_tasks(curriculum):
+    for split in curriculum:
+        for condition in curriculum[split]:
+            for tasks in curriculum[split][condition].values():
+                yield from tasks
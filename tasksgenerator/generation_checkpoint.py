@@ -0,0 +1,81 @@
+"""
+generation_checkpoint.py | Author : Catherine Wong.
+
+Defines the GenerationCheckpoint, which records the progress of a long generation run so that it can be resumed after it stops partway.
+
+A checkpointed run exports the tasks of its curriculum in shards, in the order of TaskCurriculum.get_all_tasks. Once the synthesis tasks, renders and summaries of a shard are on disk, the checkpoint is saved with:
+    the global random states from before the curriculum was generated, so that a resumed run generates the same curriculum.
+    the position of the next task to export, and the offset of the end of the summaries written so far.
+    a digest of the task names, to check that a resumed run generated the same tasks.
+The checkpoint is written to a temporary file and then moved into place, so a run that stops while saving it keeps the last complete checkpoint.
+"""
+import os
+import random
+import hashlib
+
+import dill
+import numpy as np
+
+
+def get_task_names_digest(task_names):
+    """:ret: hex digest of the task names, in order."""
+    digest = hashlib.sha1()
+    for task_name in task_names:
+        digest.update(task_name.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class GenerationCheckpoint:
+    """
+    GenerationCheckpoint: progress of a checkpointed generation run, saved to checkpoint_file.
+    Use record_random_state before generating a new curriculum, or load and restore_random_state before generating the curriculum of a resumed run.
+    """
+
+    def __init__(self, checkpoint_file):
+        self.checkpoint_file = checkpoint_file
+        self.random_state = None
+        self.numpy_random_state = None
+        self.task_names_digest = None
+        self.position = 0
+        self.summary_offset = 0
+
+    @classmethod
+    def load(cls, checkpoint_file):
+        checkpoint = cls(checkpoint_file)
+        with open(checkpoint_file, "rb") as f:
+            checkpoint.__dict__.update(dill.load(f))
+        checkpoint.checkpoint_file = checkpoint_file
+        return checkpoint
+
+    def record_random_state(self):
+        self.random_state = random.getstate()
+        self.numpy_random_state = np.random.get_state()
+
+    def restore_random_state(self):
+        random.setstate(self.random_state)
+        np.random.set_state(self.numpy_random_state)
+
+    def start(self, task_names):
+        """Checks that the tasks to export are the ones that the checkpoint was saved for, and records them if it is new."""
+        task_names_digest = get_task_names_digest(task_names)
+        if self.task_names_digest is None:
+            self.task_names_digest = task_names_digest
+        elif self.task_names_digest != task_names_digest:
+            raise ValueError(
+                f"Checkpoint {self.checkpoint_file} was saved for different tasks than the generated curriculum."
+            )
+
+    def save(self, position, summary_offset=0):
+        """Records that the tasks before position have been exported, and saves the checkpoint."""
+        self.position = position
+        self.summary_offset = summary_offset
+        temporary_file = self.checkpoint_file + ".tmp"
+        with open(temporary_file, "wb") as f:
+            dill.dump(self.__dict__, f)
+        os.replace(temporary_file, self.checkpoint_file)
+        return self.checkpoint_file
+
+    def remove(self):
+        """Removes the checkpoint once the run is complete."""
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
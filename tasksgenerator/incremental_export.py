@@ -0,0 +1,136 @@
+"""
+incremental_export.py | Author : Catherine Wong.
+
+Defines the IncrementalExport, which records a manifest of the content hash and output files of each exported task, so that a re-run of an export only re-renders and re-writes the tasks that changed.
+
+The content hash of a task (see get_task_content_hash) is computed without rendering it, from:
+    the content hash of its canonical program (see primitives.gadgets_canonicalizer), or of its strokes if it has no program.
+    the program string itself, which is written to the synthesis tasks and summaries.
+    the render function and its default parameters.
+    its generator name and synthetic abstractions and language.
+"""
+import os
+import json
+import inspect
+import hashlib
+
+import numpy as np
+
+from primitives.gadgets_canonicalizer import program_content_hash
+
+MANIFEST_TASKS = "tasks"
+MANIFEST_HASH, MANIFEST_OUTPUTS = "hash", "outputs"
+
+
+def get_render_parameters(render_fn):
+    """:ret: string with the qualified name and default parameters of a render function."""
+    if render_fn is None:
+        return ""
+    name = "{}.{}".format(
+        getattr(render_fn, "__module__", ""),
+        getattr(render_fn, "__qualname__", repr(render_fn)),
+    )
+    try:
+        parameters = inspect.signature(render_fn).parameters.values()
+    except (TypeError, ValueError):
+        return name
+    defaults = [
+        f"{parameter.name}={parameter.default!r}"
+        for parameter in parameters
+        if parameter.default is not inspect.Parameter.empty
+    ]
+    return name + "(" + ",".join(defaults) + ")"
+
+
+def get_task_content_hash(task):
+    """:ret: hex digest of the content of a task, which changes whenever its exported outputs would change."""
+    digest = hashlib.sha1()
+    if task.ground_truth_program is not None:
+        digest.update(program_content_hash(task.ground_truth_program).encode())
+        digest.update(str(task.ground_truth_program).encode())
+    else:
+        for stroke in task.ground_truth_strokes or []:
+            stroke = np.ascontiguousarray(stroke, dtype=float)
+            digest.update(str(stroke.shape).encode())
+            digest.update(stroke.tobytes())
+    digest.update(get_render_parameters(task._get_render_fn()).encode())
+    digest.update(task.task_generator_name.encode())
+    synthetic_abstractions = task.synthetic_abstractions
+    if hasattr(synthetic_abstractions, "to_dict"):
+        synthetic_abstractions = synthetic_abstractions.to_dict()
+    for metadata in [synthetic_abstractions, task.synthetic_language]:
+        digest.update(json.dumps(metadata, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class IncrementalExport:
+    """
+    IncrementalExport: manifest of the exported tasks in manifest_file, from the last export. Tasks are keyed by their export names.
+    Use get_changed_tasks to find the tasks to export, then save the manifest once they have been exported.
+    """
+
+    def __init__(self, manifest_file):
+        self.manifest_file = manifest_file
+        self.previous_tasks = {}
+        if os.path.exists(manifest_file):
+            with open(manifest_file) as f:
+                self.previous_tasks = json.load(f)[MANIFEST_TASKS]
+        self.tasks = {}
+
+    def get_changed_tasks(self, tasks, get_outputs, get_export_name=None):
+        """
+        Records the current hash and outputs of every task.
+        :get_outputs: fn that returns [output files] for a task.
+        :get_export_name: fn that returns the unique name of a task (eg. TaskCurriculum.get_task_export_name). Defaults to the task name.
+        :ret: [tasks] whose hash changed since the last export, or with an output that was not exported or no longer exists.
+        """
+        get_export_name = get_export_name or _get_task_name
+        changed_tasks = []
+        for task in tasks:
+            task_hash, outputs = get_task_content_hash(task), get_outputs(task)
+            export_name = get_export_name(task)
+            self.tasks[export_name] = {
+                MANIFEST_HASH: task_hash,
+                MANIFEST_OUTPUTS: outputs,
+            }
+            previous = self.previous_tasks.get(export_name)
+            if (
+                previous is None
+                or previous[MANIFEST_HASH] != task_hash
+                or not set(outputs) <= set(previous[MANIFEST_OUTPUTS])
+                or not all(os.path.exists(output) for output in outputs)
+            ):
+                changed_tasks.append(task)
+        return changed_tasks
+
+    def get_stale_outputs(self):
+        """:ret: [output files] from the last export that are not outputs of the current tasks."""
+        outputs = {
+            output for task in self.tasks.values() for output in task[MANIFEST_OUTPUTS]
+        }
+        return sorted(
+            {
+                output
+                for task in self.previous_tasks.values()
+                for output in task[MANIFEST_OUTPUTS]
+                if output not in outputs
+            }
+        )
+
+    def remove_stale_outputs(self):
+        """Deletes the stale outputs. :ret: [deleted output files]."""
+        stale_outputs = [
+            output for output in self.get_stale_outputs() if os.path.exists(output)
+        ]
+        for output in stale_outputs:
+            os.remove(output)
+        return stale_outputs
+
+    def save(self):
+        with open(self.manifest_file, "w") as f:
+            json.dump({MANIFEST_TASKS: self.tasks}, f)
+        return self.manifest_file
+
+
+def _get_task_name(task):
+    return task.name
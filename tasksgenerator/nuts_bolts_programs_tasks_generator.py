@@ -6,11 +6,22 @@ Threads program string generating logic through the generation.
 """
 import math, random, itertools, copy
 from primitives.gadgets_primitives import *
+import primitives.gadgets_compiler as gadgets_compiler
 from dreamcoder.grammar import Grammar
 from tasksgenerator.tasks_generator import *
 from tasksgenerator.bases_parts_tasks_generator import *
 from tasksgenerator.s12_s13_tasks_generator import RANDOM_SEED
 
+# Conditions and shapes named in the stimuli descriptors.
+SIMPLE_NUTS, PERFORATED_NUTS = "simple_nuts", "perforated_nuts"
+NUTS_BOLTS_SHAPES = {
+    "c": c_string,
+    "cc": cc_string,
+    "r": r_string,
+    "hexagon": hexagon_string,
+    "octagon": octagon_string,
+}
+
 
 @TasksGeneratorRegistry.register
 class NutsBoltsProgramsTasksGenerator(AbstractTasksGenerator):
@@ -23,97 +34,112 @@ class NutsBoltsProgramsTasksGenerator(AbstractTasksGenerator):
             grammar=constants + math_operations + objects + transformations
         )
 
-    def _generate_simple_nuts_stimuli_strings(self, train_ratio):
-        """Generates simple nuts: up to two nested shapes on the outer edge, and no perforations. Generates train and test. Also generates strings. See: nuts_bolts_tasks_generator._generate_simple_nuts_stimuli for original implementation."""
-        all_strokes = []
-        all_strokes_strings = []
-        all_synthetic = []
+    def _generate_simple_nuts_descriptors(self):
+        """Yields descriptors for simple nuts: up to two nested shapes on the outer edge, and no perforations."""
         base_size = LARGE
         for outer_shapes in [
-            [cc_string],
-            [cc_string, cc_string],
-            [hexagon_string],
-            [hexagon_string, hexagon_string],
-            [octagon_string],
+            ["cc"],
+            ["cc", "cc"],
+            ["hexagon"],
+            ["hexagon", "hexagon"],
+            ["octagon"],
         ]:
-            # Note: in theory we could thread these calculations through as strings. For now we do not.
             for outer_shapes_min_size in [base_size * n for n in [1, 2]]:
-                for inner_shapes in [[cc_string], [hexagon_string], [r_string]]:
+                for inner_shapes in [["cc"], ["hexagon"], ["r"]]:
                     for inner_shapes_max_size in [
                         outer_shapes_min_size * scale
                         for scale in [SCALE_UNIT, QUARTER_SCALE]
                     ]:
-                        (
-                            object_strokes,
-                            stroke_strings,
-                            synthetic_dict,
-                            height,
-                            height_strings,
-                        ) = self._generate_perforated_shapes_string(
-                            outer_shapes=outer_shapes,
-                            outer_shapes_min_size=f"{outer_shapes_min_size:g}",
-                            inner_shapes=inner_shapes,
-                            inner_shapes_max_size=f"{inner_shapes_max_size:g}",
-                            n_decorators=str(0),
+                        yield (
+                            SIMPLE_NUTS,
+                            (
+                                ("outer_shapes", tuple(outer_shapes)),
+                                ("outer_shapes_min_size", f"{outer_shapes_min_size:g}"),
+                                ("inner_shapes", tuple(inner_shapes)),
+                                ("inner_shapes_max_size", f"{inner_shapes_max_size:g}"),
+                                ("n_decorators", str(0)),
+                            ),
                         )
-                        all_strokes += object_strokes
-                        all_strokes_strings.append(stroke_strings)
-                        all_synthetic.append(synthetic_dict)
-
-        return random_sample_ratio_ordered_array(
-            all_strokes,
-            train_ratio,
-            strings_array=list(zip(all_strokes_strings, all_synthetic)),
-        )
 
-    def _generate_perforated_nuts_stimuli_strings(self, train_ratio):
-        """Generates nuts with perforated 'decorators' around the center. Also generates strings. See: nuts_bolts_tasks_generator._generate_perforated_nuts_stimuli for original implementation."""
-        all_strokes = []
-        all_strokes_strings = []
-        all_synthetic = []
+    def _generate_perforated_nuts_descriptors(self):
+        """Yields descriptors for nuts with perforated 'decorators' around the center."""
         base_size = LARGE
         for outer_shapes in [
-            [cc_string],
-            [hexagon_string],
-            [octagon_string],
-            [hexagon_string, hexagon_string],
+            ["cc"],
+            ["hexagon"],
+            ["octagon"],
+            ["hexagon", "hexagon"],
         ]:
             for outer_shapes_min_size in [base_size * n for n in [2]]:
-                for inner_shapes in [[cc_string], [hexagon_string], [r_string]]:
+                for inner_shapes in [["cc"], ["hexagon"], ["r"]]:
                     for inner_shapes_max_size in [
                         outer_shapes_min_size * scale
                         for scale in [SCALE_UNIT, QUARTER_SCALE]
                     ]:
-                        for decorator_shape in [c_string, r_string]:
+                        for decorator_shape in ["c", "r"]:
                             for decorator_size in [SCALE_UNIT]:
                                 for n_decorators in [2, 4, 6, 8]:
                                     decorator_displacement = (
                                         f"(* {inner_shapes_max_size:g} {MEDIUM})"
                                     )
-                                    (
-                                        object_strokes,
-                                        stroke_strings,
-                                        synthetic_dict,
-                                        height,
-                                        height_strings,
-                                    ) = self._generate_perforated_shapes_string(
-                                        outer_shapes=outer_shapes,
-                                        outer_shapes_min_size=f"{outer_shapes_min_size:g}",
-                                        inner_shapes=inner_shapes,
-                                        inner_shapes_max_size=f"{inner_shapes_max_size:g}",
-                                        n_decorators=str(n_decorators),
-                                        decorator_shape=decorator_shape,
-                                        decorator_size=f"{decorator_size:g}",
-                                        decorator_displacement=decorator_displacement,
+                                    yield (
+                                        PERFORATED_NUTS,
+                                        (
+                                            ("outer_shapes", tuple(outer_shapes)),
+                                            (
+                                                "outer_shapes_min_size",
+                                                f"{outer_shapes_min_size:g}",
+                                            ),
+                                            ("inner_shapes", tuple(inner_shapes)),
+                                            (
+                                                "inner_shapes_max_size",
+                                                f"{inner_shapes_max_size:g}",
+                                            ),
+                                            ("n_decorators", str(n_decorators)),
+                                            ("decorator_shape", decorator_shape),
+                                            ("decorator_size", f"{decorator_size:g}"),
+                                            (
+                                                "decorator_displacement",
+                                                decorator_displacement,
+                                            ),
+                                        ),
                                     )
-                                    all_strokes += object_strokes
-                                    all_strokes_strings.append(stroke_strings)
-                                    all_synthetic.append(synthetic_dict)
 
-        return random_sample_ratio_ordered_array(
-            all_strokes,
-            train_ratio,
-            strings_array=list(zip(all_strokes_strings, all_synthetic)),
+    def _generate_stimuli_descriptors(self):
+        yield from self._generate_simple_nuts_descriptors()
+        yield from self._generate_perforated_nuts_descriptors()
+
+    def _build_stimuli(self, descriptor, sample):
+        """Builds a nut from its descriptor with _generate_perforated_shapes_string. Nuts make no draws. :ret: [(strokes, program string, SyntheticAbstractions)]."""
+        _, parameters = descriptor
+        parameters = dict(parameters)
+        for shapes_parameter in ["outer_shapes", "inner_shapes"]:
+            parameters[shapes_parameter] = [
+                NUTS_BOLTS_SHAPES[shape] for shape in parameters[shapes_parameter]
+            ]
+        if "decorator_shape" in parameters:
+            parameters["decorator_shape"] = NUTS_BOLTS_SHAPES[
+                parameters["decorator_shape"]
+            ]
+        (
+            object_strokes,
+            stroke_strings,
+            synthetic_dict,
+            height,
+            height_strings,
+        ) = self._generate_perforated_shapes_string(**parameters)
+        return [(object_strokes[0], stroke_strings, synthetic_dict)]
+
+    def _generate_simple_nuts_stimuli_strings(self, train_ratio):
+        """Generates simple nuts: up to two nested shapes on the outer edge, and no perforations. Generates train and test. Also generates strings. See: nuts_bolts_tasks_generator._generate_simple_nuts_stimuli for original implementation."""
+        return self._build_stimuli_from_descriptors(
+            self._generate_simple_nuts_descriptors(), train_ratio
+        )
+
+    def _generate_perforated_nuts_stimuli_strings(self, train_ratio):
+        """Generates nuts with perforated 'decorators' around the center. Also generates strings. See: nuts_bolts_tasks_generator._generate_perforated_nuts_stimuli for original implementation."""
+        return self._build_stimuli_from_descriptors(
+            self._generate_perforated_nuts_descriptors(), train_ratio
         )
 
     def _generate_dsl_primitives(self, train_ratio):
@@ -158,12 +184,13 @@ class NutsBoltsProgramsTasksGenerator(AbstractTasksGenerator):
                                         all_synthetic.append(synthetic_dict)
                                     except:
                                         continue
-        return random_sample_ratio_ordered_array(
+        return self._split_stimuli_strings(
             all_strokes,
             train_ratio,
             strings_array=list(zip(all_strokes_strings, all_synthetic)),
         )
 
+    @memoized_part("perforated_shape")
     def _generate_perforated_shapes_string(
         self,
         outer_shapes=[c_string],
@@ -187,7 +214,7 @@ class NutsBoltsProgramsTasksGenerator(AbstractTasksGenerator):
         """
         object_strokes, object_strings, object_synthetic = [], [], []
 
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
         # Place outer shapes.
         outer_shape_size = peval(outer_shapes_min_size)
         # # Note: catwong: we don't currently express the looped computation in loop.
@@ -322,16 +349,15 @@ class NutsBoltsProgramsTasksGenerator(AbstractTasksGenerator):
         max_test=50,
     ):
         # Currently generates all tasks as single entities. Does not generate a curriculum.
-        train_tasks, test_tasks = self._generate_drawing_tasks_from_strokes(
+        return self._generate_drawing_tasks_from_strokes(
             num_tasks_to_generate_per_condition,
             request_type=object_primitives.tstroke,
-            render_parsed_program_fn=object_primitives.render_parsed_program,
+            render_parsed_program_fn=gadgets_compiler.render_parsed_program,
             task_generator_name=self.name,
             train_ratio=train_ratio,
+            max_train=max_train,
+            max_test=max_test,
         )
-        max_train = len(train_tasks) if max_train == None else max_train
-        max_test = len(test_tasks) if max_test == None else max_test
-        return train_tasks[:max_train], test_tasks[:max_test]
 
     def generate_tasks_curriculum(
         self, num_tasks_to_generate_per_condition, train_ratio=0.8
@@ -6,6 +6,7 @@ Threads a simple synthetic language generator through the tasks.
 """
 import math, random, itertools, copy
 from primitives.gadgets_primitives import *
+import primitives.gadgets_compiler as gadgets_compiler
 from dreamcoder.grammar import Grammar
 from tasksgenerator.tasks_generator import *
 from tasksgenerator.bases_parts_tasks_generator import *
@@ -312,17 +313,16 @@ class NutsBoltsSyntheticLanguageTasksGenerator(AbstractTasksGenerator):
         max_test=50,
     ):
         # Currently generates all tasks as single entities. Does not generate a curriculum.
-        train_tasks, test_tasks = self._generate_drawing_tasks_from_strokes(
+        return self._generate_drawing_tasks_from_strokes(
             num_tasks_to_generate_per_condition,
             request_type=object_primitives.tstroke,
-            render_parsed_program_fn=object_primitives.render_parsed_program,
+            render_parsed_program_fn=gadgets_compiler.render_parsed_program,
             task_generator_name=self.name,
             train_ratio=train_ratio,
             use_object_shapes=True,
+            max_train=max_train,
+            max_test=max_test,
         )
-        max_train = len(train_tasks) if max_train == None else max_train
-        max_test = len(test_tasks) if max_test == None else max_test
-        return train_tasks[:max_train], test_tasks[:max_test]
 
     def generate_tasks_curriculum(
         self, num_tasks_to_generate_per_condition, train_ratio=0.8
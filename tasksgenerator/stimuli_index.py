@@ -0,0 +1,163 @@
+"""
+stimuli_index.py | Author : Catherine Wong.
+
+Defines the StimuliIndex, which finds duplicate and near-duplicate stimuli as they are generated and before they are rendered.
+
+Each stimulus is indexed by:
+    the content hash of its canonical program (see primitives.gadgets_canonicalizer), which matches programs that draw the same strokes.
+    a perceptual hash of the pixels that its strokes pass through on the synthesis canvas, which matches stimuli that render the same.
+    the cells that its strokes pass through on a coarser grid. Stimuli whose cells have a Jaccard similarity of at least the index similarity are near-duplicates.
+
+Near-duplicates are found with prefix filtering. The cells of each stimulus are ordered by a fixed global order, and only the first few are indexed. Any two sets of cells with a Jaccard similarity of at least s share one of these indexed cells, so each new stimulus is only compared with the stimuli that share an indexed cell with it rather than with every stimulus.
+"""
+import math
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+
+from primitives.gadgets_canonicalizer import program_content_hash
+
+# Canvas as rendered by object_primitives.render_stroke_arrays_to_canvas.
+PERCEPTUAL_GRID_SIZE = 512
+PERCEPTUAL_EXTENT = 28.0  # Canvas width and height in stroke coordinates.
+# Points sampled along each segment per cell that it crosses.
+PERCEPTUAL_SAMPLES_PER_CELL = 2
+
+# Near-duplicates are compared on a coarser grid, so that each cell fits in 16 bits.
+NEAR_DUPLICATE_GRID_SIZE = 256
+CELL_ORDER_SEED = 0
+
+# Fixed global order of the coarse cells used for prefix filtering.
+CELL_RANKS = np.random.RandomState(CELL_ORDER_SEED).permutation(
+    NEAR_DUPLICATE_GRID_SIZE * NEAR_DUPLICATE_GRID_SIZE
+)
+
+
+def get_perceptual_cells(
+    strokes, grid_size=PERCEPTUAL_GRID_SIZE, extent=PERCEPTUAL_EXTENT
+):
+    """:ret: sorted array of the indices of the cells of a grid_size x grid_size grid over the canvas that the strokes pass through."""
+    cell_size = extent / grid_size
+    cells = []
+    for stroke in strokes:
+        stroke = np.asarray(stroke, dtype=float)
+        if len(stroke) == 0:
+            continue
+        points = stroke
+        if len(stroke) > 1:
+            # Sample points along each segment so that no crossed cell is skipped.
+            starts, ends = stroke[:-1], stroke[1:]
+            n_samples = np.ceil(
+                np.linalg.norm(ends - starts, axis=1)
+                / cell_size
+                * PERCEPTUAL_SAMPLES_PER_CELL
+            ).astype(int)
+            n_samples = np.maximum(n_samples, 1)
+            segments = np.repeat(np.arange(len(starts)), n_samples)
+            offsets = np.arange(n_samples.sum()) - np.repeat(
+                np.cumsum(n_samples) - n_samples, n_samples
+            )
+            t = (offsets / n_samples[segments])[:, np.newaxis]
+            points = starts[segments] + t * (ends - starts)[segments]
+            points = np.concatenate([points, stroke[-1:]])
+        xy = np.floor((points + extent / 2) / cell_size).astype(int)
+        xy = np.clip(xy, 0, grid_size - 1)
+        cells.append(xy[:, 1] * grid_size + xy[:, 0])
+    if len(cells) == 0:
+        return np.zeros(0, dtype=int)
+    return np.unique(np.concatenate(cells))
+
+
+def downsample_cells(cells, grid_size, coarse_grid_size):
+    """:ret: sorted array of the cells of a coarse_grid_size grid that contain the cells of the finer grid_size grid."""
+    scale = grid_size // coarse_grid_size
+    y, x = cells // grid_size // scale, cells % grid_size // scale
+    return np.unique(y * coarse_grid_size + x)
+
+
+class StimuliIndex:
+    """
+    StimuliIndex: incremental index of stimuli that finds whether each new stimulus duplicates one that was already added.
+    :similarity: Jaccard similarity of the perceptual cells at or above which two stimuli are near-duplicates. At 1.0, only stimuli with the same cells or the same canonical program are duplicates.
+    """
+
+    def __init__(self, similarity=1.0):
+        self.similarity = similarity
+        self._program_hashes = {}
+        self._perceptual_hashes = {}
+        self._prefix_index = defaultdict(list)
+        # Coarse cells of each stimulus, only kept to find near-duplicates.
+        self._cells = {}
+        self._num_stimuli = 0
+        self.num_duplicates = 0
+
+    def __len__(self):
+        return self._num_stimuli
+
+    def _get_prefix_length(self, num_cells):
+        """:ret: the number of cells to index so that sets with at least this similarity share an indexed cell."""
+        return num_cells - math.ceil(self.similarity * num_cells - 1e-9) + 1
+
+    def _find_near_duplicate(self, cells, ranked_cells):
+        num_cells = len(cells)
+        compared = set()
+        for rank in ranked_cells[: self._get_prefix_length(num_cells)]:
+            for stimulus_id in self._prefix_index.get(rank, []):
+                if stimulus_id in compared:
+                    continue
+                compared.add(stimulus_id)
+                other_cells = self._cells[stimulus_id]
+                if not (
+                    self.similarity * num_cells
+                    <= len(other_cells)
+                    <= num_cells / self.similarity
+                ):
+                    continue
+                intersection = len(
+                    np.intersect1d(cells, other_cells, assume_unique=True)
+                )
+                union = num_cells + len(other_cells) - intersection
+                if intersection >= self.similarity * union:
+                    return stimulus_id
+        return None
+
+    def add(self, strokes, program=None):
+        """
+        Adds a stimulus unless it duplicates one that is already in the index.
+        :program: program string or Program for the strokes, if there is one.
+        :ret: the id of the stimulus that it duplicates, or None if it was added. Added stimuli are numbered from 0.
+        """
+        program_hash = None
+        if program is not None:
+            program_hash = program_content_hash(program, sort_connects=True)
+            if program_hash in self._program_hashes:
+                self.num_duplicates += 1
+                return self._program_hashes[program_hash]
+
+        pixels = get_perceptual_cells(strokes)
+        perceptual_hash = hashlib.sha1(pixels.tobytes()).digest()
+        duplicate_id = self._perceptual_hashes.get(perceptual_hash)
+
+        cells, ranked_cells = None, None
+        if self.similarity < 1.0:
+            cells = downsample_cells(
+                pixels, PERCEPTUAL_GRID_SIZE, NEAR_DUPLICATE_GRID_SIZE
+            ).astype(np.uint16)
+            ranked_cells = np.sort(CELL_RANKS[cells])
+            if duplicate_id is None and len(cells) > 0:
+                duplicate_id = self._find_near_duplicate(cells, ranked_cells)
+        if duplicate_id is not None:
+            self.num_duplicates += 1
+            return duplicate_id
+
+        stimulus_id = self._num_stimuli
+        self._num_stimuli += 1
+        if program_hash is not None:
+            self._program_hashes[program_hash] = stimulus_id
+        self._perceptual_hashes[perceptual_hash] = stimulus_id
+        if cells is not None:
+            self._cells[stimulus_id] = cells
+            for rank in ranked_cells[: self._get_prefix_length(len(cells))]:
+                self._prefix_index[rank].append(stimulus_id)
+        return None
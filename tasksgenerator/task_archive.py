@@ -0,0 +1,160 @@
+"""
+task_archive.py | Author : Catherine Wong.
+
+Defines the sharded archive format for exporting DrawingTasks, as an alternative to one dill pickle per task.
+
+An archive is a directory with an index file and a few shards. Each shard holds up to TASKS_PER_SHARD tasks as:
+    a dill pickle of the records of its tasks (see DrawingTask.get_record), which have every attribute of the task except its rendering.
+    the packed renderings of its tasks (see pack_rendering) as two .npy arrays, the nonzero pixel indices and values of every task concatenated. These are memory-mapped when they are loaded.
+The index has the export name, shard and position of each task, and the offsets and shapes of the renderings in each shard.
+
+TaskArchive loads tasks lazily: a shard of records is only unpickled when one of its tasks is first loaded, and each rendering is only read from the memory-mapped arrays when it is used.
+"""
+import os
+import json
+import itertools
+
+import dill
+import numpy as np
+
+from tasksgenerator.tasks_generator import DrawingTask
+
+TASKS_PER_SHARD = 1024
+ARCHIVE_INDEX = "index.json"
+SHARD_PREFIX = "shard"
+RECORDS_EXTENSION = ".pkl"
+INDICES_SUFFIX, VALUES_SUFFIX = "_indices.npy", "_values.npy"
+
+INDEX_TASKS, INDEX_SHARDS = "tasks", "shards"
+SHARD_NAME, SHARD_OFFSETS, SHARD_SHAPES = "name", "offsets", "shapes"
+
+
+def is_task_archive(archive_dir):
+    return os.path.exists(os.path.join(archive_dir, ARCHIVE_INDEX))
+
+
+def write_task_archive(
+    tasks, archive_dir, tasks_per_shard=TASKS_PER_SHARD, get_export_name=None
+):
+    """
+    Writes the tasks to a sharded archive in archive_dir. Tasks that have not been rendered yet are rendered as they are written.
+    :get_export_name: function from a task to the name it is indexed under (eg. TaskCurriculum.get_task_export_name), so that tasks with the same name in different splits can both be loaded. Defaults to the task name.
+    :ret: number of tasks written.
+    """
+    get_export_name = get_export_name or _get_task_name
+    os.makedirs(archive_dir, exist_ok=True)
+    index = {INDEX_TASKS: [], INDEX_SHARDS: []}
+    tasks = iter(tasks)
+    for shard_idx in itertools.count():
+        shard_tasks = list(itertools.islice(tasks, tasks_per_shard))
+        if len(shard_tasks) == 0:
+            break
+        shard_name = f"{SHARD_PREFIX}_{str.zfill(str(shard_idx), 3)}"
+        records, packed_renderings = [], []
+        for record_idx, task in enumerate(shard_tasks):
+            records.append(task.get_record())
+            packed_renderings.append(task.packed_rendering)
+            index[INDEX_TASKS].append([get_export_name(task), shard_idx, record_idx])
+
+        shard_path = os.path.join(archive_dir, shard_name)
+        with open(shard_path + RECORDS_EXTENSION, "wb") as f:
+            dill.dump(records, f)
+        np.save(
+            shard_path + INDICES_SUFFIX,
+            np.concatenate([indices for _, indices, _ in packed_renderings]),
+        )
+        np.save(
+            shard_path + VALUES_SUFFIX,
+            np.concatenate([values for _, _, values in packed_renderings]),
+        )
+        offsets = np.cumsum([0] + [len(indices) for _, indices, _ in packed_renderings])
+        index[INDEX_SHARDS].append(
+            {
+                SHARD_NAME: shard_name,
+                SHARD_OFFSETS: offsets.tolist(),
+                SHARD_SHAPES: [list(shape) for shape, _, _ in packed_renderings],
+            }
+        )
+    with open(os.path.join(archive_dir, ARCHIVE_INDEX), "w") as f:
+        json.dump(index, f)
+    return len(index[INDEX_TASKS])
+
+
+class TaskArchive:
+    """
+    TaskArchive: lazy loader for an archive from write_task_archive.
+    Loaded tasks have compact renderings that are unpacked from the memory-mapped shard arrays on access.
+    """
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        with open(os.path.join(archive_dir, ARCHIVE_INDEX)) as f:
+            index = json.load(f)
+        self._task_locations = [tuple(location) for location in index[INDEX_TASKS]]
+        self._task_indices = {}
+        for task_idx, (export_name, _, _) in enumerate(self._task_locations):
+            self._task_indices.setdefault(export_name, task_idx)
+        self._shards = index[INDEX_SHARDS]
+        self._shard_records = {}
+        self._shard_renderings = {}
+        self._tasks = {}
+
+    def __len__(self):
+        return len(self._task_locations)
+
+    def __contains__(self, export_name):
+        return export_name in self._task_indices
+
+    def __iter__(self):
+        for task_idx in range(len(self)):
+            yield self.load_task_at(task_idx)
+
+    def get_task_names(self):
+        """:ret: the export names of the tasks, in archive order."""
+        return [export_name for export_name, _, _ in self._task_locations]
+
+    def load_task(self, export_name):
+        return self.load_task_at(self._task_indices[export_name])
+
+    def load_tasks(self, export_names):
+        return [self.load_task(export_name) for export_name in export_names]
+
+    def load_task_at(self, task_idx):
+        """:ret: the DrawingTask at task_idx in the archive, which is only built the first time that it is loaded."""
+        if task_idx not in self._tasks:
+            _, shard_idx, record_idx = self._task_locations[task_idx]
+            task = DrawingTask.__new__(DrawingTask)
+            task.__setstate__(self._get_records(shard_idx)[record_idx])
+            task._compact_rendering = True
+            task._rendering = self._get_packed_rendering(shard_idx, record_idx)
+            self._tasks[task_idx] = task
+        return self._tasks[task_idx]
+
+    def _get_records(self, shard_idx):
+        if shard_idx not in self._shard_records:
+            shard_path = os.path.join(
+                self.archive_dir, self._shards[shard_idx][SHARD_NAME]
+            )
+            with open(shard_path + RECORDS_EXTENSION, "rb") as f:
+                self._shard_records[shard_idx] = dill.load(f)
+        return self._shard_records[shard_idx]
+
+    def _get_packed_rendering(self, shard_idx, record_idx):
+        shard = self._shards[shard_idx]
+        if shard_idx not in self._shard_renderings:
+            shard_path = os.path.join(self.archive_dir, shard[SHARD_NAME])
+            self._shard_renderings[shard_idx] = (
+                np.load(shard_path + INDICES_SUFFIX, mmap_mode="r"),
+                np.load(shard_path + VALUES_SUFFIX, mmap_mode="r"),
+            )
+        indices, values = self._shard_renderings[shard_idx]
+        start, end = shard[SHARD_OFFSETS][record_idx : record_idx + 2]
+        return (
+            tuple(shard[SHARD_SHAPES][record_idx]),
+            indices[start:end],
+            values[start:end],
+        )
+
+
+def _get_task_name(task):
+    return task.name
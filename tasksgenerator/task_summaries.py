@@ -0,0 +1,171 @@
+"""
+task_summaries.py | Author : Catherine Wong.
+
+Streaming writers and readers for the task summaries from TaskCurriculum.iter_curriculum_tasks_csv_summary.
+
+Summaries are written one row at a time as the tasks are summarized, in one of two formats:
+    csv: one CSV file with a column for each summary field, as read by the scripts in data/.
+    columnar: a directory with one JSONL file for each summary field, with one JSON value on each line for each task. Scripts can read only the columns that they need with read_summary_columns.
+
+The ground truth strokes can be written to a binary .npz sidecar instead of as strings in the summary. The sidecar has the stroke points of every task in summary order, and is read back with load_strokes_sidecar.
+"""
+import os
+import csv
+import json
+
+import numpy as np
+
+CSV_FORMAT = "csv"
+COLUMNAR_FORMAT = "columnar"
+SUMMARY_FORMATS = [CSV_FORMAT, COLUMNAR_FORMAT]
+
+STROKES_COLUMN = "ground_truth_strokes"
+STROKES_SIDECAR_SUFFIX = "_strokes.npz"
+COLUMN_EXTENSION = ".jsonl"
+
+SIDECAR_POINTS = "points"
+SIDECAR_STROKE_OFFSETS = "stroke_offsets"
+SIDECAR_TASK_OFFSETS = "task_offsets"
+
+
+class StrokesSidecar:
+    """
+    StrokesSidecar: stroke points of each task, kept as references until they are saved as one .npz file.
+    The file has the points of every stroke concatenated, the offset of each stroke into the points, and the offset of each task into the strokes.
+    """
+
+    def __init__(self):
+        self._strokes = []
+        self._task_offsets = [0]
+
+    def add(self, strokes):
+        """Adds the strokes of the next task."""
+        self._strokes += [
+            np.asarray(stroke, dtype=float).reshape(-1, 2) for stroke in strokes
+        ]
+        self._task_offsets.append(len(self._strokes))
+
+    def save(self, sidecar_file):
+        stroke_lengths = [len(stroke) for stroke in self._strokes]
+        np.savez(
+            sidecar_file,
+            **{
+                SIDECAR_POINTS: np.concatenate(self._strokes + [np.zeros((0, 2))]),
+                SIDECAR_STROKE_OFFSETS: np.cumsum([0] + stroke_lengths),
+                SIDECAR_TASK_OFFSETS: np.array(self._task_offsets),
+            },
+        )
+        return sidecar_file
+
+
+def load_strokes_sidecar(sidecar_file):
+    """:ret: [[array of stroke points] for each task] from a StrokesSidecar file, in summary order."""
+    with np.load(sidecar_file) as sidecar:
+        points = sidecar[SIDECAR_POINTS]
+        stroke_offsets = sidecar[SIDECAR_STROKE_OFFSETS]
+        task_offsets = sidecar[SIDECAR_TASK_OFFSETS]
+    strokes = [
+        points[start:end] for start, end in zip(stroke_offsets[:-1], stroke_offsets[1:])
+    ]
+    return [
+        strokes[start:end] for start, end in zip(task_offsets[:-1], task_offsets[1:])
+    ]
+
+
+def get_strokes_sidecar_file(summary_file):
+    """:ret: the sidecar file for a summary file or directory."""
+    return os.path.splitext(summary_file)[0] + STROKES_SIDECAR_SUFFIX
+
+
+def _pop_strokes(summary, strokes_sidecar):
+    if strokes_sidecar is not None:
+        (strokes,) = summary.pop(STROKES_COLUMN)
+        strokes_sidecar.add(strokes)
+    return summary
+
+
+def write_csv_summaries(summaries, summary_file, strokes_sidecar=False):
+    """
+    Writes each summary as a CSV row as it is produced. The columns are the fields of the first summary.
+    :strokes_sidecar: if True, writes the strokes to the sidecar (see get_strokes_sidecar_file) instead of the CSV.
+    :ret: number of summaries written.
+    """
+    sidecar = StrokesSidecar() if strokes_sidecar else None
+    summaries = iter(summaries)
+    num_summaries = 0
+    with open(summary_file, "w", encoding="utf8", newline="") as f:
+        for summary in summaries:
+            summary = _pop_strokes(summary, sidecar)
+            if num_summaries == 0:
+                fc = csv.DictWriter(f, fieldnames=summary.keys())
+                fc.writeheader()
+            fc.writerow(summary)
+            num_summaries += 1
+    if sidecar is not None:
+        sidecar.save(get_strokes_sidecar_file(summary_file))
+    return num_summaries
+
+
+def append_csv_summaries(summaries, summary_file, offset=0):
+    """
+    Appends each summary as a CSV row as it is produced, after truncating summary_file to offset, so that an export can continue from an earlier offset. Writes the header if offset is 0. The rows are the same as those from write_csv_summaries.
+    :offset: a position in summary_file returned by an earlier call, or 0 to start a new file.
+    :ret: offset of the end of summary_file.
+    """
+    with open(summary_file, "r+" if offset else "w", encoding="utf8", newline="") as f:
+        f.seek(offset)
+        f.truncate()
+        fc = None
+        for summary in summaries:
+            if fc is None:
+                fc = csv.DictWriter(f, fieldnames=summary.keys())
+                if offset == 0:
+                    fc.writeheader()
+            fc.writerow(summary)
+        return f.tell()
+
+
+def write_columnar_summaries(summaries, summary_dir):
+    """
+    Writes each field of the summaries to its own JSONL column in summary_dir as the summaries are produced. The strokes are always written to the sidecar (see get_strokes_sidecar_file).
+    :ret: number of summaries written.
+    """
+    os.makedirs(summary_dir, exist_ok=True)
+    sidecar = StrokesSidecar()
+    columns = {}
+    num_summaries = 0
+    try:
+        for summary in summaries:
+            summary = _pop_strokes(summary, sidecar)
+            if num_summaries == 0:
+                columns = {
+                    column: open(
+                        os.path.join(summary_dir, column + COLUMN_EXTENSION), "w"
+                    )
+                    for column in summary
+                }
+            for column, value in summary.items():
+                columns[column].write(json.dumps(value, default=_to_json) + "\n")
+            num_summaries += 1
+    finally:
+        for column_file in columns.values():
+            column_file.close()
+    sidecar.save(get_strokes_sidecar_file(summary_dir))
+    return num_summaries
+
+
+def read_summary_columns(summary_dir, columns):
+    """:ret: {column : [value for each task]} for only the given columns of a columnar summary."""
+    column_values = {}
+    for column in columns:
+        with open(os.path.join(summary_dir, column + COLUMN_EXTENSION)) as f:
+            column_values[column] = [json.loads(line) for line in f]
+    return column_values
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
@@ -1,25 +1,76 @@
 """tasks_generator.py | Author: Catherine Wong
 
 Defines the AbstractTasksGenerator class for generative models that return curricula of DrawingTasks.
-Defines the TasksGeneratorRegistry for registering and using new TasksGenerators.
+Defines the TasksGeneratorRegistry for registering and using new TasksGenerators. New generator modules should be added to TASKS_GENERATOR_MODULES, so that the registry can import them when they are used.
 
 Defines the DrawingTask and DrawingTaskCurriculum classes.
 """
 import datetime
 import numpy as np
-from collections import defaultdict
-from class_registry import ClassRegistry
+from collections import defaultdict, deque, OrderedDict
+from class_registry import ClassRegistry, RegistryKeyError
 from dreamcoder.utilities import NEGATIVEINFINITY
 from dreamcoder.task import Task
 from dreamcoder.grammar import Grammar
 from dreamcoder.program import VERBOSITY_0, VERBOSITY_1, Program
 import math, random, itertools, copy
+import functools
+import hashlib
+import importlib
+import inspect
+import multiprocessing
+import threading
+from tasksgenerator.stimuli_index import StimuliIndex
+from tasksgenerator.curriculum_index import CurriculumIndex
 
 DEFAULT_DRAWING_TASK_GENERATOR = "drawing"
 PROGRAMS_NAME = "programs"  # If in name, this has programs.
 SYNTHETIC_NAME = "synthetic"  # If in name, this has synthetic language.
 
-TasksGeneratorRegistry = ClassRegistry("name", unique=True)
+# Module that registers each TasksGenerator, imported by TasksGeneratorRegistry when the generator is first used.
+TASKS_GENERATOR_MODULES = {
+    "abstract_bases_parts": "tasksgenerator.bases_parts_tasks_generator",
+    "abstract_bases_parts_programs": "tasksgenerator.abstract_bases_parts_programs_tasks_generator",
+    "simple_antenna": "tasksgenerator.antenna_tasks_generator",
+    "dials": "tasksgenerator.dial_tasks_generator",
+    "simple_dial": "tasksgenerator.dial_tasks_generator",
+    "dials_programs": "tasksgenerator.dial_programs_task_generator",
+    "furniture": "tasksgenerator.furniture_tasks_generator",
+    "furniture_programs": "tasksgenerator.furniture_programs_tasks_generator",
+    "normal_furniture": "tasksgenerator.normal_furniture_tasks_generator",
+    "gadgets_1k": "tasksgenerator.gadgets_1k_tasks_generator",
+    "nuts_bolts": "tasksgenerator.nuts_bolts_tasks_generator",
+    "nuts_bolts_programs": "tasksgenerator.nuts_bolts_programs_tasks_generator",
+    "nuts_bolts_synthetic": "tasksgenerator.nuts_bolts_synthetic_language_tasks_generator",
+    "wheels": "tasksgenerator.wheels_tasks_generator",
+    "wheels_programs": "tasksgenerator.wheels_programs_tasks_generator",
+    "S12_stochastic": "tasksgenerator.s12_s13_tasks_generator",
+    "S13_stochastic": "tasksgenerator.s12_s13_tasks_generator",
+    "S12_S13_test": "tasksgenerator.s12_s13_tasks_generator",
+    "S14": "tasksgenerator.s14_s15_tasks_generator",
+    "S15": "tasksgenerator.s14_s15_tasks_generator",
+    "S14_S15_union": "tasksgenerator.s14_s15_tasks_generator",
+    "S14_S15_curriculum_intersection": "tasksgenerator.s14_s15_tasks_generator",
+    "S16": "tasksgenerator.s16_s17_tasks_generator",
+    "S17": "tasksgenerator.s16_s17_tasks_generator",
+    "S16_S17_union": "tasksgenerator.s16_s17_tasks_generator",
+}
+
+
+class LazyClassRegistry(ClassRegistry):
+    """ClassRegistry that imports the module of a TasksGenerator from TASKS_GENERATOR_MODULES the first time that it is looked up, so that only the generators that are used are imported. Generator modules seed the global random state when they are imported, so look them up before setting it."""
+
+    def get_class(self, key):
+        try:
+            return super().get_class(key)
+        except RegistryKeyError:
+            if key not in TASKS_GENERATOR_MODULES:
+                raise
+        importlib.import_module(TASKS_GENERATOR_MODULES[key])
+        return super().get_class(key)
+
+
+TasksGeneratorRegistry = LazyClassRegistry("name", unique=True)
 
 RANDOM_SEED = 0
 random.seed(RANDOM_SEED)
@@ -53,20 +104,18 @@ LANG_NOUNS, LANG_ADJECTIVES, LANG_ARTICLE, LANG_WHERE, LANG_WHAT = (
     "what",
 )
 
-SYNTHETIC_DICT = {
-    k: []
-    for k in [
-        LOW_LEVEL,
-        MID_LEVEL,
-        HIGH_LEVEL,
-        LOW_LEVEL_PARTS,
-        MID_LEVEL_PARTS,
-        HIGH_LEVEL_PARTS,
-        LOW_LEVEL_PARAMS,
-        MID_LEVEL_PARAMS,
-        HIGH_LEVEL_PARAMS,
-    ]
-}
+SYNTHETIC_LEVELS = (
+    LOW_LEVEL,
+    MID_LEVEL,
+    HIGH_LEVEL,
+    LOW_LEVEL_PARTS,
+    MID_LEVEL_PARTS,
+    HIGH_LEVEL_PARTS,
+    LOW_LEVEL_PARAMS,
+    MID_LEVEL_PARAMS,
+    HIGH_LEVEL_PARAMS,
+)
+SYNTHETIC_DICT = {k: [] for k in SYNTHETIC_LEVELS}
 LANG_DICT = {
     k: [] for k in [LANG_NOUNS, LANG_ADJECTIVES, LANG_ARTICLE, LANG_WHERE, LANG_WHAT]
 }
@@ -75,30 +124,434 @@ SYNTHETIC_LANG_DICT = {
     for k in [LOW_LEVEL_LANG, MID_LEVEL_LANG, HIGH_LEVEL_LANG]
 }
 
+# Summary columns that cross each level of parts with the params at the same level.
+WITH_PARAMS = "_with_params"
+SYNTHETIC_WITH_PARAMS_COLUMNS = [
+    (parts + WITH_PARAMS, parts, params)
+    for parts in [
+        LOW_LEVEL,
+        MID_LEVEL,
+        HIGH_LEVEL,
+        LOW_LEVEL_PARTS,
+        MID_LEVEL_PARTS,
+        HIGH_LEVEL_PARTS,
+    ]
+    for params in [LOW_LEVEL_PARAMS, MID_LEVEL_PARAMS, HIGH_LEVEL_PARAMS]
+    if parts.split("_")[:2] == params.split("_")[:2]
+]
+
+
+class SyntheticAbstractions:
+    """
+    SyntheticAbstractions: compact record of the hand-coded abstractions for a single stimulus.
+    Replaces copy.deepcopy(SYNTHETIC_DICT) and behaves like that dict: record[level] returns the live token list, so record[level].append(token) and record[level] += tokens work as before.
+
+    Each level is stored as a list of token chunks. merge() shares the other record's chunks (frozen as tuples) instead of copying its tokens, and chunks are only flattened when a level is read.
+    """
+
+    __slots__ = SYNTHETIC_LEVELS
+
+    def __init__(self, **levels):
+        for level in SYNTHETIC_LEVELS:
+            tokens = levels.get(level)
+            setattr(self, level, [list(tokens)] if tokens else [])
+
+    @staticmethod
+    def from_dict(synthetic_dict):
+        return SyntheticAbstractions(
+            **{k: synthetic_dict[k] for k in SYNTHETIC_LEVELS if k in synthetic_dict}
+        )
+
+    def _chunks(self, level):
+        if level not in SYNTHETIC_DICT:
+            raise KeyError(level)
+        return getattr(self, level)
+
+    def _frozen_chunks(self, level):
+        """Freezes any chunks owned by this record so that they can be shared."""
+        chunks = self._chunks(level)
+        for idx, chunk in enumerate(chunks):
+            if type(chunk) is list:
+                chunks[idx] = tuple(chunk)
+        return chunks
+
+    def _tail(self, level):
+        chunks = self._chunks(level)
+        if len(chunks) == 0 or type(chunks[-1]) is not list:
+            chunks.append([])
+        return chunks[-1]
+
+    def __getitem__(self, level):
+        chunks = self._chunks(level)
+        if len(chunks) == 1 and type(chunks[0]) is list:
+            return chunks[0]
+        tokens = list(itertools.chain.from_iterable(chunks))
+        setattr(self, level, [tokens])
+        return tokens
+
+    def __setitem__(self, level, tokens):
+        self._chunks(level)
+        setattr(self, level, [tokens if type(tokens) is list else list(tokens)])
+
+    def append(self, level, token):
+        self._tail(level).append(token)
+
+    def extend(self, level, tokens):
+        self._tail(level).extend(tokens)
+
+    def merge(self, other, levels=SYNTHETIC_LEVELS):
+        """Appends the tokens of other (a record or a plain synthetic dict) at each level. Returns self."""
+        for level in levels:
+            if isinstance(other, SyntheticAbstractions):
+                other_chunks = other._frozen_chunks(level)
+            else:
+                other_chunks = [tuple(other[level])] if other.get(level) else []
+            if other_chunks:
+                self._chunks(level).extend(other_chunks)
+        return self
+
+    def copy(self):
+        copied = SyntheticAbstractions()
+        for level in SYNTHETIC_LEVELS:
+            setattr(copied, level, list(self._frozen_chunks(level)))
+        return copied
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        # Tokens are immutable, so sharing the frozen chunks is a deep copy.
+        return self.copy()
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        for level in SYNTHETIC_LEVELS:
+            setattr(self, level, [list(state.get(level, []))])
+
+    def __iter__(self):
+        return iter(SYNTHETIC_LEVELS)
+
+    def __len__(self):
+        return len(SYNTHETIC_LEVELS)
+
+    def __contains__(self, level):
+        return level in SYNTHETIC_DICT
+
+    def keys(self):
+        return list(SYNTHETIC_LEVELS)
+
+    def values(self):
+        return [self[level] for level in SYNTHETIC_LEVELS]
+
+    def items(self):
+        return [(level, self[level]) for level in SYNTHETIC_LEVELS]
+
+    def get(self, level, default=None):
+        return self[level] if level in self else default
+
+    def to_dict(self):
+        return {level: list(self[level]) for level in SYNTHETIC_LEVELS}
+
+    def to_summary(self):
+        """:ret: the task summary columns: every level, then each level of parts crossed with its params."""
+        summary = {level: self[level] for level in SYNTHETIC_LEVELS}
+        for column, parts, params in SYNTHETIC_WITH_PARAMS_COLUMNS:
+            summary[column] = summary[parts] + summary[params]
+        return summary
+
+    def __eq__(self, other):
+        if isinstance(other, SyntheticAbstractions):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"SyntheticAbstractions({self.to_dict()})"
+
+
+class ProgramMetadata:
+    """
+    ProgramMetadata: the parsed program, tokens and verbose renderings for a single program string.
+    Each is computed on first use. Use get_program_metadata to share them across tasks, curricula and exports of the same program.
+    """
+
+    __slots__ = ("program_string", "_parsed", "_tokens", "_shown")
+
+    def __init__(self, program_string):
+        self.program_string = program_string
+        self._parsed = None
+        self._tokens = None
+        self._shown = {}
+
+    @property
+    def parsed(self):
+        if self._parsed is None:
+            self._parsed = Program.parse(self.program_string)
+        return self._parsed
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = tuple(self.parsed.left_order_tokens(show_vars=True))
+        return list(self._tokens)
+
+    def show(self, verbosity_level):
+        if verbosity_level not in self._shown:
+            self._shown[verbosity_level] = self.parsed.show(
+                isFunction=False, alternate_names=verbosity_level
+            )
+        return self._shown[verbosity_level]
+
+
+class LRUCache:
+    """
+    LRUCache: cache that keeps at most maxsize entries, and evicts the least recently used entry when it is full. Safe to use from the threads of an ExportPipeline.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+PROGRAM_METADATA_CACHE_SIZE = 10000
+PROGRAM_METADATA_CACHE = LRUCache(PROGRAM_METADATA_CACHE_SIZE)
+
+
+def get_program_metadata(program_string):
+    """:ret: the shared ProgramMetadata for a program string. Also accepts an already parsed Program."""
+    parsed = None
+    if isinstance(program_string, Program):
+        parsed, program_string = program_string, str(program_string)
+    metadata = PROGRAM_METADATA_CACHE.get(program_string)
+    if metadata is None:
+        metadata = ProgramMetadata(program_string)
+        metadata._parsed = parsed
+        PROGRAM_METADATA_CACHE[program_string] = metadata
+    return metadata
+
+
+# Parts built by memoized_part methods, keyed by part type and canonical parameters. A full run of each programs generator builds fewer than 1000 parts.
+PART_LIBRARY_SIZE = 4096
+PART_LIBRARY = LRUCache(PART_LIBRARY_SIZE)
+# Shared generator instances for building parts from other domains, keyed by class.
+PART_GENERATORS = {}
+
+
+def get_canonical_part_params(value):
+    """:ret: a hashable key for the parameters of a part. Keeps the type and repr of each value, since eg. 1, 1.0 and "1" are written differently into programs. Arrays are keyed by their contents."""
+    if isinstance(value, dict):
+        return tuple(
+            (k, get_canonical_part_params(v)) for k, v in sorted(value.items())
+        )
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(
+            get_canonical_part_params(v) for v in value
+        )
+    if isinstance(value, np.ndarray):
+        return (str(value.dtype), value.shape, value.tobytes())
+    return (type(value).__name__, repr(value))
 
-def random_sample_ratio_ordered_array(array, train_ratio, strings_array=None):
+
+def memoized_part(part_type):
+    """
+    Decorator for generator methods that build a part, such as a dial, an antenna or a row of wheels, from their parameters alone.
+    Each part is built once per part_type and canonical parameters, and the same tuple of (strokes, program string, SyntheticAbstractions, ...) is returned to every generator that asks for it, without copying.
+    Part methods must not draw from random or depend on the generator instance. Callers must not modify the returned parts: copy() the synthetic dict and build new stroke lists instead.
+    """
+
+    def decorator(build_part_fn):
+        signature = inspect.signature(build_part_fn)
+
+        @functools.wraps(build_part_fn)
+        def get_part(self, *args, **kwargs):
+            params = signature.bind(self, *args, **kwargs)
+            params.apply_defaults()
+            params = list(params.arguments.items())[1:]
+            key = (part_type, get_canonical_part_params(params))
+            part = PART_LIBRARY.get(key)
+            if part is None:
+                part = build_part_fn(self, *args, **kwargs)
+                PART_LIBRARY[key] = part
+            return part
+
+        return get_part
+
+    return decorator
+
+
+def get_part_generator(generator_class):
+    """:ret: a shared instance of generator_class, for building parts that belong to another domain."""
+    generator = PART_GENERATORS.get(generator_class)
+    if generator is None:
+        generator = generator_class()
+        PART_GENERATORS[generator_class] = generator
+    return generator
+
+
+def get_synthetic_stratum(synthetic_dict):
+    """:ret: the stratum of a stimulus for stratified splits: the kinds of its high-level and mid-level parts, which identify its sub-family and abstraction level."""
+    return (
+        tuple(sorted(set(synthetic_dict[HIGH_LEVEL]))),
+        tuple(sorted(set(synthetic_dict[MID_LEVEL]))),
+    )
+
+
+def get_train_mask(num_stimuli, train_ratio, strata=None):
+    """Utility function that randomly samples int(n * train_ratio) of n stimuli for train.
+    If strata are given (one hashable stratum per stimulus), samples round(n * train_ratio) stimuli, divided among the strata in order of first appearance: int(size * train_ratio) of each stratum, and the rest by largest remainder, as in get_stratum_quotas. A stratum with at least two stimuli never gets an extra stimulus that would leave it with none in test.
+    Returns a boolean mask that is True for train."""
+    train_mask = np.zeros(num_stimuli, dtype=bool)
+    if strata is None:
+        sample_size = int(num_stimuli * train_ratio)
+        train_mask[random.sample(range(num_stimuli), sample_size)] = True
+        return train_mask
+    strata_indices = defaultdict(list)
+    for idx, stratum in enumerate(strata):
+        strata_indices[stratum].append(idx)
+    sample_sizes = {
+        stratum: int(len(indices) * train_ratio)
+        for stratum, indices in strata_indices.items()
+    }
+    num_extra = round(num_stimuli * train_ratio) - sum(sample_sizes.values())
+    by_remainder = sorted(
+        (
+            stratum
+            for stratum, indices in strata_indices.items()
+            if len(indices) == 1 or sample_sizes[stratum] + 1 < len(indices)
+        ),
+        key=lambda stratum: -(
+            len(strata_indices[stratum]) * train_ratio - sample_sizes[stratum]
+        ),
+    )
+    for stratum in by_remainder[:num_extra]:
+        sample_sizes[stratum] += 1
+    for stratum, indices in strata_indices.items():
+        train_mask[random.sample(indices, sample_sizes[stratum])] = True
+    return train_mask
+
+
+def get_stratum_quotas(strata, max_count):
+    """Utility function that divides max_count among the strata. If there is room, each stratum gets one, and the rest is divided in proportion to the sizes of the strata by largest remainder. Returns {stratum : quota}."""
+    strata_sizes = defaultdict(int)
+    for stratum in strata:
+        strata_sizes[stratum] += 1
+    quotas = {stratum: 0 for stratum in strata_sizes}
+    if max_count >= len(strata_sizes):
+        quotas = {stratum: 1 for stratum in strata_sizes}
+    remaining_sizes = {
+        stratum: size - quotas[stratum] for stratum, size in strata_sizes.items()
+    }
+    num_remaining = sum(remaining_sizes.values())
+    num_extra = min(max_count - sum(quotas.values()), num_remaining)
+    if num_extra <= 0:
+        return quotas
+    extra = {
+        stratum: num_extra * size // num_remaining
+        for stratum, size in remaining_sizes.items()
+    }
+    by_remainder = sorted(
+        remaining_sizes,
+        key=lambda stratum: -(num_extra * remaining_sizes[stratum] % num_remaining),
+    )
+    for stratum in by_remainder[: num_extra - sum(extra.values())]:
+        extra[stratum] += 1
+    return {stratum: quotas[stratum] + extra[stratum] for stratum in quotas}
+
+
+def get_stratified_prefix_mask(strata, max_count):
+    """Utility function that keeps at most max_count stimuli: the first ones of each stratum, up to its quota from get_stratum_quotas. Returns a boolean mask that is True for kept stimuli."""
+    quotas = get_stratum_quotas(strata, max_count)
+    num_kept = defaultdict(int)
+    keep_mask = np.zeros(len(strata), dtype=bool)
+    for idx, stratum in enumerate(strata):
+        if num_kept[stratum] < quotas[stratum]:
+            keep_mask[idx] = True
+            num_kept[stratum] += 1
+    return keep_mask
+
+
+def split_ordered_array(array, mask):
+    """Utility function that splits an array by a boolean mask, preserving order. Returns [selected], [rest]"""
+    selected = [element for element, is_selected in zip(array, mask) if is_selected]
+    rest = [element for element, is_selected in zip(array, mask) if not is_selected]
+    return selected, rest
+
+
+def random_sample_ratio_ordered_array(
+    array, train_ratio, strings_array=None, strata=None
+):
     """Utility function to randomly sample a ratio from an ordered array, preserving order.
-    Optionally can be paseed a set of strings as well.
+    Optionally can be paseed a set of strings as well, and a stratum for each element to sample the ratio within each stratum (see get_train_mask).
     Returns [train], [test]"""
-    sample_size = int(len(array) * train_ratio)
-    indices_to_sample = sorted(random.sample(range(len(array)), sample_size))
-    train, test = [], []
-    train_strings, test_strings = [], []
-    for i in range(len(array)):
-        if i in indices_to_sample:
-            train.append(array[i])
-            if strings_array is not None:
-                train_strings.append(strings_array[i])
-        else:
-            test.append(array[i])
-            if strings_array is not None:
-                test_strings.append(strings_array[i])
+    train_mask = get_train_mask(len(array), train_ratio, strata)
+    train, test = split_ordered_array(array, train_mask)
     if strings_array is not None:
+        train_strings, test_strings = split_ordered_array(strings_array, train_mask)
         return train, test, train_strings, test_strings
 
     return train, test
 
 
+def is_train_descriptor(generator_name, descriptor, train_ratio):
+    """Utility function to split stimuli one at a time. Hashes the generator name and a stimulus descriptor to a number in [0, 1), and assigns the stimulus to train if it falls below train_ratio.
+    Unlike random_sample_ratio_ordered_array, the split is stable across runs and does not depend on the other stimuli, so only approximately train_ratio of the stimuli are in train.
+    Descriptors should only contain strings, numbers and tuples, so that their repr is stable.
+    Returns True if the stimulus is in train."""
+    digest = hashlib.sha1(f"{generator_name}:{descriptor!r}".encode("utf-8"))
+    return int(digest.hexdigest()[:15], 16) / 16**15 < train_ratio
+
+
+def get_pool(num_workers):
+    """Utility function that returns a multiprocessing Pool of num_workers processes. Workers are forked wherever the platform supports it, whatever its default start method, so they inherit the registered generators and warm caches of this process, and do not re-import the generator modules, which seed the global random state."""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork").Pool(num_workers)
+    return multiprocessing.Pool(num_workers)
+
+
+def map_in_order(fn, items, num_workers=1):
+    """Utility function to map a picklable, module-level fn over items in a pool of num_workers processes. Items are split into contiguous chunks and the results are returned in the order of items, so they are the same as a serial map."""
+    items = list(items)
+    if num_workers is None or num_workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    chunksize = max(1, math.ceil(len(items) / (num_workers * 4)))
+    with get_pool(num_workers) as pool:
+        return pool.map(fn, items, chunksize=chunksize)
+
+
+def get_stimulus_seed(generator_name, index):
+    """Utility function that derives a deterministic random seed for a single stimulus from its generator and its index, independently of the global random state."""
+    digest = hashlib.sha1(f"{generator_name}:{index}".encode("utf-8"))
+    return int(digest.hexdigest()[:16], 16)
+
+
 class TaskCurriculum:
     """
     TaskCurriculum: data structure for curricula of tasks.
@@ -107,6 +560,7 @@ class TaskCurriculum:
             curriculum_block : [array of tasks]
             }
     }
+    Lookups and iteration go through a CurriculumIndex over the curriculum, which is built on first use and rebuilt after tasks are added.
     """
 
     CURRICULUM_BLOCK_PREFIX = "curriculum"
@@ -130,6 +584,7 @@ class TaskCurriculum:
         self.timestamp = timestamp
         self.curriculum = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
         self.grammar = grammar
+        self._index = None
 
     def add_tasks(self, split, condition, curriculum_block, tasks):
         condition = f"{TaskCurriculum.CONDITION_BLOCK_PREFIX}_{condition}"
@@ -138,18 +593,51 @@ class TaskCurriculum:
         )
 
         self.curriculum[split][condition][curriculum_block] += tasks
+        self._index = None
+
+    def add_curriculum(self, curriculum):
+        """Adds the tasks of another curriculum, as returned by get_curriculum, under the same splits, conditions and curriculum blocks."""
+        for split in curriculum:
+            for condition in curriculum[split]:
+                for curriculum_block, tasks in curriculum[split][condition].items():
+                    self.curriculum[split][condition][curriculum_block] += tasks
+        self._index = None
 
     def get_curriculum(self):
         return self.curriculum
 
+    def get_index(self):
+        """:ret: CurriculumIndex over the curriculum."""
+        if self._index is None:
+            self._index = CurriculumIndex.from_curriculum(self.curriculum)
+        return self._index
+
     def get_all_tasks(self):
-        tasks_set = set()
-        for split in self.curriculum:
-            for condition in self.curriculum[split]:
-                for curriculum_block in self.curriculum[split][condition]:
-                    block_tasks = self.curriculum[split][condition][curriculum_block]
-                    tasks_set.update(block_tasks)
-        return tasks_set
+        """:ret: each task in the curriculum once, in curriculum order."""
+        return self.get_index().get_unique_tasks()
+
+    def get_task(self, export_name):
+        return self.get_index().get_task(export_name)
+
+    def get_task_export_name(self, task):
+        """:ret: the name that the task is exported under. See CurriculumIndex.get_export_name."""
+        return self.get_index().get_export_name(task)
+
+    def get_block_tasks(self, split, condition, curriculum_block):
+        condition = f"{TaskCurriculum.CONDITION_BLOCK_PREFIX}_{condition}"
+        curriculum_block = (
+            f"{TaskCurriculum.CURRICULUM_BLOCK_PREFIX}_{curriculum_block}"
+        )
+        return self.get_index().get_block(split, condition, curriculum_block)
+
+    def get_manifest(self):
+        """:ret: JSON serializable manifest of the curriculum. See CurriculumIndex.get_manifest."""
+        manifest = self.get_index().get_manifest()
+        manifest[TaskCurriculum.METADATA] = {
+            "name": self.name,
+            "timestamp": self.timestamp,
+        }
+        return manifest
 
     def get_initial_library_summary(self):
         metadata = {
@@ -181,7 +669,9 @@ class TaskCurriculum:
             for condition in self.curriculum[split]:
                 for curriculum_block in self.curriculum[split][condition]:
                     tasks = self.curriculum[split][condition][curriculum_block]
-                    task_image_names = [task.name + ".png" for task in tasks]
+                    task_image_names = [
+                        self.get_task_export_name(task) + ".png" for task in tasks
+                    ]
                     curriculum_summary[split][condition][
                         curriculum_block
                     ] += task_image_names
@@ -199,22 +689,28 @@ class TaskCurriculum:
         """
         Generates a flattened summary of the tasks that can be written out to a CSV. This contains information specific to the upload version on S3.
         """
-        domain = self.cleaned_name(self.name.split(f"_{PROGRAMS_NAME}")[0])
-        s3_domain = f"https://lax-drawing-{domain}-all.s3.amazonaws.com/"
-        all_tasks = []
+        return list(self.iter_curriculum_tasks_csv_summary())
+
+    def iter_summary_tasks(self):
+        """Yields each task in the order of the task summaries: test, then train, by condition and curriculum block. Tasks in more than one block are yielded for each block."""
         for split in ["test", "train"]:
             for condition in self.curriculum[split]:
                 for curriculum_block in self.curriculum[split][condition]:
-                    tasks = self.curriculum[split][condition][curriculum_block]
-                    task_summaries = [task.task_summary() for task in tasks]
-                    all_tasks += task_summaries
+                    yield from self.curriculum[split][condition][curriculum_block]
 
-        # FWIW, add back in the canonical indexing from S3.
-        for idx, task_dict in enumerate(all_tasks):
+    def iter_curriculum_tasks_csv_summary(self, start=0):
+        """Yields the summary of each task in get_curriculum_tasks_csv_summary as it is summarized, so that the summaries can be written out without keeping them all in memory.
+        :start: if included, position in iter_summary_tasks of the first task to summarize. Tasks before it are not summarized."""
+        domain = self.cleaned_name(self.name.split(f"_{PROGRAMS_NAME}")[0])
+        s3_domain = f"https://lax-drawing-{domain}-all.s3.amazonaws.com/"
+        tasks = itertools.islice(self.iter_summary_tasks(), start, None)
+        for idx, task in enumerate(tasks, start):
+            task_dict = task.task_summary()
+            # FWIW, add back in the canonical indexing from S3.
             s3_idx = str.zfill(str(idx), 3)
             s3_name = s3_domain + f"lax-drawing-{domain}-all-{s3_idx}.png"
             task_dict["s3_stimuli"] = s3_name
-        return all_tasks
+            yield task_dict
 
 
 class AbstractTasksGenerator:
@@ -222,11 +718,22 @@ class AbstractTasksGenerator:
 
     GENERATE_ALL = "all"
     INTERSECT = "intersect"
+    STIMULI_SHARD_SIZE = 32
+    MAX_PENDING_SHARDS_PER_WORKER = 2
+
+    # Processes used to build stimuli. Tasks render themselves when their rendering is first used. Outputs do not depend on this.
+    num_workers = 1
+    # If not None, drops stimuli that duplicate earlier ones at this similarity before they are rendered. See StimuliIndex.
+    dedup_similarity = None
+    # If True, splits and truncates stimuli within each stratum (see get_synthetic_stratum), so that every sub-family and abstraction level is in train and test.
+    stratify_split = False
 
     def __init__(self, grammar):
         self.grammar = grammar
         if type(self.grammar) == list:
             self.grammar = Grammar.uniform(grammar)
+        # Stimuli generated while counting tasks, reused when the tasks are built. Keyed by train_ratio.
+        self._generated_stimuli = {}
 
     def generate_tasks_curriculum(self, num_tasks_to_generate_per_condition):
         """:ret: TaskCurriculum"""
@@ -236,24 +743,313 @@ class AbstractTasksGenerator:
         """Helper method that generates an array of stimuli as stroke arrays."""
         raise NotImplementedError
 
+    def _generate_stimuli_descriptors(self):
+        """Streaming protocol. Lazily yields a lightweight, hashable descriptor for each point in the parameter space of the generator, such as the parameters used to build it, in canonical order. Does not draw from random or build any stimuli."""
+        raise NotImplementedError
+
+    def _sample_stimuli(self, descriptor):
+        """Streaming protocol. Makes the random draws for a descriptor, such as whether it is generated at all.
+        :ret: the draws, which are passed to _build_stimuli, or None if the descriptor generates no stimuli. By default, descriptors make no draws."""
+        return ()
+
+    def _build_stimuli(self, descriptor, sample):
+        """Streaming protocol. :ret: [(strokes, program string, SyntheticAbstractions)] for a descriptor and its draws from _sample_stimuli. A descriptor may build any number of stimuli.
+        Must not draw from random, so that descriptors can be built in any order."""
+        raise NotImplementedError
+
+    def _sample_descriptors(self, descriptors):
+        """Sampling pass. Makes the draws for each descriptor with _sample_stimuli, in order, from the global random state.
+        :ret: [(descriptor, sample)] for the descriptors that generate any stimuli."""
+        sampled_descriptors = []
+        for descriptor in descriptors:
+            sample = self._sample_stimuli(descriptor)
+            if sample is not None:
+                sampled_descriptors.append((descriptor, sample))
+        return sampled_descriptors
+
+    def _build_sampled_descriptors(self, sampled_descriptors):
+        """Build pass. Builds each (descriptor, sample) from _sample_descriptors with _build_stimuli, in shards of STIMULI_SHARD_SIZE across num_workers processes. Building makes no draws, so the stimuli are the same as with a single process.
+        :ret: strokes, [(program string, SyntheticAbstractions)] for all of their stimuli, in order."""
+        if self.num_workers > 1 and len(sampled_descriptors) > self.STIMULI_SHARD_SIZE:
+            shard_size = self.STIMULI_SHARD_SIZE
+            shards = [
+                (self.name, sampled_descriptors[start : start + shard_size])
+                for start in range(0, len(sampled_descriptors), shard_size)
+            ]
+            built_stimuli = itertools.chain.from_iterable(
+                _get_worker_stimuli(shard_stimuli)
+                for shard_stimuli in map_in_order(
+                    _build_sampled_shard, shards, self.num_workers
+                )
+            )
+        else:
+            built_stimuli = (
+                self._build_stimuli(descriptor, sample)
+                for descriptor, sample in sampled_descriptors
+            )
+        strokes, strings_array = [], []
+        for stimuli in built_stimuli:
+            for (
+                stimulus_strokes,
+                stimulus_string,
+                stimulus_synthetic_dict,
+            ) in stimuli:
+                strokes.append(stimulus_strokes)
+                strings_array.append((stimulus_string, stimulus_synthetic_dict))
+        return strokes, strings_array
+
+    def _build_stimuli_from_descriptors(self, descriptors, train_ratio):
+        """Helper method that samples and builds descriptors, and splits their stimuli with _split_stimuli_strings, in the format returned by _generate_strokes_strings_for_stimuli."""
+        strokes, strings_array = self._build_sampled_descriptors(
+            self._sample_descriptors(descriptors)
+        )
+        return self._split_stimuli_strings(
+            strokes, train_ratio, strings_array=strings_array
+        )
+
+    def _split_stimuli_strings(self, strokes, train_ratio, strings_array):
+        """Splits stimuli and their (program string, synthetic abstractions) with random_sample_ratio_ordered_array, within each stratum if stratify_split."""
+        strata = None
+        if self.stratify_split:
+            strata = [
+                get_synthetic_stratum(synthetic) for _, synthetic in strings_array
+            ]
+        return random_sample_ratio_ordered_array(
+            strokes, train_ratio, strings_array=strings_array, strata=strata
+        )
+
+    def _truncate_stimuli_strings(self, strokes, strings_array, max_count):
+        """Truncates stimuli and their (program string, synthetic abstractions) to at most max_count. If stratify_split, keeps the first stimuli of each stratum in proportion to its size rather than the first max_count."""
+        if max_count is None or not self.stratify_split:
+            return strokes[:max_count], strings_array[:max_count]
+        keep_mask = get_stratified_prefix_mask(
+            [get_synthetic_stratum(synthetic) for _, synthetic in strings_array],
+            max_count,
+        )
+        return (
+            split_ordered_array(strokes, keep_mask)[0],
+            split_ordered_array(strings_array, keep_mask)[0],
+        )
+
+    def _build_seeded_stimuli(self, index, descriptor):
+        """Samples and builds a descriptor with the global random and np.random states seeded by get_stimulus_seed, so its stimuli depend only on its index. Restores both global random states afterwards.
+        :ret: [(strokes, program string, SyntheticAbstractions)]."""
+        random_state, numpy_random_state = random.getstate(), np.random.get_state()
+        seed = get_stimulus_seed(self.name, index)
+        random.seed(seed)
+        # np.random only accepts 32-bit seeds.
+        np.random.seed(seed % 2**32)
+        try:
+            sample = self._sample_stimuli(descriptor)
+            if sample is None:
+                return []
+            return self._build_stimuli(descriptor, sample)
+        finally:
+            random.setstate(random_state)
+            np.random.set_state(numpy_random_state)
+
+    def get_num_stimuli(self):
+        """:ret: the number of descriptors in the streaming protocol, which get_stimulus indexes. Enumerates the descriptors without building them."""
+        return sum(1 for _ in self._generate_stimuli_descriptors())
+
+    def get_stimulus(self, index):
+        """Random access to the stimuli of a single descriptor, which are reproducible without sampling or building the ones before it.
+        :ret: descriptor, [(strokes, program string, SyntheticAbstractions)]."""
+        descriptors = itertools.islice(
+            self._generate_stimuli_descriptors(), index, None
+        )
+        descriptor = next(descriptors, None)
+        if descriptor is None:
+            raise IndexError(f"{self.name} has no stimulus {index}.")
+        return descriptor, self._build_seeded_stimuli(index, descriptor)
+
+    def _get_descriptor_split(self, descriptor, train_ratio):
+        if is_train_descriptor(self.name, descriptor, train_ratio):
+            return TaskCurriculum.SPLIT_TRAIN
+        return TaskCurriculum.SPLIT_TEST
+
+    def _get_descriptor_stratum(self, descriptor):
+        """:ret: the stratum of a descriptor for stratified streams. By default, the sub-family of descriptors of the form (sub-family, parameters)."""
+        return descriptor[0]
+
+    def _get_stream_quotas(self, train_ratio, max_tasks):
+        """Divides the maximum number of tasks in each split among the strata of the descriptors in that split, without building any stimuli.
+        :ret: {split : {stratum : quota}}, for each split with a maximum."""
+        split_strata = defaultdict(list)
+        for descriptor in self._generate_stimuli_descriptors():
+            split = self._get_descriptor_split(descriptor, train_ratio)
+            split_strata[split].append(self._get_descriptor_stratum(descriptor))
+        return {
+            split: get_stratum_quotas(split_strata[split], max_count)
+            for split, max_count in max_tasks.items()
+            if max_count is not None
+        }
+
+    def _generate_descriptor_shards(self):
+        """Yields lists of up to STIMULI_SHARD_SIZE (index, descriptor), enumerating the descriptors lazily."""
+        descriptors = enumerate(self._generate_stimuli_descriptors())
+        while True:
+            shard = list(itertools.islice(descriptors, self.STIMULI_SHARD_SIZE))
+            if not shard:
+                return
+            yield shard
+
+    def generate_stimuli_stream(self, train_ratio=1.0):
+        """Streams stimuli one descriptor at a time, sampling and building each one only when it is reached. Stimuli are split by their descriptor with is_train_descriptor, so memory does not grow with the number of stimuli.
+        Yields (split, descriptor, strokes, program string, SyntheticAbstractions)."""
+        if self.num_workers > 1:
+            yield from self._generate_stimuli_stream_in_shards(train_ratio)
+            return
+        for index, descriptor in enumerate(self._generate_stimuli_descriptors()):
+            split = self._get_descriptor_split(descriptor, train_ratio)
+            for stimulus in self._build_seeded_stimuli(index, descriptor):
+                yield (split, descriptor) + tuple(stimulus)
+
+    def _generate_stimuli_stream_in_shards(self, train_ratio):
+        """Builds shards of STIMULI_SHARD_SIZE descriptors in a pool of num_workers processes, and yields their stimuli in order. Each descriptor is built with its own seed, so the stream is the same as the serial one.
+        At most MAX_PENDING_SHARDS_PER_WORKER shards per worker are submitted ahead of the one being yielded, so memory does not grow with the number of stimuli."""
+        max_pending_shards = self.MAX_PENDING_SHARDS_PER_WORKER * self.num_workers
+        with get_pool(self.num_workers) as pool:
+            pending_shards = deque()
+            shards = self._generate_descriptor_shards()
+            while True:
+                for shard in itertools.islice(
+                    shards, max_pending_shards - len(pending_shards)
+                ):
+                    pending_shards.append(
+                        pool.apply_async(_build_stimuli_shard, ((self.name, shard),))
+                    )
+                if not pending_shards:
+                    return
+                shard_descriptors, shard_stimuli = zip(*pending_shards.popleft().get())
+                for descriptor, stimuli in zip(
+                    shard_descriptors, _get_worker_stimuli(shard_stimuli)
+                ):
+                    split = self._get_descriptor_split(descriptor, train_ratio)
+                    for stimulus in stimuli:
+                        yield (split, descriptor) + tuple(stimulus)
+
+    def generate_tasks_stream(
+        self,
+        request_type,
+        render_parsed_program_fn,
+        train_ratio=1.0,
+        max_train=None,
+        max_test=None,
+    ):
+        """Streams DrawingTasks for the stimuli of _generate_stimuli_descriptors. Tasks are numbered within their split. Descriptors for a split that is already full are never sampled or built, and the stream stops once both splits are full.
+        If stratify_split, the maximum for each split is divided among the strata of its descriptors (see _get_stream_quotas), and descriptors for a full stratum are never built either.
+        Yields (split, DrawingTask)."""
+        max_tasks = {
+            TaskCurriculum.SPLIT_TRAIN: max_train,
+            TaskCurriculum.SPLIT_TEST: max_test,
+        }
+        num_tasks = defaultdict(int)
+        stimuli_index = self._get_stimuli_index()
+        quotas, num_stratum_tasks = {}, defaultdict(int)
+        if self.stratify_split:
+            quotas = self._get_stream_quotas(train_ratio, max_tasks)
+
+        def is_full(split):
+            return max_tasks[split] is not None and num_tasks[split] >= max_tasks[split]
+
+        def is_stratum_full(split, stratum):
+            return (
+                split in quotas
+                and num_stratum_tasks[split, stratum] >= quotas[split][stratum]
+            )
+
+        for index, descriptor in enumerate(self._generate_stimuli_descriptors()):
+            if all(is_full(split) for split in max_tasks):
+                return
+            split = self._get_descriptor_split(descriptor, train_ratio)
+            stratum = self._get_descriptor_stratum(descriptor)
+            if is_full(split) or is_stratum_full(split, stratum):
+                continue
+            for (
+                task_strokes,
+                task_program,
+                task_synthetic,
+            ) in self._build_seeded_stimuli(index, descriptor):
+                if is_full(split) or is_stratum_full(split, stratum):
+                    break
+                if stimuli_index is not None:
+                    if stimuli_index.add(task_strokes, task_program) is not None:
+                        continue
+                yield split, DrawingTask(
+                    task_id=num_tasks[split],
+                    request=request_type,
+                    ground_truth_strokes=task_strokes,
+                    ground_truth_program=task_program,
+                    render_parsed_program_fn=render_parsed_program_fn,
+                    task_generator_name=self.name + f"_{split}",
+                    synthetic_abstractions=task_synthetic,
+                )
+                num_tasks[split] += 1
+                num_stratum_tasks[split, stratum] += 1
+
     def _get_number_tasks_to_generate_per_condition(
         self, num_tasks_to_generate_per_condition, train_ratio
     ):
-        """Helper method that returns the true number of tasks to generate and a human readable name. Generator must have defined an _generate_strokes_for_stimuli function."""
-        if PROGRAMS_NAME in self.name or SYNTHETIC_NAME in self.name:
-            train, test, _, _ = self._generate_strokes_strings_for_stimuli(train_ratio)
-        else:
-            train, test = self._generate_strokes_for_stimuli(train_ratio)
-        num_total_tasks = len(train + test)
-        num_to_generate = (
-            num_tasks_to_generate_per_condition
-            if num_tasks_to_generate_per_condition
-            != AbstractTasksGenerator.GENERATE_ALL
-            else num_total_tasks
-        )
+        """Helper method that returns the true number of tasks to generate and a human readable name. Generator must have defined an _generate_strokes_for_stimuli function.
+
+        Counting generates the stimuli, so they are kept and reused by _generate_drawing_tasks_from_strokes rather than generated again."""
+        num_to_generate = num_tasks_to_generate_per_condition
+        if num_tasks_to_generate_per_condition == AbstractTasksGenerator.GENERATE_ALL:
+            if train_ratio not in self._generated_stimuli:
+                self._generated_stimuli[train_ratio] = self._generate_stimuli(
+                    train_ratio
+                )
+            train, test = self._generated_stimuli[train_ratio][:2]
+            num_to_generate = len(train) + len(test)
         human_readable_num_to_generate = num_tasks_to_generate_per_condition
         return num_to_generate, human_readable_num_to_generate
 
+    def _generate_stimuli(self, train_ratio):
+        """Helper method that generates the train and test stimuli: (train, test) strokes, followed by (train_strings, test_strings) for generators with programs."""
+        if PROGRAMS_NAME in self.name or SYNTHETIC_NAME in self.name:
+            return self._generate_strokes_strings_for_stimuli(train_ratio)
+        else:
+            return self._generate_strokes_for_stimuli(train_ratio)
+
+    def _get_stimuli_index(self):
+        """:ret: a new StimuliIndex for the dedup stage, or None if dedup_similarity is None."""
+        if self.dedup_similarity is None:
+            return None
+        return StimuliIndex(self.dedup_similarity)
+
+    def _drop_duplicate_stimuli(
+        self, train, test, train_shapes=None, test_shapes=None, get_program=None
+    ):
+        """Dedup stage, run before the stimuli are truncated and rendered. Drops each stimulus that duplicates an earlier one in train or in test, so test never repeats a train stimulus.
+        :get_program: fn that returns the program for a shape, if the stimuli have shapes.
+        :ret: train, test, train_shapes, test_shapes without the duplicates."""
+        stimuli_index = self._get_stimuli_index()
+        if stimuli_index is None:
+            return train, test, train_shapes, test_shapes
+        deduplicated = []
+        for strokes, shapes in [(train, train_shapes), (test, test_shapes)]:
+            if shapes is None:
+                programs = [None] * len(strokes)
+            else:
+                programs = [get_program(shape) for shape in shapes]
+            is_unique = [
+                stimuli_index.add(stimulus_strokes, program) is None
+                for stimulus_strokes, program in zip(strokes, programs)
+            ]
+            deduplicated.append([s for s, u in zip(strokes, is_unique) if u])
+            if shapes is not None:
+                shapes = [s for s, u in zip(shapes, is_unique) if u]
+            deduplicated.append(shapes)
+        train, train_shapes, test, test_shapes = deduplicated
+        return train, test, train_shapes, test_shapes
+
+    def _pop_generated_stimuli(self, train_ratio):
+        """:ret: the stimuli generated while counting tasks, or newly generated stimuli. Each set of stimuli is only used for one set of tasks."""
+        if train_ratio in self._generated_stimuli:
+            return self._generated_stimuli.pop(train_ratio)
+        return self._generate_stimuli(train_ratio)
+
     def _generate_drawing_tasks_from_strokes(
         self,
         num_tasks_to_generate_per_condition,
@@ -263,8 +1059,13 @@ class AbstractTasksGenerator:
         train_ratio=1.0,
         render_parsed_program_fn=None,
         use_object_shapes=False,
+        max_train=None,
+        max_test=None,
     ):
-        """Helper method to generate Drawing Tasks from strokes arrays. Deprecated: number to generate."""
+        """Helper method to generate Drawing Tasks from strokes arrays. Deprecated: number to generate.
+
+        :max_train, max_test: if not None, the maximum number of train and test tasks to return. Stimuli are truncated before they are built into DrawingTasks, so only the returned tasks are rendered.
+        """
         (
             num_to_generate,
             human_readable_num_to_generate,
@@ -274,7 +1075,11 @@ class AbstractTasksGenerator:
 
         if render_parsed_program_fn is None:
             # No program; generate from strokes.
-            train_tasks, test_tasks = self._generate_strokes_for_stimuli(train_ratio)
+            train_tasks, test_tasks = self._pop_generated_stimuli(train_ratio)
+            train_tasks, test_tasks, _, _ = self._drop_duplicate_stimuli(
+                train_tasks, test_tasks
+            )
+            train_tasks, test_tasks = train_tasks[:max_train], test_tasks[:max_test]
             train_tasks = [
                 DrawingTask(
                     task_id=task_idx,
@@ -307,7 +1112,36 @@ class AbstractTasksGenerator:
                 test_tasks,
                 train_shapes,
                 test_shapes,
-            ) = self._generate_strokes_strings_for_stimuli(train_ratio)
+            ) = self._pop_generated_stimuli(train_ratio)
+            if use_object_shapes:
+                get_program = lambda task_shape: task_shape.base_program
+            else:
+                get_program = lambda task_shape: task_shape[0]
+            (
+                train_tasks,
+                test_tasks,
+                train_shapes,
+                test_shapes,
+            ) = self._drop_duplicate_stimuli(
+                train_tasks,
+                test_tasks,
+                train_shapes,
+                test_shapes,
+                get_program=get_program,
+            )
+            if use_object_shapes:
+                train_tasks, train_shapes = (
+                    train_tasks[:max_train],
+                    train_shapes[:max_train],
+                )
+                test_tasks, test_shapes = test_tasks[:max_test], test_shapes[:max_test]
+            else:
+                train_tasks, train_shapes = self._truncate_stimuli_strings(
+                    train_tasks, train_shapes, max_train
+                )
+                test_tasks, test_shapes = self._truncate_stimuli_strings(
+                    test_tasks, test_shapes, max_test
+                )
 
             # Back compatability: separate synthetic dictionaries and programs.
             if use_object_shapes:
@@ -322,7 +1156,7 @@ class AbstractTasksGenerator:
                         render_parsed_program_fn=render_parsed_program_fn,
                         task_shape=task_shape,
                     )
-                    for (task_idx, (task_strokes, task_shape),) in enumerate(
+                    for (task_idx, (task_strokes, task_shape)) in enumerate(
                         zip(train_tasks, train_shapes)
                     )
                 ]
@@ -338,13 +1172,15 @@ class AbstractTasksGenerator:
                         render_parsed_program_fn=render_parsed_program_fn,
                         task_shape=task_shape,
                     )
-                    for (task_idx, (task_strokes, task_shape),) in enumerate(
+                    for (task_idx, (task_strokes, task_shape)) in enumerate(
                         zip(test_tasks, test_shapes)
                     )
                 ]
             else:
-                train_strings, train_synthetic = zip(*train_shapes)
-                test_strings, test_synthetic = zip(*test_shapes)
+                train_strings = [program for program, _ in train_shapes]
+                train_synthetic = [synthetic for _, synthetic in train_shapes]
+                test_strings = [program for program, _ in test_shapes]
+                test_synthetic = [synthetic for _, synthetic in test_shapes]
 
                 train_tasks = [
                     DrawingTask(
@@ -444,7 +1280,172 @@ class ManualCurriculumTasksGenerator(AbstractTasksGenerator):
         return new_intersected_tasks
 
 
+def _build_sampled_shard(shard):
+    """Worker function for AbstractTasksGenerator._build_sampled_descriptors. Builds a shard of (descriptor, sample) of a registered generator.
+    :ret: [stimuli for each descriptor]."""
+    generator_name, sampled_descriptors = shard
+    generator = TasksGeneratorRegistry[generator_name]
+    return [
+        generator._build_stimuli(descriptor, sample)
+        for descriptor, sample in sampled_descriptors
+    ]
+
+
+def _build_stimuli_shard(shard):
+    """Worker function for AbstractTasksGenerator._generate_stimuli_stream_in_shards. Builds a shard of (index, descriptor) of a registered generator with their seeds.
+    :ret: [(descriptor, stimuli)]."""
+    generator_name, indexed_descriptors = shard
+    generator = TasksGeneratorRegistry[generator_name]
+    return [
+        (descriptor, generator._build_seeded_stimuli(index, descriptor))
+        for index, descriptor in indexed_descriptors
+    ]
+
+
+def _get_worker_stimuli(shard_stimuli):
+    """Helper function for the stimuli of a shard built by a worker process. Arrays unpickled from a worker share a copy of their dtype, so tasks built from them would pickle to different bytes than tasks built in a single process.
+    :ret: [stimuli] with their strokes viewed with the dtypes of this process."""
+    stroke_views = {}
+
+    def get_stroke_view(stroke):
+        if not isinstance(stroke, np.ndarray):
+            return stroke
+        if id(stroke) not in stroke_views:
+            stroke_views[id(stroke)] = stroke.view(np.dtype(stroke.dtype.str))
+        return stroke_views[id(stroke)]
+
+    return [
+        [
+            ([get_stroke_view(stroke) for stroke in strokes], string, synthetic_dict)
+            for strokes, string, synthetic_dict in stimuli
+        ]
+        for stimuli in shard_stimuli
+    ]
+
+
+def pack_rendering(rendering):
+    """:ret: shape, indices and values of the nonzero pixels of a rendering. Renderings are mostly blank, so this is much smaller than the rendering."""
+    indices = np.flatnonzero(rendering).astype(np.int32)
+    return rendering.shape, indices, rendering.ravel()[indices]
+
+
+def unpack_rendering(packed_rendering):
+    """:ret: the rendering for a packed_rendering from pack_rendering."""
+    shape, indices, values = packed_rendering
+    rendering = np.zeros(shape, dtype=values.dtype)
+    rendering.ravel()[indices] = values
+    return rendering
+
+
+def get_pixel_loss_matrix(
+    candidate_renderings, task_renderings, max_loss=None, batch_size=256
+):
+    """
+    Vectorized DrawingTask._normalized_pixel_loss between every candidate and every task rendering.
+    Renderings can be arrays or packed renderings (see pack_rendering). Losses are only computed over the pixels that are nonzero in some rendering, and candidates are compared with all of the tasks at once, batch_size candidates at a time.
+    :max_loss: if not None, pairs whose rendering norms differ by more than max_loss are not compared, and have an infinite loss.
+    :ret: N candidates x M tasks array of losses.
+    """
+    candidate_renderings = [_get_packed_rendering(r) for r in candidate_renderings]
+    task_renderings = [_get_packed_rendering(r) for r in task_renderings]
+    pixels = np.unique(
+        np.concatenate(
+            [indices for _, indices, _ in candidate_renderings + task_renderings]
+            + [np.zeros(0, dtype=np.int32)]
+        )
+    )
+    tasks = _to_pixel_matrix(task_renderings, pixels)
+    task_norms = np.einsum("ij,ij->i", tasks, tasks)
+
+    losses = np.full((len(candidate_renderings), len(task_renderings)), np.inf)
+    for start in range(0, len(candidate_renderings), batch_size):
+        candidates = _to_pixel_matrix(
+            candidate_renderings[start : start + batch_size], pixels
+        )
+        candidate_norms = np.einsum("ij,ij->i", candidates, candidates)
+        compared = np.ones((len(candidates), len(tasks)), dtype=bool)
+        if max_loss is not None:
+            # Lower bound on each loss from the triangle inequality, so that pairs that cannot be within max_loss are never compared.
+            compared = (
+                np.abs(
+                    np.sqrt(candidate_norms)[:, np.newaxis]
+                    - np.sqrt(task_norms)[np.newaxis, :]
+                )
+                <= max_loss
+            )
+        rows, columns = compared.any(axis=1), compared.any(axis=0)
+        # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b for every pair, as one matrix product.
+        squared_losses = (
+            candidate_norms[rows, np.newaxis]
+            + task_norms[np.newaxis, columns]
+            - 2 * candidates[rows] @ tasks[columns].T
+        )
+        batch_losses = np.full(compared.shape, np.inf)
+        batch_losses[np.ix_(rows, columns)] = np.sqrt(np.maximum(squared_losses, 0.0))
+        batch_losses[~compared] = np.inf
+        losses[start : start + batch_size] = batch_losses
+    return losses
+
+
+def batch_log_likelihood(
+    tasks,
+    parsed_programs=None,
+    renderings=None,
+    render_parsed_programs_fn=None,
+    min_threshold=0.1,
+):
+    """
+    Batched DrawingTask.logLikelihood for N candidate programs and M tasks, with the default pixel loss.
+    :parsed_programs: candidate Programs or program strings. Rendered with render_parsed_programs_fn if it is given (eg. gadgets_compiler.render_parsed_programs), and otherwise one at a time with the render_parsed_program of the first task.
+    :renderings: precomputed candidate renderings, instead of parsed_programs.
+    :ret: N x M array that is 0.0 where the loss of the candidate for the task is at most min_threshold, and NEGATIVEINFINITY elsewhere.
+    """
+    if renderings is None:
+        if render_parsed_programs_fn is not None:
+            renderings = render_parsed_programs_fn(parsed_programs)
+        else:
+            render_parsed_program = tasks[0].render_parsed_program
+            renderings = [render_parsed_program(p) for p in parsed_programs]
+    losses = get_pixel_loss_matrix(
+        renderings, [task.packed_rendering for task in tasks], max_loss=min_threshold
+    )
+    return np.where(losses > min_threshold, NEGATIVEINFINITY, 0.0)
+
+
+def _get_packed_rendering(rendering):
+    if isinstance(rendering, tuple):
+        return rendering
+    return pack_rendering(rendering)
+
+
+def _to_pixel_matrix(packed_renderings, pixels):
+    """:ret: len(packed_renderings) x len(pixels) array of the values of each rendering at the pixels."""
+    matrix = np.zeros((len(packed_renderings), len(pixels)))
+    if len(packed_renderings) == 0:
+        return matrix
+    rows = np.repeat(
+        np.arange(len(packed_renderings)),
+        [len(indices) for _, indices, _ in packed_renderings],
+    )
+    indices = np.concatenate([indices for _, indices, _ in packed_renderings])
+    values = np.concatenate([values for _, _, values in packed_renderings])
+    matrix[rows, np.searchsorted(pixels, indices)] = values
+    return matrix
+
+
 class DrawingTask(Task):
+    """
+    DrawingTask: a task with a ground truth program or strokes. The rendering, verbose ground truth programs and program tokens are only computed on first access, so tasks can be built and summarized without rendering them.
+    :compact_rendering: if True, only keeps the rendering packed (see pack_rendering), and unpacks it on each access.
+    """
+
+    # Lazy attributes that are not pickled. The rendering is pickled separately, and the rest are computed again when they are used.
+    _LAZY_ATTRIBUTES = (
+        "_rendering",
+        "_verbose_ground_truth_programs",
+        "_program_tokens",
+    )
+
     def __init__(
         self,
         task_id,
@@ -458,6 +1459,7 @@ class DrawingTask(Task):
         synthetic_abstractions={},
         task_shape=None,
         synthetic_language={},
+        compact_rendering=False,
     ):
         padded_index = str.zfill(str(task_id), 3)
 
@@ -467,6 +1469,8 @@ class DrawingTask(Task):
         else:
             task_name = f"{task_generator_name}_{padded_index}"
         super(DrawingTask, self).__init__(task_name, request, examples=[], features=[])
+        self._set_lazy_defaults()
+        self._compact_rendering = compact_rendering
 
         self.task_shape = task_shape
         self.task_generator_name = task_generator_name
@@ -483,44 +1487,148 @@ class DrawingTask(Task):
             self.ground_truth_program
         ]  # For multiple ambiguous parses.
 
-        # Add verbose ground truth programs and unsimplified
-        self.verbose_ground_truth_programs = {
-            verbosity_level: Program.parse(self.ground_truth_program).show(
-                isFunction=False, alternate_names=verbosity_level
-            )
-            for verbosity_level in [VERBOSITY_0, VERBOSITY_1]
-        }
-        # Add unsimplified if we have it.
-        if task_shape is not None:
-            self.verbose_ground_truth_programs[
-                "unfolded"
-            ] = task_shape.unsimplified_program
-            for verbosity_level in [VERBOSITY_0, VERBOSITY_1]:
-                self.verbose_ground_truth_programs[
-                    "unfolded_" + str(verbosity_level)
-                ] = Program.parse(task_shape.unsimplified_program).show(
-                    isFunction=False, alternate_names=verbosity_level
-                )
-
         self.possible_ground_truth_strokes = [ground_truth_strokes]
         self.rendering = rendering
         self.render_parsed_program = render_parsed_program_fn
         self.render_strokes = render_strokes_fn
-        if self.rendering is None:
-            if self.ground_truth_program is not None:
-                self.rendering = render_parsed_program_fn(self.ground_truth_program)
-            elif self.ground_truth_strokes is not None:
-                self.rendering = render_strokes_fn(ground_truth_strokes)
-        assert self.rendering is not None
+        assert rendering is not None or self._get_render_fn() is not None
 
         self.synthetic_abstractions = synthetic_abstractions
-        if self.synthetic_abstractions == {} and task_shape is not None:
+        if not self.synthetic_abstractions and task_shape is not None:
             self.synthetic_abstractions = task_shape.synthetic_abstractions
 
         self.synthetic_language = synthetic_language
         if self.synthetic_language == {} and task_shape is not None:
             self.synthetic_language = task_shape.synthetic_language
 
+    def _set_lazy_defaults(self):
+        self._rendering = None
+        self._compact_rendering = False
+        self._verbose_ground_truth_programs = None
+        self._program_tokens = None
+
+    def __getstate__(self):
+        """Pickles the task with its rendering, so that it does not need to be rendered again when it is loaded."""
+        if self._rendering is None:
+            self.rendering = self._render()
+        state = self.get_record()
+        state["_rendering"] = self._rendering
+        return state
+
+    def get_record(self):
+        """:ret: {attribute : value} for the task without its rendering or cached attributes, which can be restored with __setstate__. The record does not depend on which cached attributes have been used. See task_archive."""
+        return {
+            name: value
+            for name, value in self.__dict__.items()
+            if name not in DrawingTask._LAZY_ATTRIBUTES
+        }
+
+    def __setstate__(self, state):
+        # Tasks pickled before the lazy attributes store them as rendering and verbose_ground_truth_programs, which set them through their properties.
+        self._set_lazy_defaults()
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def _get_render_fn(self):
+        """:ret: the function that renders the ground truth program, or the ground truth strokes if there is no program."""
+        if self.ground_truth_program is not None:
+            return self.render_parsed_program
+        if self.ground_truth_strokes is not None:
+            return self.render_strokes
+        return None
+
+    def _render(self):
+        if self.ground_truth_program is not None:
+            return self.render_parsed_program(self.ground_truth_program)
+        return self.render_strokes(self.ground_truth_strokes)
+
+    @property
+    def rendering(self):
+        """:ret: the rendering of the task, which is rendered on first access."""
+        if self._rendering is None:
+            rendering = self._render()
+            self.rendering = rendering
+            return rendering
+        if self._compact_rendering:
+            return unpack_rendering(self._rendering)
+        return self._rendering
+
+    @rendering.setter
+    def rendering(self, rendering):
+        if rendering is not None and self._compact_rendering:
+            rendering = pack_rendering(rendering)
+            self._clear_program_rendering()
+        self._rendering = rendering
+
+    def _clear_program_rendering(self):
+        """render_parsed_program caches the dense rendering on the program, which a compact task would otherwise keep in memory and pickle with the program."""
+        ground_truth_program = getattr(self, "ground_truth_program", None)
+        if hasattr(ground_truth_program, "rendering"):
+            del ground_truth_program.rendering
+
+    def clear_rendering(self):
+        """Drops the rendering to free its memory. It is rendered again when it is next used. Tasks without a render function keep their rendering."""
+        if self._get_render_fn() is not None:
+            self._rendering = None
+
+    @property
+    def packed_rendering(self):
+        """:ret: the rendering packed with pack_rendering, without unpacking it if it is compact."""
+        if self._compact_rendering and self._rendering is not None:
+            return self._rendering
+        return pack_rendering(self.rendering)
+
+    @property
+    def compact_rendering(self):
+        """:ret: whether the rendering is only kept packed. Setting it repacks or unpacks the rendering if it has already been rendered."""
+        return self._compact_rendering
+
+    @compact_rendering.setter
+    def compact_rendering(self, compact_rendering):
+        rendering = self.rendering if self._rendering is not None else None
+        self._compact_rendering = compact_rendering
+        self.rendering = rendering
+
+    @property
+    def verbose_ground_truth_programs(self):
+        """:ret: {verbosity_level : program string} for the ground truth program, and its unsimplified program if it has a task shape."""
+        if self._verbose_ground_truth_programs is None:
+            program_metadata = get_program_metadata(self.ground_truth_program)
+            verbose_ground_truth_programs = {
+                verbosity_level: program_metadata.show(verbosity_level)
+                for verbosity_level in [VERBOSITY_0, VERBOSITY_1]
+            }
+            # Add unsimplified if we have it.
+            if self.task_shape is not None:
+                verbose_ground_truth_programs[
+                    "unfolded"
+                ] = self.task_shape.unsimplified_program
+                unfolded_metadata = get_program_metadata(
+                    self.task_shape.unsimplified_program
+                )
+                for verbosity_level in [VERBOSITY_0, VERBOSITY_1]:
+                    verbose_ground_truth_programs[
+                        "unfolded_" + str(verbosity_level)
+                    ] = unfolded_metadata.show(verbosity_level)
+            self._verbose_ground_truth_programs = verbose_ground_truth_programs
+        return self._verbose_ground_truth_programs
+
+    @verbose_ground_truth_programs.setter
+    def verbose_ground_truth_programs(self, verbose_ground_truth_programs):
+        self._verbose_ground_truth_programs = verbose_ground_truth_programs
+
+    @property
+    def program_tokens(self):
+        """:ret: tokens of the ground truth program, or "" if there is no program."""
+        if self._program_tokens is None:
+            program = (
+                self.ground_truth_program
+                if self.ground_truth_program is not None
+                else ""
+            )
+            self._program_tokens = self._tokenize_program(program)
+        return self._program_tokens
+
     def task_summary(self):
         strokes = (
             self.ground_truth_strokes if self.ground_truth_strokes is not None else []
@@ -528,12 +1636,11 @@ class DrawingTask(Task):
         program = (
             self.ground_truth_program if self.ground_truth_program is not None else ""
         )
-        program_tokens = self._tokenize_program(program)
         summary = {
             "task_name": self.name,
             "task_generator": self.task_generator_name,
             "dreamcoder_program_dsl_0": str(program),
-            "dreamcoder_program_dsl_0_tokens": program_tokens,
+            "dreamcoder_program_dsl_0_tokens": self.program_tokens,
             "ground_truth_strokes": [strokes],
             "n_strokes": len(strokes),
         }
@@ -562,27 +1669,17 @@ class DrawingTask(Task):
         return summary
 
     def _get_crossed_abstractions(self, synthetic_abstractions):
-        for parts in [
-            LOW_LEVEL,
-            MID_LEVEL,
-            HIGH_LEVEL,
-            LOW_LEVEL_PARTS,
-            MID_LEVEL_PARTS,
-            HIGH_LEVEL_PARTS,
-        ]:
-            for params in [LOW_LEVEL_PARAMS, MID_LEVEL_PARAMS, HIGH_LEVEL_PARAMS]:
-                if parts.split("_")[:2] == params.split("_")[:2]:
-                    self.synthetic_abstractions[parts + "_with_params"] = (
-                        self.synthetic_abstractions[parts]
-                        + self.synthetic_abstractions[params]
-                    )
-        return self.synthetic_abstractions
+        if not isinstance(synthetic_abstractions, SyntheticAbstractions):
+            synthetic_abstractions = SyntheticAbstractions.from_dict(
+                synthetic_abstractions
+            )
+        return synthetic_abstractions.to_summary()
 
     def _tokenize_program(self, program):
         if program == "":
             return program
         if type(program) == str:
-            program = Program.parse(program)
+            return get_program_metadata(program).tokens
         return program.left_order_tokens(show_vars=True)
 
     def _normalized_pixel_loss(self, img1, img2):
@@ -591,9 +1688,11 @@ class DrawingTask(Task):
     def logLikelihood(
         self, parsed_program, timeout=None, loss_fn=None, min_threshold=0.1,
     ):
-        """Log likelihood function for programs."""
+        """Log likelihood function for programs. The loss_fn defaults to _normalized_pixel_loss. See batch_log_likelihood to score many programs for many tasks at once."""
         if not hasattr(parsed_program, "rendering"):
             parsed_program.rendering = self.render_parsed_program(parsed_program)
+        if loss_fn is None:
+            loss_fn = self._normalized_pixel_loss
 
         loss = loss_fn(self.rendering, parsed_program.rendering)
         if loss > min_threshold:
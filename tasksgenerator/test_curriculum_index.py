@@ -0,0 +1,95 @@
+"""test_curriculum_index.py | Author : Catherine Wong"""
+
+from types import SimpleNamespace as MockTask
+
+import tasksgenerator.curriculum_index as to_test
+
+TEST_SPLITS = ["train", "test"]
+TEST_CONDITION = "condition_test"
+TEST_BLOCKS = ["curriculum_0", "curriculum_1"]
+
+
+def _build_curriculum():
+    curriculum = {}
+    for split in TEST_SPLITS:
+        curriculum[split] = {TEST_CONDITION: {}}
+        for block_idx, curriculum_block in enumerate(TEST_BLOCKS):
+            curriculum[split][TEST_CONDITION][curriculum_block] = [
+                MockTask(
+                    name=f"{split}_{block_idx}_{task_idx}",
+                    task_generator_name=f"test_{split}",
+                )
+                for task_idx in range(block_idx + 2)
+            ]
+    return curriculum
+
+
+def test_curriculum_index_from_curriculum():
+    curriculum = _build_curriculum()
+    index = to_test.CurriculumIndex.from_curriculum(curriculum)
+    assert len(index) == 10
+    for split in TEST_SPLITS:
+        for curriculum_block in TEST_BLOCKS:
+            block_tasks = curriculum[split][TEST_CONDITION][curriculum_block]
+            assert (
+                index.get_block(split, TEST_CONDITION, curriculum_block) == block_tasks
+            )
+            for task in block_tasks:
+                assert index.get_task(task.name) is task
+        assert index.get_split(split) == [
+            task
+            for curriculum_block in TEST_BLOCKS
+            for task in curriculum[split][TEST_CONDITION][curriculum_block]
+        ]
+        assert len(index.get_generator_tasks(f"test_{split}")) == 5
+    assert "train_0_0" in index
+    assert "train_9_9" not in index
+
+
+def test_curriculum_index_unique_tasks():
+    curriculum = _build_curriculum()
+    task = curriculum["train"][TEST_CONDITION]["curriculum_0"][0]
+    curriculum["test"][TEST_CONDITION]["curriculum_0"].append(task)
+    index = to_test.CurriculumIndex.from_curriculum(curriculum)
+    assert len(index) == 11
+    assert len(index.get_unique_tasks()) == 10
+    assert index.get_task_index(task.name) == 0
+
+
+def test_curriculum_index_manifest():
+    index = to_test.CurriculumIndex.from_curriculum(_build_curriculum())
+    manifest = index.get_manifest()
+    manifest_index = to_test.CurriculumIndex.from_manifest(manifest)
+    assert manifest_index.get_manifest() == manifest
+    for split in TEST_SPLITS:
+        for curriculum_block in TEST_BLOCKS:
+            assert manifest_index.get_block(
+                split, TEST_CONDITION, curriculum_block
+            ) == [
+                task.name
+                for task in index.get_block(split, TEST_CONDITION, curriculum_block)
+            ]
+
+
+def test_curriculum_index_shared_task_names():
+    curriculum = _build_curriculum()
+    train_task = curriculum["train"][TEST_CONDITION]["curriculum_0"][0]
+    test_task = MockTask(name=train_task.name, task_generator_name="test_test")
+    curriculum["test"][TEST_CONDITION]["curriculum_0"].append(test_task)
+    index = to_test.CurriculumIndex.from_curriculum(curriculum)
+    train_name = to_test.get_task_export_name("train", train_task.name)
+    test_name = to_test.get_task_export_name("test", train_task.name)
+    assert index.get_export_name(train_task) == train_name
+    assert index.get_export_name(test_task) == test_name
+    assert index.get_task(train_name) is train_task
+    assert index.get_task(test_name) is test_task
+    assert train_task.name not in index
+    assert index.get_export_name(index.get_split("train")[1]) == "train_0_1"
+
+    manifest = index.get_manifest()
+    assert len(set(manifest[to_test.MANIFEST_TASKS])) == len(index)
+    manifest_index = to_test.CurriculumIndex.from_manifest(manifest)
+    assert manifest_index.get_manifest() == manifest
+    assert manifest_index.get_block("test", TEST_CONDITION, "curriculum_0")[-1] == (
+        test_name
+    )
@@ -2,7 +2,9 @@
 test_dial_programs_tasks_generator.py | Author: Catherine Wong
 """
 import os
+import random
 import numpy as np
+from collections import defaultdict
 from tasksgenerator.bases_parts_tasks_generator import (
     LARGE,
     SMALL,
@@ -99,6 +101,60 @@ def test_add_antenna_to_stimuli():
     )
 
 
+def test_sample_antenna_choices_then_build():
+    (
+        strokes,
+        stroke_strings,
+        base_width,
+        base_height,
+        base_dict,
+    ) = generator._generate_bases_string(
+        base_columns="2",
+        max_rows="1",
+        n_tiers="1",
+        base_end_filials=False,
+    )
+    antenna_end_shapes = [None, c_string, r_string]
+    for seed in range(10):
+        random.seed(seed)
+        antenna_stimuli = generator._add_antenna_to_stimuli(
+            strokes,
+            stroke_strings,
+            base_width,
+            base_height,
+            generation_probability=0.5,
+            antenna_generation_probability=0.5,
+            add_double_antenna=True,
+            add_side_antenna=True,
+            stimuli_synthetic_dict=base_dict,
+        )
+        next_draw = random.uniform(0, 1)
+
+        # Sampling first draws the same random stream, so it builds the same stimuli.
+        random.seed(seed)
+        antenna_choices = generator._sample_antenna_choices(
+            generation_probability=0.5,
+            antenna_generation_probability=0.5,
+            n_antenna=generator._n_antenna(antenna_end_shapes),
+        )
+        assert random.uniform(0, 1) == next_draw
+        if antenna_choices is None:
+            assert antenna_stimuli is None
+            continue
+        _, sampled_strings, _ = generator._build_antenna_stimuli(
+            strokes,
+            stroke_strings,
+            base_width,
+            base_height,
+            antenna_choices,
+            antenna_end_shapes=antenna_end_shapes,
+            add_double_antenna=True,
+            add_side_antenna=True,
+            stimuli_synthetic_dict=base_dict,
+        )
+        assert sampled_strings == antenna_stimuli[1]
+
+
 def test_generate_nested_circle_dials_string():
     test_strokes, test_stroke_strings = [], []
 
@@ -235,3 +291,52 @@ def test_generate_parts_strings_for_stimuli():
         _test_parse_render_save_programs(
             program_strings=test_stroke_strings, tmpdir=DESKTOP, split=split
         )
+
+
+def test_get_stimulus():
+    generator = TasksGeneratorRegistry[to_test.DialProgramsTasksGenerator.name]
+    stream_stimuli = defaultdict(list)
+    stream = generator.generate_stimuli_stream(train_ratio=0.8)
+    for (split, descriptor, strokes, string, synthetic) in stream:
+        stream_stimuli[descriptor].append((strokes, string))
+    descriptors = list(generator._generate_stimuli_descriptors())
+    sampled_indices = [
+        index
+        for index, descriptor in enumerate(descriptors)
+        if descriptor in stream_stimuli
+    ]
+    for index in sampled_indices[:: len(sampled_indices) // 5]:
+        # Any global random state, so that the stimulus only depends on its index.
+        random.seed(index)
+        np.random.seed(index)
+        numpy_random_state = np.random.get_state()
+        (descriptor, stimuli) = generator.get_stimulus(index)
+        assert descriptor == descriptors[index]
+        assert len(stimuli) == len(stream_stimuli[descriptor])
+        for (strokes, string, synthetic), (stream_strokes, stream_string) in zip(
+            stimuli, stream_stimuli[descriptor]
+        ):
+            assert string == stream_string
+            for stroke, stream_stroke in zip(strokes, stream_strokes):
+                assert np.array_equal(stroke, stream_stroke)
+        # The global random states are restored.
+        assert np.array_equal(np.random.get_state()[1], numpy_random_state[1])
+
+
+def test_generate_strokes_strings_for_stimuli_in_shards():
+    generator = TasksGeneratorRegistry[to_test.DialProgramsTasksGenerator.name]
+    random.seed(0)
+    serial = generator._generate_strokes_strings_for_stimuli(train_ratio=0.8)
+    generator.num_workers = 2
+    try:
+        random.seed(0)
+        sharded = generator._generate_strokes_strings_for_stimuli(train_ratio=0.8)
+    finally:
+        generator.num_workers = 1
+    train, test, train_strings, test_strings = serial
+    assert len(sharded[0]) == len(train) and len(sharded[1]) == len(test)
+    assert [string for string, _ in sharded[2]] == [s for s, _ in train_strings]
+    assert [string for string, _ in sharded[3]] == [s for s, _ in test_strings]
+    for strokes, sharded_strokes in zip(train + test, sharded[0] + sharded[1]):
+        for stroke, sharded_stroke in zip(strokes, sharded_strokes):
+            assert np.array_equal(stroke, sharded_stroke)
@@ -0,0 +1,51 @@
+"""test_export_pipeline.py | Author : Catherine Wong"""
+
+import threading
+import pytest
+
+import tasksgenerator.export_pipeline as to_test
+
+TEST_TASKS = list(range(100))
+
+
+def test_export_pipeline_run():
+    pipeline = to_test.ExportPipeline(queue_size=2)
+    task_stage_tasks, stream_stage_tasks, prepared_tasks = [], [], []
+    lock = threading.Lock()
+
+    def task_fn(task):
+        with lock:
+            task_stage_tasks.append(task)
+
+    pipeline.add_task_stage("task_stage", task_fn, num_workers=3)
+    pipeline.add_stream_stage("stream_stage", stream_stage_tasks.extend)
+    job_runs = []
+    pipeline.add_job("job", lambda: job_runs.append(True))
+    timings = pipeline.run(TEST_TASKS, prepare_fn=prepared_tasks.append)
+
+    assert sorted(task_stage_tasks) == TEST_TASKS
+    assert stream_stage_tasks == TEST_TASKS
+    assert prepared_tasks == TEST_TASKS
+    assert job_runs == [True]
+    for stage in [
+        "task_stage",
+        "stream_stage",
+        "job",
+        to_test.PREPARE_STAGE,
+        to_test.TOTAL_TIME,
+    ]:
+        assert timings[stage] >= 0
+
+
+def test_export_pipeline_run_error():
+    pipeline = to_test.ExportPipeline(queue_size=2)
+
+    def task_fn(task):
+        if task == 10:
+            raise ValueError(task)
+
+    pipeline.add_task_stage("task_stage", task_fn)
+    # A stream stage that stops early does not block the other stages.
+    pipeline.add_stream_stage("stream_stage", lambda tasks: next(tasks))
+    with pytest.raises(ValueError):
+        pipeline.run(TEST_TASKS)
@@ -0,0 +1,48 @@
+"""
+test_gadgets_tasks_generator.py | Author: Catherine Wong
+"""
+import random
+import numpy as np
+from tasksgenerator.tasks_generator import TasksGeneratorRegistry, TaskCurriculum
+
+import tasksgenerator.gadgets_1k_tasks_generator as to_test
+
+SUBGENERATOR_NAMES = [
+    to_test.NutsBoltsProgramsTasksGenerator.name,
+    to_test.DialProgramsTasksGenerator.name,
+]
+
+
+def _get_tasks(curriculum, split, condition):
+    condition = f"{TaskCurriculum.CONDITION_BLOCK_PREFIX}_{condition}"
+    return [
+        task
+        for tasks in curriculum.get_curriculum()[split][condition].values()
+        for task in tasks
+    ]
+
+
+def test_generate_tasks_curriculum():
+    generator = TasksGeneratorRegistry[to_test.Gadgets1KTasksGenerator.name]
+    generator.subgenerator_names = SUBGENERATOR_NAMES
+    generator.num_workers = 2
+    random_state = random.getstate()
+    curriculum = generator.generate_tasks_curriculum(10, train_ratio=0.8)
+    for subgenerator_name in SUBGENERATOR_NAMES:
+        random.setstate(random_state)
+        subgenerator_curriculum = TasksGeneratorRegistry[
+            subgenerator_name
+        ].generate_tasks_curriculum(10, train_ratio=0.8)
+        # Each subdomain is in its own condition, and is the same as when it is generated on its own.
+        for split in [TaskCurriculum.SPLIT_TRAIN, TaskCurriculum.SPLIT_TEST]:
+            tasks = _get_tasks(curriculum, split, subgenerator_name)
+            subgenerator_tasks = _get_tasks(
+                subgenerator_curriculum, split, subgenerator_name
+            )
+            assert len(tasks) > 0
+            assert [t.name for t in tasks] == [t.name for t in subgenerator_tasks]
+            for task, subgenerator_task in zip(tasks, subgenerator_tasks):
+                assert str(task.ground_truth_program) == str(
+                    subgenerator_task.ground_truth_program
+                )
+                assert np.array_equal(task.rendering, subgenerator_task.rendering)
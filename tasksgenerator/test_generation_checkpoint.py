@@ -0,0 +1,31 @@
+"""test_generation_checkpoint.py | Author : Catherine Wong"""
+
+import os
+import random
+import pytest
+import numpy as np
+
+import tasksgenerator.generation_checkpoint as to_test
+
+TEST_TASK_NAMES = ["test_0", "test_1", "test_2"]
+
+
+def test_generation_checkpoint_save_load(tmpdir):
+    checkpoint_file = os.path.join(tmpdir, "checkpoint.pkl")
+    checkpoint = to_test.GenerationCheckpoint(checkpoint_file)
+    checkpoint.record_random_state()
+    expected_random = (random.random(), np.random.rand())
+    checkpoint.start(TEST_TASK_NAMES)
+    checkpoint.save(position=2, summary_offset=100)
+
+    loaded_checkpoint = to_test.GenerationCheckpoint.load(checkpoint_file)
+    assert loaded_checkpoint.position == 2
+    assert loaded_checkpoint.summary_offset == 100
+    loaded_checkpoint.restore_random_state()
+    assert (random.random(), np.random.rand()) == expected_random
+    loaded_checkpoint.start(TEST_TASK_NAMES)
+    with pytest.raises(ValueError):
+        loaded_checkpoint.start(TEST_TASK_NAMES[::-1])
+
+    loaded_checkpoint.remove()
+    assert not os.path.exists(checkpoint_file)
@@ -0,0 +1,100 @@
+"""test_incremental_export.py | Author : Catherine Wong"""
+
+import os
+from dreamcoder.program import Program
+
+import primitives.object_primitives as object_primitives
+import tasksgenerator.incremental_export as to_test
+from tasksgenerator.tasks_generator import DrawingTask
+
+TEST_PROGRAMS = ["(line)", "(circle)", "(rectangle)"]
+
+
+def _build_task(task_id, program_string):
+    return DrawingTask(
+        task_id=task_id,
+        request=object_primitives.tstroke,
+        ground_truth_program=Program.parse(program_string),
+        render_parsed_program_fn=object_primitives.render_parsed_program,
+        task_generator_name="test_incremental_export",
+    )
+
+
+def _write_outputs(tmpdir, tasks):
+    for task in tasks:
+        for output in _get_outputs(tmpdir, task):
+            with open(output, "w") as f:
+                f.write(str(task.ground_truth_program))
+
+
+def _get_outputs(tmpdir, task):
+    return [os.path.join(tmpdir, task.name + ".txt")]
+
+
+def test_get_task_content_hash():
+    task = _build_task(0, "(line)")
+    task_hash = to_test.get_task_content_hash(task)
+    assert task._rendering is None
+    assert task_hash == to_test.get_task_content_hash(_build_task(0, "(line)"))
+    assert task_hash != to_test.get_task_content_hash(_build_task(0, "(circle)"))
+
+
+def test_incremental_export_changed_tasks(tmpdir):
+    manifest_file = os.path.join(tmpdir, "manifest.json")
+    get_outputs = lambda task: _get_outputs(tmpdir, task)
+    tasks = [_build_task(idx, program) for idx, program in enumerate(TEST_PROGRAMS)]
+
+    incremental_export = to_test.IncrementalExport(manifest_file)
+    assert incremental_export.get_changed_tasks(tasks, get_outputs) == tasks
+    _write_outputs(tmpdir, tasks)
+    incremental_export.save()
+
+    incremental_export = to_test.IncrementalExport(manifest_file)
+    assert incremental_export.get_changed_tasks(tasks, get_outputs) == []
+
+    changed_task = _build_task(1, "(rectangle)")
+    os.remove(get_outputs(tasks[2])[0])
+    tasks = [tasks[0], changed_task, tasks[2]]
+    incremental_export = to_test.IncrementalExport(manifest_file)
+    assert incremental_export.get_changed_tasks(tasks, get_outputs) == tasks[1:]
+
+
+def test_incremental_export_remove_stale_outputs(tmpdir):
+    manifest_file = os.path.join(tmpdir, "manifest.json")
+    get_outputs = lambda task: _get_outputs(tmpdir, task)
+    tasks = [_build_task(idx, program) for idx, program in enumerate(TEST_PROGRAMS)]
+    incremental_export = to_test.IncrementalExport(manifest_file)
+    incremental_export.get_changed_tasks(tasks, get_outputs)
+    _write_outputs(tmpdir, tasks)
+    incremental_export.save()
+
+    incremental_export = to_test.IncrementalExport(manifest_file)
+    assert incremental_export.get_changed_tasks(tasks[:2], get_outputs) == []
+    stale_outputs = get_outputs(tasks[2])
+    assert incremental_export.get_stale_outputs() == stale_outputs
+    assert incremental_export.remove_stale_outputs() == stale_outputs
+    assert not os.path.exists(stale_outputs[0])
+    assert all(os.path.exists(get_outputs(task)[0]) for task in tasks[:2])
+
+
+def test_incremental_export_shared_task_names(tmpdir):
+    manifest_file = os.path.join(tmpdir, "manifest.json")
+    # A train and a test task with the same name, exported under different names.
+    tasks = [_build_task(0, "(line)"), _build_task(0, "(circle)")]
+    export_names = {id(tasks[0]): "train_0", id(tasks[1]): "test_0"}
+    get_export_name = lambda task: export_names[id(task)]
+    get_outputs = lambda task: [os.path.join(tmpdir, get_export_name(task) + ".txt")]
+    incremental_export = to_test.IncrementalExport(manifest_file)
+    incremental_export.get_changed_tasks(tasks, get_outputs, get_export_name)
+    for task in tasks:
+        with open(get_outputs(task)[0], "w") as f:
+            f.write(str(task.ground_truth_program))
+    incremental_export.save()
+
+    incremental_export = to_test.IncrementalExport(manifest_file)
+    assert sorted(incremental_export.previous_tasks) == ["test_0", "train_0"]
+    changed_tasks = incremental_export.get_changed_tasks(
+        tasks, get_outputs, get_export_name
+    )
+    assert changed_tasks == []
+    assert incremental_export.get_stale_outputs() == []
@@ -7,6 +7,7 @@ from primitives.gadgets_primitives import *
 from tasksgenerator.tasks_generator import (
     TasksGeneratorRegistry,
     AbstractTasksGenerator,
+    TaskCurriculum,
 )
 from primitives.test_object_primitives import (
     _test_parse_render_save_programs,
@@ -84,3 +85,88 @@ def test_generate_mid_dsl_primitives(tmpdir):
             program_strings=objects, tmpdir=DESKTOP, split="l2"
         )
         print(f"Total string length: {np.sum([len(o) for o in objects])}")
+
+
+def test_generate_stimuli_stream():
+    generator = TasksGeneratorRegistry[to_test.NutsBoltsProgramsTasksGenerator.name]
+    (
+        _,
+        _,
+        train_strings,
+        test_strings,
+    ) = generator._generate_strokes_strings_for_stimuli(train_ratio=0.8)
+    all_strings = sorted(s for (s, synthetic) in train_strings + test_strings)
+
+    stream = list(generator.generate_stimuli_stream(train_ratio=0.8))
+    assert sorted(s for (_, _, _, s, _) in stream) == all_strings
+    # Splitting is deterministic.
+    assert [split for (split, _, _, _, _) in stream] == [
+        split for (split, _, _, _, _) in generator.generate_stimuli_stream(0.8)
+    ]
+
+
+def test_generate_tasks_stream():
+    generator = TasksGeneratorRegistry[to_test.NutsBoltsProgramsTasksGenerator.name]
+    tasks_stream = generator.generate_tasks_stream(
+        request_type=object_primitives.tstroke,
+        render_parsed_program_fn=to_test.gadgets_compiler.render_parsed_program,
+        train_ratio=0.8,
+        max_train=10,
+        max_test=2,
+    )
+    splits = [split for (split, task) in tasks_stream]
+    assert splits.count(TaskCurriculum.SPLIT_TRAIN) == 10
+    assert splits.count(TaskCurriculum.SPLIT_TEST) == 2
+
+
+def test_generate_tasks_stream_stratify_split():
+    generator = TasksGeneratorRegistry[to_test.NutsBoltsProgramsTasksGenerator.name]
+    generator.stratify_split = True
+    tasks_stream = generator.generate_tasks_stream(
+        request_type=object_primitives.tstroke,
+        render_parsed_program_fn=to_test.gadgets_compiler.render_parsed_program,
+        train_ratio=0.8,
+        max_train=10,
+        max_test=4,
+    )
+    tasks_stream = list(tasks_stream)
+    splits = [split for (split, task) in tasks_stream]
+    assert splits.count(TaskCurriculum.SPLIT_TRAIN) == 10
+    assert splits.count(TaskCurriculum.SPLIT_TEST) == 4
+    # Both simple and perforated nuts are in test, rather than only the first sub-family.
+    is_perforated = {
+        "decorator_strokes" in task.synthetic_abstractions["mid_level_parts"]
+        for (split, task) in tasks_stream
+        if split == TaskCurriculum.SPLIT_TEST
+    }
+    assert is_perforated == {True, False}
+
+
+def test_get_stimulus():
+    generator = TasksGeneratorRegistry[to_test.NutsBoltsProgramsTasksGenerator.name]
+    stream = list(generator.generate_stimuli_stream(train_ratio=0.8))
+    assert generator.get_num_stimuli() == len(stream)
+    for index in [0, len(stream) // 2, len(stream) - 1]:
+        # Each nut descriptor builds exactly one stimulus.
+        (descriptor, [(strokes, string, synthetic)]) = generator.get_stimulus(index)
+        (_, stream_descriptor, stream_strokes, stream_string, _) = stream[index]
+        assert descriptor == stream_descriptor
+        assert string == stream_string
+        for stroke, stream_stroke in zip(strokes, stream_strokes):
+            assert np.array_equal(stroke, stream_stroke)
+
+
+def test_generate_stimuli_stream_in_shards():
+    generator = TasksGeneratorRegistry[to_test.NutsBoltsProgramsTasksGenerator.name]
+    serial_stream = list(generator.generate_stimuli_stream(train_ratio=0.8))
+    generator.num_workers = 2
+    try:
+        sharded_stream = list(generator.generate_stimuli_stream(train_ratio=0.8))
+    finally:
+        generator.num_workers = 1
+    assert len(serial_stream) == len(sharded_stream)
+    for serial, sharded in zip(serial_stream, sharded_stream):
+        split, descriptor, strokes, string, synthetic = serial
+        assert (split, descriptor, string) == (sharded[0], sharded[1], sharded[3])
+        for stroke, sharded_stroke in zip(strokes, sharded[2]):
+            assert np.array_equal(stroke, sharded_stroke)
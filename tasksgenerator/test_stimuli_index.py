@@ -0,0 +1,64 @@
+"""test_stimuli_index.py | Author : Catherine Wong"""
+
+import numpy as np
+import primitives.gadgets_primitives  # Registers the gadgets DSL primitives.
+import tasksgenerator.stimuli_index as to_test
+from tasksgenerator.tasks_generator import TasksGeneratorRegistry
+from tasksgenerator.nuts_bolts_programs_tasks_generator import (
+    NutsBoltsProgramsTasksGenerator,
+)
+
+LINE = [np.array([[-1.0, 0.0], [1.0, 0.0]])]
+SQUARE = [np.array([[-1.0, -1.0], [1.0, -1.0], [1.0, 1.0], [-1.0, 1.0], [-1.0, -1.0]])]
+
+
+def test_get_perceptual_cells():
+    cells = to_test.get_perceptual_cells(LINE)
+    cell_size = to_test.PERCEPTUAL_EXTENT / to_test.PERCEPTUAL_GRID_SIZE
+    # One cell for each cell width along the line, in a single row.
+    assert abs(len(cells) - 2.0 / cell_size) <= 2
+    assert len(set(cells // to_test.PERCEPTUAL_GRID_SIZE)) == 1
+    assert np.array_equal(cells, to_test.get_perceptual_cells([LINE[0][::-1]]))
+
+
+def test_stimuli_index_program_duplicate():
+    index = to_test.StimuliIndex()
+    assert index.add(LINE, "(C l (C c r))") is None
+    assert index.add(SQUARE, "(C (C l c) r)") == 0
+    assert len(index) == 1
+    assert index.num_duplicates == 1
+
+
+def test_stimuli_index_perceptual_duplicate():
+    index = to_test.StimuliIndex()
+    assert index.add(SQUARE) is None
+    assert index.add(LINE) is None
+    # The same square, drawn as one stroke per side.
+    sides = [SQUARE[0][i : i + 2] for i in range(4)]
+    assert index.add(sides) == 0
+    assert len(index) == 2
+
+
+def test_stimuli_index_near_duplicate():
+    # The same square, with a short tick on one side.
+    ticked_square = SQUARE + [np.array([[0.0, -1.0], [0.0, -0.9]])]
+    exact_index = to_test.StimuliIndex()
+    near_index = to_test.StimuliIndex(similarity=0.9)
+    for index in [exact_index, near_index]:
+        assert index.add(SQUARE) is None
+        assert index.add(LINE) is None
+    assert exact_index.add(ticked_square) is None
+    assert near_index.add(ticked_square) == 0
+    # Shapes that only overlap in a few cells are not near-duplicates.
+    assert near_index.add([SQUARE[0] * 3]) is None
+
+
+def test_generate_tasks_curriculum_dedup_similarity():
+    generator = TasksGeneratorRegistry[NutsBoltsProgramsTasksGenerator.name]
+    num_tasks = len(generator.generate_tasks_curriculum("all", 0.8).get_all_tasks())
+    generator.dedup_similarity = 0.8
+    tasks = generator.generate_tasks_curriculum("all", 0.8).get_all_tasks()
+    assert 0 < len(tasks) < num_tasks
+    index = to_test.StimuliIndex(similarity=0.8)
+    for task in tasks:
+        assert index.add(task.ground_truth_strokes) is None
@@ -0,0 +1,78 @@
+"""test_task_archive.py | Author : Catherine Wong"""
+
+import os
+import pickle
+import numpy as np
+from dreamcoder.program import Program
+
+import primitives.object_primitives as object_primitives
+import tasksgenerator.task_archive as to_test
+from tasksgenerator.tasks_generator import DrawingTask
+
+TEST_PROGRAMS = ["(line)", "(circle)", "(rectangle)", "(line)", "(circle)"]
+
+
+def _build_tasks():
+    return [
+        DrawingTask(
+            task_id=task_id,
+            request=object_primitives.tstroke,
+            ground_truth_program=Program.parse(program_string),
+            render_parsed_program_fn=object_primitives.render_parsed_program,
+            task_generator_name="test_task_archive",
+        )
+        for task_id, program_string in enumerate(TEST_PROGRAMS)
+    ]
+
+
+def test_write_task_archive(tmpdir):
+    tasks = _build_tasks()
+    archive_dir = os.path.join(tmpdir, "archive")
+    assert to_test.write_task_archive(tasks, archive_dir, tasks_per_shard=2) == 5
+    assert to_test.is_task_archive(archive_dir)
+    # 3 shards, each with records, indices and values, and the index.
+    assert len(os.listdir(archive_dir)) == 3 * 3 + 1
+
+    archive = to_test.TaskArchive(archive_dir)
+    assert len(archive) == len(tasks)
+    assert archive.get_task_names() == [task.name for task in tasks]
+    for task, archive_task in zip(tasks, archive):
+        assert archive_task.name == task.name
+        assert str(archive_task.ground_truth_program) == str(task.ground_truth_program)
+        assert archive_task.compact_rendering
+        assert np.array_equal(archive_task.rendering, task.rendering)
+        assert archive_task.logLikelihood(task.ground_truth_program) == 0.0
+
+
+def test_task_archive_loads_lazily(tmpdir):
+    tasks = _build_tasks()
+    archive_dir = os.path.join(tmpdir, "archive")
+    to_test.write_task_archive(tasks, archive_dir, tasks_per_shard=2)
+    archive = to_test.TaskArchive(archive_dir)
+    archive_task = archive.load_task(tasks[4].name)
+    assert list(archive._shard_records) == [2]
+    assert archive.load_task(tasks[4].name) is archive_task
+    # Loaded tasks can still be pickled on their own.
+    loaded_task = pickle.loads(pickle.dumps(archive_task))
+    assert np.array_equal(loaded_task.rendering, tasks[4].rendering)
+
+
+def test_task_archive_export_names(tmpdir):
+    # Tasks in different splits can share a name.
+    tasks = _build_tasks()[:2] + _build_tasks()[:2]
+    export_names = {
+        id(task): f"{split}_{task.name}"
+        for split, split_tasks in [("train", tasks[:2]), ("test", tasks[2:])]
+        for task in split_tasks
+    }
+    archive_dir = os.path.join(tmpdir, "archive")
+    to_test.write_task_archive(
+        tasks, archive_dir, get_export_name=lambda task: export_names[id(task)]
+    )
+    archive = to_test.TaskArchive(archive_dir)
+    assert archive.get_task_names() == [export_names[id(task)] for task in tasks]
+    for task_idx, task in enumerate(tasks):
+        assert archive.load_task(export_names[id(task)]) is archive.load_task_at(
+            task_idx
+        )
+    assert tasks[0].name not in archive
@@ -0,0 +1,82 @@
+"""test_task_summaries.py | Author : Catherine Wong"""
+
+import os
+import csv
+import numpy as np
+
+import tasksgenerator.task_summaries as to_test
+
+TEST_STROKES = [
+    [
+        np.array([[0.0, 0.0], [1.0, 1.0]]),
+        np.array([[2.0, 0.0], [2.0, 1.0], [3.0, 1.0]]),
+    ],
+    [],
+    [np.array([[0.5, 0.5], [0.0, 1.0]])],
+]
+
+
+def _build_summaries():
+    for task_idx, strokes in enumerate(TEST_STROKES):
+        yield {
+            "task_name": f"test_{task_idx}",
+            "dreamcoder_program_dsl_0_tokens": ["(", "C", str(task_idx), ")"],
+            to_test.STROKES_COLUMN: [strokes],
+            "n_strokes": len(strokes),
+        }
+
+
+def _assert_strokes_equal(sidecar_file):
+    sidecar_strokes = to_test.load_strokes_sidecar(sidecar_file)
+    assert len(sidecar_strokes) == len(TEST_STROKES)
+    for strokes, test_strokes in zip(sidecar_strokes, TEST_STROKES):
+        assert len(strokes) == len(test_strokes)
+        for stroke, test_stroke in zip(strokes, test_strokes):
+            assert np.array_equal(stroke, test_stroke)
+
+
+def test_write_csv_summaries(tmpdir):
+    summary_file = os.path.join(tmpdir, "test.csv")
+    assert to_test.write_csv_summaries(_build_summaries(), summary_file) == 3
+    with open(summary_file) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["task_name"] for row in rows] == ["test_0", "test_1", "test_2"]
+    assert to_test.STROKES_COLUMN in rows[0]
+    assert not os.path.exists(to_test.get_strokes_sidecar_file(summary_file))
+
+
+def test_append_csv_summaries(tmpdir):
+    summary_file = os.path.join(tmpdir, "test.csv")
+    expected_file = os.path.join(tmpdir, "expected.csv")
+    to_test.write_csv_summaries(_build_summaries(), expected_file)
+    summaries = list(_build_summaries())
+    offset = to_test.append_csv_summaries(summaries[:1], summary_file)
+    to_test.append_csv_summaries(summaries[1:], summary_file, offset)
+    # Appending again from the same offset overwrites the rows after it.
+    to_test.append_csv_summaries(summaries[1:], summary_file, offset)
+    with open(summary_file) as f, open(expected_file) as expected_f:
+        assert f.read() == expected_f.read()
+
+
+def test_write_csv_summaries_strokes_sidecar(tmpdir):
+    summary_file = os.path.join(tmpdir, "test.csv")
+    to_test.write_csv_summaries(_build_summaries(), summary_file, strokes_sidecar=True)
+    with open(summary_file) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3
+    assert to_test.STROKES_COLUMN not in rows[0]
+    _assert_strokes_equal(to_test.get_strokes_sidecar_file(summary_file))
+
+
+def test_write_columnar_summaries(tmpdir):
+    summary_dir = os.path.join(tmpdir, "test")
+    assert to_test.write_columnar_summaries(_build_summaries(), summary_dir) == 3
+    columns = to_test.read_summary_columns(
+        summary_dir, ["task_name", "dreamcoder_program_dsl_0_tokens"]
+    )
+    assert columns["task_name"] == ["test_0", "test_1", "test_2"]
+    assert columns["dreamcoder_program_dsl_0_tokens"][1] == ["(", "C", "1", ")"]
+    assert not os.path.exists(
+        os.path.join(summary_dir, to_test.STROKES_COLUMN + to_test.COLUMN_EXTENSION)
+    )
+    _assert_strokes_equal(to_test.get_strokes_sidecar_file(summary_dir))
@@ -1,5 +1,8 @@
 """test_tasks_generator.py | Author: Catherine Wong"""
 
+import pickle
+import multiprocessing
+import numpy as np
 import tasksgenerator.tasks_generator as to_test
 from dreamcoder.program import Program
 from dreamcoder.grammar import Grammar
@@ -25,7 +28,9 @@ class TestTasksGenerator(to_test.AbstractTasksGenerator):
     def _generate_strokes_for_stimuli(self):
         return [t.rendering for t in self._generate_tasks()]
 
-    def generate_tasks_curriculum(self, num_tasks_to_generate_per_condition):
+    def generate_tasks_curriculum(
+        self, num_tasks_to_generate_per_condition, train_ratio=1.0
+    ):
         test_curriculum_id = "test_id"
         task_curriculum = to_test.TaskCurriculum(
             curriculum_id=test_curriculum_id,
@@ -54,6 +59,13 @@ class TestManualCurriculumTasksGenerator(to_test.ManualCurriculumTasksGenerator)
         super().__init__(grammar=grammar)
 
 
+def test_tasks_generator_registry_imports_generators():
+    for name, module in to_test.TASKS_GENERATOR_MODULES.items():
+        generator_class = to_test.TasksGeneratorRegistry.get_class(name)
+        assert generator_class.name == name
+        assert generator_class.__module__ == module
+
+
 def test_drawing_task_from_program():
     test_task_id = DEFAULT_TEST_TASK_ID
     test_ground_truth_program = Program.parse("(line)")
@@ -93,6 +105,144 @@ def test_drawing_task_from_strokes():
     assert DEFAULT_TEST_TASK_GENERATOR in test_task.name
 
 
+def test_drawing_task_renders_lazily():
+    test_ground_truth_program = Program.parse("(line)")
+    renders = []
+
+    def render_parsed_program_fn(program):
+        renders.append(program)
+        return object_primitives.render_parsed_program(program)
+
+    test_task = to_test.DrawingTask(
+        task_id=DEFAULT_TEST_TASK_ID,
+        request=object_primitives.tstroke,
+        ground_truth_program=test_ground_truth_program,
+        render_parsed_program_fn=render_parsed_program_fn,
+        task_generator_name=DEFAULT_TEST_TASK_GENERATOR,
+    )
+    test_task.task_summary()
+    assert len(renders) == 0
+    rendering = test_task.rendering
+    assert np.array_equal(
+        rendering, object_primitives.render_parsed_program(test_ground_truth_program)
+    )
+    assert test_task.rendering is rendering
+    assert len(renders) == 1
+
+
+def test_drawing_task_compact_rendering():
+    test_task = _build_default_tasks()[0]
+    rendering = test_task.rendering
+    test_task.compact_rendering = True
+    assert np.array_equal(test_task.rendering, rendering)
+    assert len(test_task._rendering[1]) == np.count_nonzero(rendering)
+    test_task.compact_rendering = False
+    assert test_task.rendering.shape == rendering.shape
+
+
+def test_drawing_task_compact_rendering_size():
+    import pickle
+
+    test_task = _build_default_tasks()[0]
+    rendering = test_task.rendering
+    dense_size = len(pickle.dumps(test_task))
+    test_task.compact_rendering = True
+    packed_size = sum(np.asarray(packed).nbytes for packed in test_task._rendering)
+    assert packed_size * 10 < rendering.nbytes
+    compact_size = len(pickle.dumps(test_task))
+    assert compact_size * 10 < dense_size
+    assert compact_size < dense_size - rendering.nbytes + packed_size * 2
+
+
+def test_drawing_task_pickle():
+    import pickle
+
+    test_task = _build_default_tasks()[0]
+    test_task.compact_rendering = True
+    pickled_task = pickle.dumps(test_task)
+    test_task.task_summary()
+    assert pickle.dumps(test_task) == pickled_task
+    loaded_task = pickle.loads(pickled_task)
+    assert loaded_task.name == test_task.name
+    assert loaded_task.compact_rendering
+    assert np.array_equal(loaded_task.rendering, test_task.rendering)
+    assert loaded_task.task_summary() == test_task.task_summary()
+
+
+def test_drawing_task_get_record():
+    test_task = _build_default_tasks()[0]
+    record = test_task.get_record()
+    test_task.task_summary()
+    test_task.rendering
+    # The record does not depend on which lazy attributes have been used.
+    assert test_task.get_record().keys() == record.keys()
+    assert not set(record) & set(to_test.DrawingTask._LAZY_ATTRIBUTES)
+    # Pickles of tasks with slots stored the same record, so they still load.
+    loaded_task = to_test.DrawingTask.__new__(to_test.DrawingTask)
+    loaded_task.__setstate__(dict(record))
+    assert loaded_task.task_summary() == test_task.task_summary()
+    assert np.array_equal(loaded_task.rendering, test_task.rendering)
+
+
+def test_pack_rendering():
+    rendering = np.zeros((16, 16))
+    rendering[2:4, 5] = 0.25
+    packed_rendering = to_test.pack_rendering(rendering)
+    assert len(packed_rendering[1]) == 2
+    assert np.array_equal(to_test.unpack_rendering(packed_rendering), rendering)
+
+
+def test_get_pixel_loss_matrix():
+    rng = np.random.RandomState(0)
+    renderings = [rng.rand(8, 8) * (rng.rand(8, 8) < 0.2) for _ in range(5)]
+    candidate_renderings = renderings[:3] + [renderings[3] + 0.01]
+    losses = to_test.get_pixel_loss_matrix(
+        candidate_renderings,
+        [to_test.pack_rendering(r) for r in renderings],
+        batch_size=3,
+    )
+    expected_losses = np.array(
+        [[np.linalg.norm(c - r) for r in renderings] for c in candidate_renderings]
+    )
+    assert losses.shape == (4, 5)
+    assert np.allclose(losses, expected_losses)
+    # Pairs that are not within max_loss may not be compared.
+    losses = to_test.get_pixel_loss_matrix(
+        candidate_renderings, renderings, max_loss=0.1
+    )
+    assert np.allclose(
+        losses[expected_losses <= 0.1], expected_losses[expected_losses <= 0.1]
+    )
+    assert np.all(losses[expected_losses > 0.1] > 0.1)
+
+
+def test_batch_log_likelihood():
+    program_strings = ["(line)", "(circle)", "(rectangle)"]
+    tasks = [
+        to_test.DrawingTask(
+            task_id=task_id,
+            request=object_primitives.tstroke,
+            ground_truth_program=Program.parse(program_string),
+            render_parsed_program_fn=object_primitives.render_parsed_program,
+            task_generator_name=DEFAULT_TEST_TASK_GENERATOR,
+            compact_rendering=task_id > 0,
+        )
+        for task_id, program_string in enumerate(program_strings)
+    ]
+    candidates = [Program.parse(p) for p in ["(circle)", "(line)"]]
+    log_likelihoods = to_test.batch_log_likelihood(tasks, candidates)
+    assert log_likelihoods.shape == (2, 3)
+    for candidate, candidate_log_likelihoods in zip(candidates, log_likelihoods):
+        for task, log_likelihood in zip(tasks, candidate_log_likelihoods):
+            assert log_likelihood == task.logLikelihood(candidate)
+    assert np.array_equal(
+        log_likelihoods,
+        to_test.batch_log_likelihood(
+            tasks, renderings=[c.rendering for c in candidates]
+        ),
+    )
+
+
 def _build_default_tasks(
     test_task_id=DEFAULT_TEST_TASK_ID, task_generator_name=DEFAULT_TEST_TASK_GENERATOR
 ):
@@ -131,6 +281,25 @@ def test_task_curriculum_get_all_tasks():
     assert len(task_curriculum.get_all_tasks()) == len(test_tasks)
 
 
+def test_task_curriculum_get_block_tasks():
+    task_curriculum = to_test.TaskCurriculum(
+        curriculum_id="test_id", task_generator_name=DEFAULT_TEST_TASK_GENERATOR
+    )
+    test_split = to_test.TaskCurriculum.SPLIT_TRAIN
+    test_tasks = _build_default_tasks()
+    task_curriculum.add_tasks(test_split, "test_condition", "0", test_tasks)
+    assert task_curriculum.get_block_tasks(test_split, "test_condition", "0") == (
+        test_tasks
+    )
+    # The index is rebuilt after more tasks are added.
+    other_tasks = _build_default_tasks(test_task_id="1")
+    task_curriculum.add_tasks(test_split, "test_condition", "1", other_tasks)
+    assert task_curriculum.get_all_tasks() == test_tasks + other_tasks
+    assert task_curriculum.get_task(other_tasks[0].name) is other_tasks[0]
+    manifest = task_curriculum.get_manifest()
+    assert manifest["tasks"] == [t.name for t in test_tasks + other_tasks]
+
+
 def test_task_curriculum_get_curriculum_summary():
     test_curriculum_id = "test_id"
     task_curriculum = to_test.TaskCurriculum(
@@ -205,6 +374,45 @@ def test_tasks_generator_get_number_tasks_to_generate_per_condition():
         assert test_human_readable_num_to_generate == human_readable_num_to_generate
 
 
+def test_tasks_generator_generates_stimuli_once():
+    class CountingTasksGenerator(TestTasksGenerator):
+        name = f"{DEFAULT_TEST_TASK_GENERATOR}_{to_test.PROGRAMS_NAME}"
+
+        def __init__(self):
+            super(CountingTasksGenerator, self).__init__()
+            self.n_generated = 0
+
+        def _generate_strokes_strings_for_stimuli(self, train_ratio):
+            self.n_generated += 1
+            program = Program.parse("(line)")
+            strokes, strings = program.evaluate([]), (program, {})
+            return [strokes], [strokes], [strings], [strings]
+
+    task_generator = CountingTasksGenerator()
+    num_to_generate, _ = task_generator._get_number_tasks_to_generate_per_condition(
+        to_test.AbstractTasksGenerator.GENERATE_ALL, train_ratio=1.0
+    )
+    train_tasks, test_tasks = task_generator._generate_drawing_tasks_from_strokes(
+        num_to_generate,
+        request_type=object_primitives.tstroke,
+        render_parsed_program_fn=object_primitives.render_parsed_program,
+        task_generator_name=task_generator.name,
+        train_ratio=1.0,
+    )
+    assert num_to_generate == len(train_tasks) + len(test_tasks) == 2
+    assert task_generator.n_generated == 1
+
+    # Stimuli are not reused across sets of tasks.
+    task_generator._generate_drawing_tasks_from_strokes(
+        to_test.AbstractTasksGenerator.GENERATE_ALL,
+        request_type=object_primitives.tstroke,
+        render_parsed_program_fn=object_primitives.render_parsed_program,
+        task_generator_name=task_generator.name,
+        train_ratio=1.0,
+    )
+    assert task_generator.n_generated == 2
+
+
 def test_manual_curriculum_tasks_generator_load_tasks_from_existing_generator():
     existing_generator = to_test.TasksGeneratorRegistry[DEFAULT_TEST_TASK_GENERATOR]
     manual_generator = to_test.TasksGeneratorRegistry[
@@ -255,3 +463,224 @@ def test_intersect_numpy_array_renders_for_tasks():
         assert to_test.AbstractTasksGenerator.INTERSECT in task.name
         assert default_generator_1 in task.name
         assert default_generator_2 in task.name
+
+
+def test_synthetic_abstractions_merge():
+    base = to_test.SyntheticAbstractions()
+    base[to_test.LOW_LEVEL] += ["line"]
+    base[to_test.LOW_LEVEL_PARAMS].append("1")
+    part = to_test.SyntheticAbstractions()
+    part[to_test.LOW_LEVEL].append("circle")
+
+    merged = base.copy().merge(part).merge(part)
+    assert merged[to_test.LOW_LEVEL] == ["line", "circle", "circle"]
+    assert merged[to_test.LOW_LEVEL_PARAMS] == ["1"]
+
+    # Later changes to either record do not leak into the other.
+    merged[to_test.LOW_LEVEL].append("rectangle")
+    part[to_test.LOW_LEVEL].append("square")
+    assert base[to_test.LOW_LEVEL] == ["line"]
+    assert part[to_test.LOW_LEVEL] == ["circle", "square"]
+    assert merged[to_test.LOW_LEVEL] == ["line", "circle", "circle", "rectangle"]
+
+    merged.merge({to_test.HIGH_LEVEL: ["whole"]}, levels=[to_test.HIGH_LEVEL])
+    assert merged[to_test.HIGH_LEVEL] == ["whole"]
+
+
+def test_synthetic_abstractions_to_summary():
+    synthetic_dict = {k: [k] for k in to_test.SYNTHETIC_DICT}
+    synthetic_abstractions = to_test.SyntheticAbstractions.from_dict(synthetic_dict)
+    assert synthetic_abstractions == synthetic_dict
+    assert set(synthetic_abstractions) == set(synthetic_dict)
+
+    summary = synthetic_abstractions.to_summary()
+    assert list(summary)[: len(to_test.SYNTHETIC_LEVELS)] == list(
+        to_test.SYNTHETIC_LEVELS
+    )
+    assert summary[to_test.LOW_LEVEL + to_test.WITH_PARAMS] == [
+        to_test.LOW_LEVEL,
+        to_test.LOW_LEVEL_PARAMS,
+    ]
+    assert summary[to_test.MID_LEVEL_PARTS + to_test.WITH_PARAMS] == [
+        to_test.MID_LEVEL_PARTS,
+        to_test.MID_LEVEL_PARAMS,
+    ]
+
+
+def test_get_program_metadata():
+    test_program = "(connect circle line)"
+    program_metadata = to_test.get_program_metadata(test_program)
+    assert to_test.get_program_metadata(test_program) is program_metadata
+    assert to_test.get_program_metadata(Program.parse(test_program)) is program_metadata
+
+    assert program_metadata.tokens == Program.parse(test_program).left_order_tokens(
+        show_vars=True
+    )
+    for verbosity_level in [to_test.VERBOSITY_0, to_test.VERBOSITY_1]:
+        assert program_metadata.show(verbosity_level) == Program.parse(
+            test_program
+        ).show(isFunction=False, alternate_names=verbosity_level)
+
+
+def test_lru_cache():
+    cache = to_test.LRUCache(maxsize=2)
+    cache["a"], cache["b"] = 1, 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get("b", 0) == 0
+
+
+def test_get_program_metadata_bounded():
+    for idx in range(to_test.PROGRAM_METADATA_CACHE_SIZE + 1):
+        to_test.get_program_metadata(f"(T line (M {idx} 0 0 0))")
+    assert len(to_test.PROGRAM_METADATA_CACHE) == to_test.PROGRAM_METADATA_CACHE_SIZE
+
+
+def test_get_canonical_part_params():
+    values = [1, 1.0, "1", -0.0, 0.0]
+    assert len({to_test.get_canonical_part_params(value) for value in values}) == 5
+    strokes = [np.array([[0.0, 0.0], [1.0, 0.0]])]
+    assert to_test.get_canonical_part_params(
+        [(strokes, "l")]
+    ) == to_test.get_canonical_part_params([([s.copy() for s in strokes], "l")])
+
+
+def test_memoized_part():
+    built_parts = []
+
+    class TestPartsGenerator:
+        @to_test.memoized_part("test_part")
+        def _generate_part(self, size, scale="1"):
+            built_parts.append(size)
+            return [[np.zeros((2, 2))]], f"(T l (M {scale} 0 {size} 0))", None
+
+    part = TestPartsGenerator()._generate_part(2)
+    # Parts are shared across generators and do not depend on how the parameters are passed.
+    assert TestPartsGenerator()._generate_part(size=2, scale="1") is part
+    assert TestPartsGenerator()._generate_part(2.0) is not part
+    assert built_parts == [2, 2.0]
+
+
+def test_memoized_part_bounded():
+    class TestPartsGenerator:
+        @to_test.memoized_part("test_bounded_part")
+        def _generate_part(self, size):
+            return [[np.zeros((2, 2))]], f"(T l (M 1 0 {size} 0))", None
+
+    generator = TestPartsGenerator()
+    first_part = generator._generate_part(0)
+    for size in range(1, to_test.PART_LIBRARY_SIZE + 1):
+        generator._generate_part(size)
+    assert len(to_test.PART_LIBRARY) == to_test.PART_LIBRARY_SIZE
+    # The least recently used part was evicted, and is built again.
+    assert generator._generate_part(0) is not first_part
+
+
+def test_random_sample_ratio_ordered_array():
+    array = list(range(1000))
+    (
+        train,
+        test,
+        train_strings,
+        test_strings,
+    ) = to_test.random_sample_ratio_ordered_array(
+        array, 0.8, strings_array=[str(i) for i in array]
+    )
+    assert len(train) == 800
+    assert sorted(train + test) == array
+    assert train == sorted(train) and test == sorted(test)
+    assert train_strings == [str(i) for i in train]
+    assert test_strings == [str(i) for i in test]
+
+
+def test_get_train_mask_stratified():
+    strata = ["simple"] * 5 + ["perforated"] * 95
+    for _ in range(10):
+        train_mask = to_test.get_train_mask(len(strata), 0.8, strata=strata)
+        assert train_mask[:5].sum() == 4
+        assert train_mask[5:].sum() == 76
+
+
+def test_get_train_mask_stratified_largest_remainder():
+    strata = ["simple"] * 7 + ["perforated"] * 7 + ["rotated"] * 7 + ["single"]
+    for _ in range(10):
+        train_mask = to_test.get_train_mask(len(strata), 0.8, strata=strata)
+        # Flooring each stratum would only keep 5 + 5 + 5 + 0 = 15.
+        assert train_mask.sum() == round(len(strata) * 0.8)
+        # Every stratum with at least two stimuli is still in test.
+        for start in [0, 7, 14]:
+            assert 0 < train_mask[start : start + 7].sum() < 7
+
+
+def test_get_stratified_prefix_mask():
+    strata = ["simple"] * 60 + ["perforated"] * 190 + ["rotated"] * 2
+    keep_mask = to_test.get_stratified_prefix_mask(strata, 10)
+    assert keep_mask.sum() == 10
+    # Every stratum is kept, in proportion, and the first stimuli of each stratum are kept.
+    assert list(np.flatnonzero(keep_mask)) == [0, 1, 2, 60, 61, 62, 63, 64, 65, 250]
+    assert to_test.get_stratified_prefix_mask(strata, 1000).all()
+
+
+def test_is_train_descriptor():
+    descriptors = [("test_descriptor", i) for i in range(1000)]
+    for train_ratio in [0.0, 1.0]:
+        assert all(
+            to_test.is_train_descriptor(DEFAULT_TEST_TASK_GENERATOR, d, train_ratio)
+            == (train_ratio == 1.0)
+            for d in descriptors
+        )
+    num_train = sum(
+        to_test.is_train_descriptor(DEFAULT_TEST_TASK_GENERATOR, d, 0.8)
+        for d in descriptors
+    )
+    assert 750 < num_train < 850
+
+
+def test_get_stimulus_seed():
+    assert to_test.get_stimulus_seed(
+        DEFAULT_TEST_TASK_GENERATOR, 137
+    ) == to_test.get_stimulus_seed(DEFAULT_TEST_TASK_GENERATOR, 137)
+    assert to_test.get_stimulus_seed(
+        DEFAULT_TEST_TASK_GENERATOR, 137
+    ) != to_test.get_stimulus_seed(DEFAULT_TEST_TASK_GENERATOR, 138)
+
+
+def _get_stimuli_shard_size(_):
+    return to_test.AbstractTasksGenerator.STIMULI_SHARD_SIZE
+
+
+def test_get_pool():
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return
+    shard_size = to_test.AbstractTasksGenerator.STIMULI_SHARD_SIZE
+    to_test.AbstractTasksGenerator.STIMULI_SHARD_SIZE = shard_size + 1
+    try:
+        with to_test.get_pool(2) as pool:
+            worker_shard_sizes = pool.map(_get_stimuli_shard_size, range(2))
+    finally:
+        to_test.AbstractTasksGenerator.STIMULI_SHARD_SIZE = shard_size
+    # Forked workers see the state of this process, rather than re-importing it.
+    assert worker_shard_sizes == [shard_size + 1] * 2
+
+
+def test_get_worker_stimuli():
+    stroke = np.zeros((2, 2))
+    shard_stimuli = [[([stroke, stroke], "(line)", {})]]
+    # Stimuli returned by a worker are unpickled with their own dtypes.
+    worker_stimuli = to_test._get_worker_stimuli(
+        pickle.loads(pickle.dumps(shard_stimuli))
+    )
+    worker_strokes = worker_stimuli[0][0][0]
+    assert worker_strokes[0] is worker_strokes[1]
+    assert pickle.dumps([worker_stimuli, np.ones(1)]) == pickle.dumps(
+        [shard_stimuli, np.ones(1)]
+    )
+
+
+def test_map_in_order():
+    items = list(range(100))
+    assert to_test.map_in_order(str, items, num_workers=1) == [str(i) for i in items]
+    assert to_test.map_in_order(str, items, num_workers=3) == [str(i) for i in items]
@@ -6,6 +6,7 @@ from tasksgenerator.bases_parts_tasks_generator import *
 from tasksgenerator.tasks_generator import (
     TasksGeneratorRegistry,
     AbstractTasksGenerator,
+    get_part_generator,
 )
 from primitives.gadgets_primitives import *
 from primitives.test_object_primitives import (
@@ -160,6 +161,57 @@ def test_wheeled_vehicles_tasks_generator_generate_buggy_bases():
     )
 
 
+def test_generate_row_of_wheels_strings_shares_parts():
+    nuts_bolts_generator = get_part_generator(to_test.NutsBoltsProgramsTasksGenerator)
+    wheel_parameters = {
+        "outer_shapes": [c_string],
+        "outer_shapes_min_size": MEDIUM * MEDIUM,
+        "inner_shapes": [r_string],
+        "inner_shapes_max_size": f"(* {SMALL} {SCALE_UNIT})",
+        "n_decorators": 4,
+        "n_spokes": 0,
+        "min_x": f"(* {LARGE} -4)",
+        "max_x": f"(* {LARGE} 4)",
+        "n_wheels": 4,
+    }
+    rows_of_wheels = []
+    for paired_wheels in [True, False]:
+        for _ in range(2):
+            # Each generator instance gets the same row, built once.
+            generator = TasksGeneratorRegistry[
+                to_test.WheelsProgramsTasksGenerator.name
+            ]
+            rows_of_wheels.append(
+                generator._generate_row_of_wheels_strings(
+                    paired_wheels=paired_wheels, **wheel_parameters
+                )
+            )
+    assert rows_of_wheels[0] is rows_of_wheels[1]
+    assert rows_of_wheels[2] is rows_of_wheels[3]
+    assert rows_of_wheels[0][1] != rows_of_wheels[2][1]
+    # Pairing the wheels does not modify the shared wheel part.
+    (
+        _,
+        _,
+        wheel_synthetic_dict,
+        _,
+        _,
+    ) = nuts_bolts_generator._generate_perforated_shapes_string(
+        outer_shapes=[c_string],
+        outer_shapes_min_size=f"(* {MEDIUM * MEDIUM} 1.0)",
+        inner_shapes=[r_string],
+        inner_shapes_max_size=f"(* (* {SMALL} {SCALE_UNIT}) 1.0)",
+        nesting_scale_unit=str(SCALE_UNIT),
+        decorator_shape=c_string,
+        n_decorators="4",
+        n_spokes=0,
+        spoke_angle=np.pi,
+        spoke_length=MEDIUM * MEDIUM * 0.5 * 1.0,
+    )
+    assert "repeat_x" not in wheel_synthetic_dict[MID_LEVEL]
+    assert "double_wheel" not in wheel_synthetic_dict[HIGH_LEVEL]
+
+
 def test_wheels_tasks_generator_generate_parts_for_stimuli(tmpdir):
     generator = TasksGeneratorRegistry[to_test.WheelsProgramsTasksGenerator.name]
     (
@@ -7,6 +7,7 @@ Threads program string generating logic through the generation.
 import math, random, itertools, copy
 from sqlite3 import connect
 from primitives.gadgets_primitives import *
+import primitives.gadgets_compiler as gadgets_compiler
 from dreamcoder.grammar import Grammar
 from tasksgenerator.dial_programs_task_generator import DialProgramsTasksGenerator
 
@@ -16,7 +17,6 @@ from tasksgenerator.tasks_generator import (
     TasksGeneratorRegistry,
     TaskCurriculum,
     DrawingTask,
-    random_sample_ratio_ordered_array,
 )
 from tasksgenerator.bases_parts_tasks_generator import *
 from tasksgenerator.abstract_bases_parts_programs_tasks_generator import *
@@ -24,6 +24,11 @@ from tasksgenerator.abstract_bases_parts_programs_tasks_generator import *
 from tasksgenerator.s12_s13_tasks_generator import RANDOM_SEED
 from tasksgenerator.nuts_bolts_programs_tasks_generator import *
 
+# Sub-families and shapes named in the stimuli descriptors.
+WHEELS_PARTS, ANTENNA_PARTS = "wheels_parts", "antenna_parts"
+TRUCKS, TRAINS, BUGGIES = "trucks", "trains", "buggies"
+WHEELS_SHAPES = {"c": c_string, "r": r_string}
+
 
 @TasksGeneratorRegistry.register
 class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
@@ -76,7 +81,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
         reflect_caboose_for_head: we reverse the order of the head.
         car_margins: scalar value for spacing.
         """
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
 
         head_primitives, head_heights, head_widths, head_floats = (
             copy.deepcopy(caboose_primitives),
@@ -122,11 +127,10 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             right_margins=caboose_margin + body_margin + head_margin,
         )
         # Add the base to the synthetic dict.
-        for k in base_synthetic_dict:
-            synthetic_dict[k] += base_synthetic_dict[k]
+        synthetic_dict.merge(base_synthetic_dict)
 
         if show_doors:
-            window_synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+            window_synthetic_dict = SyntheticAbstractions()
             window = T_string(r_string[0], r_string[1], s=str(MEDIUM))
             window_synthetic_dict[LOW_LEVEL] += ["window_rectangle"]
             window_synthetic_dict[LOW_LEVEL_PARTS] += [r_string[1]]
@@ -162,8 +166,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             strokes = [strokes[0] + new_strokes[0]]
             stroke_strings = [stroke_strings, new_stroke_strings]
             # Add the base to the synthetic dict.
-            for k in new_synthetic_dict:
-                synthetic_dict[k] += new_synthetic_dict[k]
+            synthetic_dict.merge(new_synthetic_dict)
 
         if type(stroke_strings) == list:
             object_string = connect_strokes(stroke_strings)
@@ -182,7 +185,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
         n_windows=0,
     ):
         """Generates 'buggies' consisting of one or more tiers of cars and an optional antenna and windows."""
-        synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+        synthetic_dict = SyntheticAbstractions()
 
         nose_tail_primitives = [RECTANGLE]
         if nose_tail_heights[0] == STR_ZERO:
@@ -209,8 +212,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             right_margins=base_right_margins,
         )
         # Add the base to the synthetic dict.
-        for k in base_synthetic_dict:
-            synthetic_dict[k] += base_synthetic_dict[k]
+        synthetic_dict.merge(base_synthetic_dict)
 
         # Add additional tiers.
         if len(tier_heights) > 1:
@@ -259,7 +261,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
         # Add optional windows.
         if n_windows > 0:
             window = T_string(r_string[0], r_string[1], s=str(MEDIUM))
-            window_synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
+            window_synthetic_dict = SyntheticAbstractions()
             window = T_string(r_string[0], r_string[1], s=str(MEDIUM))
             window_synthetic_dict[LOW_LEVEL] += ["window_rectangle"]
             window_synthetic_dict[LOW_LEVEL_PARTS] += [r_string[1]]
@@ -291,8 +293,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             )
             strokes = [strokes[0] + new_strokes[0]]
             stroke_strings = connect_strokes([stroke_strings, new_stroke_strings])
-            for k in new_synthetic_dict:
-                synthetic_dict[k] += new_synthetic_dict[k]
+            synthetic_dict.merge(new_synthetic_dict)
 
         # Add optional antenna.
         if antenna is not None:
@@ -320,11 +321,10 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             min_x, max_x = min(peval(min_x), peval(new_min_x)), max(
                 peval(new_max_x), peval(max_x)
             )
-            antenna_synthetic_dict = copy.deepcopy(antenna[-1])
-            for k in antenna_synthetic_dict:
-                synthetic_dict[k] += antenna_synthetic_dict[k]
+            synthetic_dict.merge(antenna[-1])
         return strokes, stroke_strings, synthetic_dict, min_x, max_x, min_y, max_y
 
+    @memoized_part("row_of_wheels")
     def _generate_row_of_wheels_strings(
         self,
         outer_shapes,
@@ -340,7 +340,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
         wheel_scale=1.0,
         float_location=FLOAT_BOTTOM,
     ):
-        nuts_bolts_generator = NutsBoltsProgramsTasksGenerator()
+        nuts_bolts_generator = get_part_generator(NutsBoltsProgramsTasksGenerator)
         (
             base_wheel,
             base_wheel_string,
@@ -361,6 +361,7 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             * 0.5
             * wheel_scale,  # This is never used.
         )
+        wheel_synthetic_dict = wheel_synthetic_dict.copy()
 
         if paired_wheels:
             # Double the wheel.
@@ -393,7 +394,6 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             min_x = f"(+ {min_x} (* 0.5 {wheel_height}))"
             max_x = f"(- {max_x} (* 0.5 {wheel_height}))"
 
-        wheel_synthetic_dict = copy.deepcopy(wheel_synthetic_dict)
         return self._generate_n_objects_on_grid_x_y_limits_string(
             object=base_wheel[0],
             object_string=base_wheel_string,
@@ -410,6 +410,40 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
             object_synthetic_dict=wheel_synthetic_dict,
         )
 
+    def _generate_wheels_parameters(self):
+        """Yields (outer shapes, inner shapes, n_decorators) for each kind of wheel, with the shapes named as in WHEELS_SHAPES."""
+        for outer_shapes in [("c",), ("c", "c")]:
+            for inner_shapes in [("c",), ("r",)]:
+                for n_decorators in [4, 8]:
+                    yield outer_shapes, inner_shapes, n_decorators
+
+    def _generate_wheels_strings(
+        self,
+        wheels_parameters,
+        min_x,
+        max_x,
+        n_wheels,
+        paired_wheels=False,
+        float_location=FLOAT_BOTTOM,
+        wheel_scale=1.0,
+    ):
+        """:ret: a row of one kind of wheel from _generate_wheels_parameters."""
+        outer_shapes, inner_shapes, n_decorators = wheels_parameters
+        return self._generate_row_of_wheels_strings(
+            outer_shapes=[WHEELS_SHAPES[shape] for shape in outer_shapes],
+            outer_shapes_min_size=MEDIUM * MEDIUM,
+            inner_shapes=[WHEELS_SHAPES[shape] for shape in inner_shapes],
+            inner_shapes_max_size=f"(* {SMALL} {SCALE_UNIT})",
+            n_decorators=n_decorators,
+            n_spokes=0,
+            min_x=min_x,
+            max_x=max_x,
+            paired_wheels=paired_wheels,
+            n_wheels=n_wheels,
+            float_location=float_location,
+            wheel_scale=wheel_scale,
+        )
+
     def _generate_wheels_strings_iterator(
         self,
         min_x,
@@ -419,39 +453,169 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
         float_location=FLOAT_BOTTOM,
         wheel_scale=1.0,
     ):
-        for outer_shapes in [[c_string], [c_string, c_string]]:
-            for outer_shapes_min_size in [MEDIUM * MEDIUM]:
-                for inner_shapes in [[c_string], [r_string]]:
-                    for inner_shapes_max_size in [f"(* {SMALL} {SCALE_UNIT})"]:
-                        for n_decorators in [4, 8]:
-                            yield self._generate_row_of_wheels_strings(
-                                outer_shapes=outer_shapes,
-                                outer_shapes_min_size=outer_shapes_min_size,
-                                inner_shapes=inner_shapes,
-                                inner_shapes_max_size=inner_shapes_max_size,
-                                n_decorators=n_decorators,
-                                n_spokes=0,
-                                min_x=min_x,
-                                max_x=max_x,
-                                paired_wheels=paired_wheels,
-                                n_wheels=n_wheels,
-                                float_location=float_location,
-                                wheel_scale=wheel_scale,
-                            )
+        for wheels_parameters in self._generate_wheels_parameters():
+            yield self._generate_wheels_strings(
+                wheels_parameters,
+                min_x=min_x,
+                max_x=max_x,
+                n_wheels=n_wheels,
+                paired_wheels=paired_wheels,
+                float_location=float_location,
+                wheel_scale=wheel_scale,
+            )
 
-    def _generate_parts_stimuli_strings(self, train_ratio=1.0):
-        strokes, stroke_strings, stroke_dicts = [], [], []
-        # Generate wheels.
+    def _add_wheels_to_base(
+        self, base_strokes, base_stroke_strings, base_synthetic_dict, wheels_iterator
+    ):
+        """:ret: [(strokes, program string, SyntheticAbstractions)] for a base with each row of wheels from wheels_iterator."""
+        stimuli = []
+        for (
+            wheels_strokes,
+            wheels_strokes_strings,
+            wheels_synthetic_dict,
+            wheels_min_x,
+            wheels_max_x,
+            wheels_min_y,
+            wheels_max_y,
+        ) in wheels_iterator:
+            synthetic_dict = SyntheticAbstractions()
+            # Add the base.
+            synthetic_dict.merge(base_synthetic_dict)
+            # Add the wheels.
+            synthetic_dict.merge(wheels_synthetic_dict)
+            stimuli.append(
+                (
+                    base_strokes[0] + wheels_strokes[0],
+                    connect_strokes([base_stroke_strings, wheels_strokes_strings]),
+                    synthetic_dict,
+                )
+            )
+        return stimuli
+
+    def _generate_parts_descriptors(self):
+        """Yields descriptors for the individual parts in the domain: rows of wheels, then antenna."""
         n_wheels_types = [1, 4]
         for n_wheels in n_wheels_types:
-            wheels_iterator = self._generate_wheels_strings_iterator(
-                f"(* {LARGE} -4)",
-                f"(* {LARGE} 4)",
-                n_wheels=n_wheels,
-                float_location=FLOAT_CENTER,
-                paired_wheels=False,
-            )
             for (
+                outer_shapes,
+                inner_shapes,
+                n_decorators,
+            ) in self._generate_wheels_parameters():
+                yield (
+                    WHEELS_PARTS,
+                    (
+                        ("n_wheels", n_wheels),
+                        ("outer_shapes", outer_shapes),
+                        ("inner_shapes", inner_shapes),
+                        ("n_decorators", n_decorators),
+                    ),
+                )
+        for scale_wires in [True, False]:
+            yield (ANTENNA_PARTS, (("scale_wires", scale_wires),))
+
+    def _generate_truck_descriptors(self):
+        """Yields descriptors for trucks, each with every kind of wheel."""
+        for body_width, body_height in [
+            (LARGE * 8, LARGE * 4),
+            (LARGE * 10, LARGE * 3),
+        ]:
+            n_wheels_types = [2, 4]
+            for n_wheels in n_wheels_types:
+                yield (
+                    TRUCKS,
+                    (
+                        ("body_width", body_width),
+                        ("body_height", body_height),
+                        ("n_wheels", n_wheels),
+                    ),
+                )
+
+    def _generate_train_descriptors(self):
+        """Yields descriptors for trains, each with every kind of wheel."""
+        small_width, large_width = SMALL * 7, SMALL * 9
+        for body_widths in [small_width, large_width]:
+            body_repetitions = [2] if body_widths > small_width else [2, 3]
+            for body_repetitions in body_repetitions:
+                for show_doors in [True, False]:
+                    n_wheels_types = [
+                        body_repetitions * 2,
+                        body_repetitions * 3,
+                    ]
+                    for n_wheels in n_wheels_types:
+                        yield (
+                            TRAINS,
+                            (
+                                ("body_width", body_widths),
+                                ("body_repetitions", body_repetitions),
+                                ("show_doors", show_doors),
+                                ("n_wheels", n_wheels),
+                            ),
+                        )
+
+    def _generate_buggy_descriptors(self, generation_probability=0.80):
+        """Yields descriptors for buggies, each with every kind of wheel that is sampled with generation_probability."""
+        for scale_wires in [True, False]:
+            small_width = LARGE * 7
+            for first_tier_width in [LARGE * n for n in [5, 8]]:
+                for nose_tail_heights, nose_tail_widths in [
+                    (0, 0),
+                    (
+                        MEDIUM * 3 * THREE_QUARTER_SCALE,
+                        LARGE,
+                    ),
+                ]:
+                    for antenna in [True, False]:
+                        n_wheel_sets = (
+                            [2] if first_tier_width <= small_width else [2, 6]
+                        )
+                        for n_wheels in n_wheel_sets:
+                            yield (
+                                BUGGIES,
+                                (
+                                    ("scale_wires", scale_wires),
+                                    ("first_tier_width", first_tier_width),
+                                    ("nose_tail_heights", nose_tail_heights),
+                                    ("nose_tail_widths", nose_tail_widths),
+                                    ("antenna", antenna),
+                                    ("n_wheels", n_wheels),
+                                    ("generation_probability", generation_probability),
+                                ),
+                            )
+
+    def _generate_stimuli_descriptors(self):
+        yield from self._generate_parts_descriptors()
+        yield from self._generate_truck_descriptors()
+        yield from self._generate_train_descriptors()
+        yield from self._generate_buggy_descriptors()
+
+    def _sample_stimuli(self, descriptor):
+        """Buggies draw whether to generate each kind of wheel. :ret: None if no stimuli are generated, () for other descriptors, or whether each kind of wheel is generated for buggies."""
+        sub_family, parameters = descriptor
+        if sub_family != BUGGIES:
+            return ()
+        generation_probability = dict(parameters)["generation_probability"]
+        add_wheels = tuple(
+            not random.uniform(0, 1) > generation_probability
+            for _ in self._generate_wheels_parameters()
+        )
+        if not any(add_wheels):
+            return None
+        return add_wheels
+
+    def _build_antenna_strings(self, scale_wires):
+        antenna_generator = get_part_generator(DialProgramsTasksGenerator)
+        return antenna_generator._generate_stacked_antenna_strings(
+            n_wires=3,
+            scale_wires=scale_wires,
+            end_shape=None,
+        )
+
+    def _build_stimuli(self, descriptor, sample):
+        """Builds the stimuli for a descriptor and its draws from _sample_stimuli. :ret: [(strokes, program string, SyntheticAbstractions)]."""
+        sub_family, parameters = descriptor
+        parameters = dict(parameters)
+        if sub_family == WHEELS_PARTS:
+            (
                 wheels_strokes,
                 wheels_stroke_strings,
                 wheels_stroke_dicts,
@@ -459,284 +623,161 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
                 wheels_max_x,
                 wheels_min_y,
                 wheels_max_y,
-            ) in wheels_iterator:
-                strokes += wheels_strokes
-                stroke_strings.append(wheels_stroke_strings)
-                stroke_dicts.append(wheels_stroke_dicts)
-        for scale_wires in [True, False]:
-            antenna_generator = DialProgramsTasksGenerator()
-            n_wires = 3
+            ) = self._generate_wheels_strings(
+                (
+                    parameters["outer_shapes"],
+                    parameters["inner_shapes"],
+                    parameters["n_decorators"],
+                ),
+                f"(* {LARGE} -4)",
+                f"(* {LARGE} 4)",
+                n_wheels=parameters["n_wheels"],
+                float_location=FLOAT_CENTER,
+                paired_wheels=False,
+            )
+            return [(wheels_strokes[0], wheels_stroke_strings, wheels_stroke_dicts)]
+        if sub_family == ANTENNA_PARTS:
             (
                 antenna_object,
                 antenna_string,
                 antenna_dict,
-            ) = antenna_generator._generate_stacked_antenna_strings(
-                n_wires=n_wires,
-                scale_wires=scale_wires,
-                end_shape=None,
+            ) = self._build_antenna_strings(parameters["scale_wires"])
+            return [(antenna_object[0], antenna_string, antenna_dict)]
+        if sub_family == TRUCKS:
+            (
+                base_strokes,
+                base_stroke_strings,
+                base_synthetic_dict,
+                base_min_x,
+                base_max_x,
+                base_min_y,
+                base_max_y,
+            ) = self._generate_truck_bases_strings(
+                head_width=LARGE,
+                head_height=parameters["body_height"] * THREE_QUARTER_SCALE,
+                body_width=parameters["body_width"],
+                body_height=parameters["body_height"],
+                nose_scale=THREE_QUARTER_SCALE,
+                reverse=False,
+            )
+            wheels_iterator = self._generate_wheels_strings_iterator(
+                base_min_x,
+                base_max_x,
+                n_wheels=parameters["n_wheels"],
+                float_location=FLOAT_CENTER,
+                paired_wheels=parameters["n_wheels"] > 2,
+            )
+            return self._add_wheels_to_base(
+                base_strokes, base_stroke_strings, base_synthetic_dict, wheels_iterator
+            )
+        if sub_family == TRAINS:
+            body_height = SMALL * 5
+            caboose_width = MEDIUM
+            caboose_height = body_height * THREE_QUARTER_SCALE
+            (
+                base_strokes,
+                base_stroke_strings,
+                base_synthetic_dict,
+                base_min_x,
+                base_max_x,
+                base_min_y,
+                base_max_y,
+            ) = self._generate_train_bases_strings(
+                caboose_primitives=[RECTANGLE],
+                caboose_heights=[caboose_height],
+                caboose_widths=[caboose_width],
+                caboose_floats=[FLOAT_TOP],
+                reflect_caboose_for_head=True,
+                body_primitives=[RECTANGLE],
+                body_heights=[body_height],
+                body_widths=[parameters["body_width"]],
+                body_floats=[FLOAT_TOP],
+                body_repetitions=parameters["body_repetitions"],
+                car_margins=QUARTER_SCALE,
+                show_doors=parameters["show_doors"],
+            )
+            wheels_iterator = self._generate_wheels_strings_iterator(
+                base_min_x,
+                base_max_x,
+                n_wheels=parameters["n_wheels"],
+                float_location=FLOAT_CENTER,
+                wheel_scale=THREE_QUARTER_SCALE,
+            )
+            return self._add_wheels_to_base(
+                base_strokes, base_stroke_strings, base_synthetic_dict, wheels_iterator
             )
-            strokes += antenna_object
-            stroke_strings.append(antenna_string)
-            stroke_dicts.append(antenna_dict)
-
-        return random_sample_ratio_ordered_array(
-            strokes, train_ratio, strings_array=list(zip(stroke_strings, stroke_dicts))
-        )
-
-    def _generate_truck_stimuli_strings(self, train_ratio=1.0):
-        big_width = f"(* {LARGE} 8)"
-        strokes, stroke_strings, stroke_dicts = [], [], []
-        for head_width in [LARGE]:
-            for head_height in [LARGE * 2]:
-                for body_width, body_height in [
-                    (LARGE * 8, LARGE * 4),
-                    (LARGE * 10, LARGE * 3),
-                ]:
-                    reverse = False
-                    nose_scale = THREE_QUARTER_SCALE
-
-                    (
-                        base_strokes,
-                        base_stroke_strings,
-                        base_synthetic_dict,
-                        base_min_x,
-                        base_max_x,
-                        base_min_y,
-                        base_max_y,
-                    ) = self._generate_truck_bases_strings(
-                        head_width=head_width,
-                        head_height=body_height * THREE_QUARTER_SCALE,
-                        body_width=body_width,
-                        body_height=body_height,
-                        nose_scale=nose_scale,
-                        reverse=reverse,
-                    )
-                    n_wheels_types = [2, 4]
-                    for n_wheels in n_wheels_types:
-                        paired_wheels = True if n_wheels > 2 else False
-                        wheels_iterator = self._generate_wheels_strings_iterator(
-                            base_min_x,
-                            base_max_x,
-                            n_wheels=n_wheels,
-                            float_location=FLOAT_CENTER,
-                            paired_wheels=paired_wheels,
-                        )
-                        for (
-                            wheels_strokes,
-                            wheels_strokes_strings,
-                            wheels_synthetic_dict,
-                            wheels_min_x,
-                            wheels_max_x,
-                            wheels_min_y,
-                            wheels_max_y,
-                        ) in wheels_iterator:
-
-                            synthetic_dict = copy.deepcopy(base_synthetic_dict)
-                            truck_strokes = [base_strokes[0] + wheels_strokes[0]]
-                            truck_stroke_strings = connect_strokes(
-                                [base_stroke_strings, wheels_strokes_strings]
-                            )
-                            for k in wheels_synthetic_dict:
-                                synthetic_dict[k] += wheels_synthetic_dict[k]
-                            strokes += truck_strokes
-                            stroke_strings.append(truck_stroke_strings)
-                            stroke_dicts.append(synthetic_dict)
-
-        return random_sample_ratio_ordered_array(
-            strokes, train_ratio, strings_array=list(zip(stroke_strings, stroke_dicts))
-        )
 
-    def _generate_train_stimuli_strings(self, train_ratio=1.0):
-        strokes, stroke_strings, stroke_dicts = [], [], []
-
-        body_height = SMALL * 5
-        caboose_width = MEDIUM
-        caboose_height = body_height * THREE_QUARTER_SCALE
-        caboose_primitives, caboose_heights, caboose_widths, caboose_floats = (
-            [
-                RECTANGLE,
+        # Buggies.
+        antenna = None
+        n_wires = 3
+        if parameters["antenna"]:
+            (
+                antenna_object,
+                antenna_string,
+                antenna_dict,
+            ) = self._build_antenna_strings(parameters["scale_wires"])
+            antenna = (antenna_object[0], antenna_string, antenna_dict)
+        antenna_base_height = 3
+        antenna_height = antenna_base_height + (SMALL * (n_wires - 1))
+        first_tier_height, second_tier_height = MEDIUM * 3, SMALL
+        first_tier_width = parameters["first_tier_width"]
+        nose_tail_widths = parameters["nose_tail_widths"]
+        (
+            base_strokes,
+            base_stroke_strings,
+            base_synthetic_dict,
+            base_min_x,
+            base_max_x,
+            base_min_y,
+            base_max_y,
+        ) = self._generate_buggy_bases_strings(
+            tier_heights=[
+                first_tier_height,
+                second_tier_height,
             ],
-            [caboose_height],
-            [caboose_width],
-            [
-                FLOAT_TOP,
+            tier_widths=[
+                first_tier_width,
+                first_tier_width * THREE_QUARTER_SCALE,
             ],
+            nose_tail_heights=[parameters["nose_tail_heights"]],
+            nose_tail_widths=[nose_tail_widths],
+            antenna=antenna,
+            antenna_height=antenna_height,
+            n_windows=0,
+        )
+        wheels_iterator = self._generate_wheels_strings_iterator(
+            base_min_x + nose_tail_widths,
+            base_max_x - nose_tail_widths,
+            n_wheels=parameters["n_wheels"],
+            float_location=FLOAT_CENTER,
+        )
+        return self._add_wheels_to_base(
+            base_strokes,
+            base_stroke_strings,
+            base_synthetic_dict,
+            (wheels for wheels, add in zip(wheels_iterator, sample) if add),
         )
 
-        small_width, large_width = SMALL * 7, SMALL * 9
-        for body_heights in [body_height]:
-            for body_widths in [small_width, large_width]:
-                body_repetitions = [2] if body_widths > small_width else [2, 3]
-                for body_repetitions in body_repetitions:
-                    for car_margins in [QUARTER_SCALE]:
-                        for show_doors in [True, False]:
+    def _generate_parts_stimuli_strings(self, train_ratio=1.0):
+        return self._build_stimuli_from_descriptors(
+            self._generate_parts_descriptors(), train_ratio
+        )
 
-                            (
-                                base_strokes,
-                                base_stroke_strings,
-                                base_synthetic_dict,
-                                base_min_x,
-                                base_max_x,
-                                base_min_y,
-                                base_max_y,
-                            ) = self._generate_train_bases_strings(
-                                caboose_primitives=caboose_primitives,
-                                caboose_heights=caboose_heights,
-                                caboose_widths=caboose_widths,
-                                caboose_floats=caboose_floats,
-                                reflect_caboose_for_head=True,
-                                body_primitives=[RECTANGLE],
-                                body_heights=[body_heights],
-                                body_widths=[body_widths],
-                                body_floats=[FLOAT_TOP],
-                                body_repetitions=body_repetitions,
-                                car_margins=car_margins,
-                                show_doors=show_doors,
-                            )
+    def _generate_truck_stimuli_strings(self, train_ratio=1.0):
+        return self._build_stimuli_from_descriptors(
+            self._generate_truck_descriptors(), train_ratio
+        )
 
-                            n_wheels_types = [
-                                body_repetitions * 2,
-                                body_repetitions * 3,
-                            ]
-                            for n_wheels in n_wheels_types:
-                                wheels_iterator = (
-                                    self._generate_wheels_strings_iterator(
-                                        base_min_x,
-                                        base_max_x,
-                                        n_wheels=n_wheels,
-                                        float_location=FLOAT_CENTER,
-                                        wheel_scale=THREE_QUARTER_SCALE,
-                                    )
-                                )
-                                for (
-                                    wheels_strokes,
-                                    wheels_strokes_strings,
-                                    wheels_synthetic_dict,
-                                    wheels_min_x,
-                                    wheels_max_x,
-                                    wheels_min_y,
-                                    wheels_max_y,
-                                ) in wheels_iterator:
-                                    synthetic_dict = copy.deepcopy(base_synthetic_dict)
-                                    train_strokes = [
-                                        base_strokes[0] + wheels_strokes[0]
-                                    ]
-                                    train_stroke_strings = connect_strokes(
-                                        [base_stroke_strings, wheels_strokes_strings]
-                                    )
-                                    for k in wheels_synthetic_dict:
-                                        synthetic_dict[k] += wheels_synthetic_dict[k]
-                                    strokes += train_strokes
-                                    stroke_strings.append(train_stroke_strings)
-                                    stroke_dicts.append(synthetic_dict)
-        return random_sample_ratio_ordered_array(
-            strokes, train_ratio, strings_array=list(zip(stroke_strings, stroke_dicts))
+    def _generate_train_stimuli_strings(self, train_ratio=1.0):
+        return self._build_stimuli_from_descriptors(
+            self._generate_train_descriptors(), train_ratio
         )
 
     def _generate_buggy_stimuli_strings(
         self, train_ratio=1.0, generation_probability=0.80
     ):
-        strokes, stroke_strings, stroke_dicts = [], [], []
-        for scale_wires in [True, False]:
-            antenna_generator = DialProgramsTasksGenerator()
-            n_wires = 3
-            (
-                antenna_object,
-                antenna_string,
-                antenna_dict,
-            ) = antenna_generator._generate_stacked_antenna_strings(
-                n_wires=n_wires,
-                scale_wires=scale_wires,
-                end_shape=None,
-            )
-            antenna_object = antenna_object[0]
-
-            antenna_base_height = 3
-            antenna_height = antenna_base_height + (SMALL * (n_wires - 1))
-
-            for first_tier_height, second_tier_height in [
-                (MEDIUM * 3, SMALL),
-            ]:
-                small_width = LARGE * 7
-                for first_tier_width in [LARGE * n for n in [5, 8]]:
-                    for nose_tail_heights, nose_tail_widths in [
-                        (0, 0),
-                        (
-                            first_tier_height * THREE_QUARTER_SCALE,
-                            LARGE,
-                        ),
-                    ]:
-                        for antenna in [
-                            (antenna_object, antenna_string, antenna_dict),
-                            None,
-                        ]:
-                            n_wheel_sets = (
-                                [2] if first_tier_width <= small_width else [2, 6]
-                            )
-                            for n_wheels in n_wheel_sets:
-                                (
-                                    base_strokes,
-                                    base_stroke_strings,
-                                    base_synthetic_dict,
-                                    base_min_x,
-                                    base_max_x,
-                                    base_min_y,
-                                    base_max_y,
-                                ) = self._generate_buggy_bases_strings(
-                                    tier_heights=[
-                                        first_tier_height,
-                                        second_tier_height,
-                                    ],
-                                    tier_widths=[
-                                        first_tier_width,
-                                        first_tier_width * THREE_QUARTER_SCALE,
-                                    ],
-                                    nose_tail_heights=[nose_tail_heights],
-                                    nose_tail_widths=[nose_tail_widths],
-                                    antenna=antenna,
-                                    antenna_height=antenna_height,
-                                    n_windows=0,
-                                )
-
-                                wheels_iterator = (
-                                    self._generate_wheels_strings_iterator(
-                                        base_min_x + nose_tail_widths,
-                                        base_max_x - nose_tail_widths,
-                                        n_wheels=n_wheels,
-                                        float_location=FLOAT_CENTER,
-                                    )
-                                )
-                                for (
-                                    wheels_strokes,
-                                    wheels_strokes_strings,
-                                    wheels_synthetic_dict,
-                                    wheels_min_x,
-                                    wheels_max_x,
-                                    wheels_min_y,
-                                    wheels_max_y,
-                                ) in wheels_iterator:
-                                    buggy_strokes = [
-                                        base_strokes[0] + wheels_strokes[0]
-                                    ]
-                                    buggy_stroke_strings = connect_strokes(
-                                        [base_stroke_strings, wheels_strokes_strings]
-                                    )
-                                    synthetic_dict = copy.deepcopy(SYNTHETIC_DICT)
-
-                                    # Add the base.
-                                    for k in base_synthetic_dict:
-                                        synthetic_dict[k] += base_synthetic_dict[k]
-
-                                    # Add the wheels.
-                                    for k in wheels_synthetic_dict:
-                                        synthetic_dict[k] += wheels_synthetic_dict[k]
-                                    if random.uniform(0, 1) > generation_probability:
-                                        continue
-                                    strokes += buggy_strokes
-                                    stroke_strings.append(buggy_stroke_strings)
-                                    stroke_dicts.append(synthetic_dict)
-        return random_sample_ratio_ordered_array(
-            strokes, train_ratio, strings_array=list(zip(stroke_strings, stroke_dicts))
+        return self._build_stimuli_from_descriptors(
+            self._generate_buggy_descriptors(generation_probability), train_ratio
         )
 
     def _generate_strokes_strings_for_stimuli(
@@ -774,16 +815,15 @@ class WheelsProgramsTasksGenerator(AbstractBasesAndPartsProgramsTasksGenerator):
         max_test=50,
     ):
         # Currently generates all tasks as single entities. Does not generate a curriculum.
-        train_tasks, test_tasks = self._generate_drawing_tasks_from_strokes(
+        return self._generate_drawing_tasks_from_strokes(
             num_tasks_to_generate_per_condition,
             request_type=object_primitives.tstroke,
-            render_parsed_program_fn=object_primitives.render_parsed_program,
+            render_parsed_program_fn=gadgets_compiler.render_parsed_program,
             task_generator_name=self.name,
             train_ratio=train_ratio,
+            max_train=max_train,
+            max_test=max_test,
         )
-        max_train = len(train_tasks) if max_train == None else max_train
-        max_test = len(test_tasks) if max_test == None else max_test
-        return train_tasks[:max_train], test_tasks[:max_test]
 
     def generate_tasks_curriculum(
         self, num_tasks_to_generate_per_condition, train_ratio=0.8
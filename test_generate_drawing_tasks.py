@@ -2,14 +2,26 @@
 
 
 import os
+import sys
+import json
+import filecmp
+import subprocess
+import pytest
 from types import SimpleNamespace as MockArgs
 
 from tasksgenerator.test_tasks_generator import TestTasksGenerator
 import src.generate_drawing_tasks as to_test
 
 
+def _build_mock_args(**kwargs):
+    """:ret: args with the commandline defaults, overridden by kwargs."""
+    mock_args = to_test.parser.parse_args([])
+    vars(mock_args).update(kwargs)
+    return mock_args
+
+
 def test_generate_tasks_curriculum():
-    mock_args = MockArgs(
+    mock_args = _build_mock_args(
         tasks_generator=TestTasksGenerator.name, num_tasks_per_condition=None
     )
     tasks_curriculum = to_test.generate_tasks_curriculum(mock_args)
@@ -18,7 +30,7 @@ def test_generate_tasks_curriculum():
 
 def test_export_curriculum_summary(tmpdir):
     export_dir = tmpdir
-    mock_args = MockArgs(
+    mock_args = _build_mock_args(
         task_export_dir=export_dir,
         tasks_generator=TestTasksGenerator.name,
         num_tasks_per_condition=None,
@@ -28,6 +40,9 @@ def test_export_curriculum_summary(tmpdir):
         mock_args, tasks_curriculum
     )
     assert os.path.exists(curriculum_summary_file)
+    assert os.path.basename(curriculum_summary_file) == (
+        f"{TestTasksGenerator.name}_None_{to_test.DATASET_VERSION}.json"
+    )
 
 
 def test_build_generating_command_string():
@@ -40,9 +55,10 @@ def test_build_generating_command_string():
 
 def test_export_tasks(tmpdir):
     export_dir = tmpdir
-    mock_args = MockArgs(
+    mock_args = _build_mock_args(
         task_export_dir=export_dir,
         synthesis_export_dir=None,
+        synthesis_format=to_test.PICKLE_FORMAT,
         tasks_generator=TestTasksGenerator.name,
         num_tasks_per_condition=None,
     )
@@ -53,9 +69,26 @@ def test_export_tasks(tmpdir):
         assert os.path.exists(task_file)
 
 
+def test_export_tasks_archive(tmpdir):
+    export_dir = tmpdir
+    mock_args = _build_mock_args(
+        task_export_dir=export_dir,
+        synthesis_export_dir=None,
+        synthesis_format=to_test.ARCHIVE_FORMAT,
+        tasks_generator=TestTasksGenerator.name,
+        num_tasks_per_condition=None,
+    )
+    tasks_curriculum = to_test.generate_tasks_curriculum(mock_args)
+    synthesis_export_dir = to_test.export_tasks(mock_args, tasks_curriculum)
+    archive = to_test.task_archive.TaskArchive(synthesis_export_dir)
+    assert archive.get_task_names() == [
+        task.name for task in tasks_curriculum.get_all_tasks()
+    ]
+
+
 def test_export_rendered_images(tmpdir):
     export_dir = tmpdir
-    mock_args = MockArgs(
+    mock_args = _build_mock_args(
         task_export_dir=export_dir,
         renders_export_dir=None,
         tasks_generator=TestTasksGenerator.name,
@@ -66,3 +99,190 @@ def test_export_rendered_images(tmpdir):
     for task in tasks_curriculum.get_all_tasks():
         task_image_name = os.path.join(renders_export_dir, task.name + ".png")
         assert os.path.exists(task_image_name)
+
+
+# The programs generators give train and test tasks the same names.
+@pytest.mark.parametrize(
+    "tasks_generator,train_ratio",
+    [(TestTasksGenerator.name, 1.0), ("nuts_bolts_programs", 0.8)],
+)
+@pytest.mark.parametrize(
+    "synthesis_format", [to_test.PICKLE_FORMAT, to_test.ARCHIVE_FORMAT]
+)
+def test_export_curriculum_manifest_load_block_tasks(
+    tmpdir, tasks_generator, train_ratio, synthesis_format
+):
+    export_dir = tmpdir
+    mock_args = _build_mock_args(
+        task_export_dir=export_dir,
+        synthesis_export_dir=None,
+        synthesis_format=synthesis_format,
+        tasks_generator=tasks_generator,
+        num_tasks_per_condition=None,
+        train_ratio=train_ratio,
+    )
+    tasks_curriculum = to_test.generate_tasks_curriculum(mock_args)
+    manifest_file = to_test.export_curriculum_manifest(mock_args, tasks_curriculum)
+    synthesis_export_dir = to_test.export_tasks(mock_args, tasks_curriculum)
+    curriculum = tasks_curriculum.get_curriculum()
+    for split in curriculum:
+        for condition in curriculum[split]:
+            for curriculum_block, tasks in curriculum[split][condition].items():
+                block_tasks = to_test.load_block_tasks(
+                    manifest_file,
+                    synthesis_export_dir,
+                    split,
+                    condition,
+                    curriculum_block,
+                )
+                assert [t.name for t in block_tasks] == [t.name for t in tasks]
+                assert [str(t.ground_truth_program) for t in block_tasks] == [
+                    str(t.ground_truth_program) for t in tasks
+                ]
+
+
+CHECKPOINT_TASKS_GENERATOR = "nuts_bolts_programs"
+CHECKPOINT_EVERY = 100
+
+
+class MockGrammar:
+    """Uniform grammar with the library summary of a dreamcoder Grammar."""
+
+    def __init__(self, primitives):
+        self.primitives = primitives
+
+    @classmethod
+    def uniform(cls, primitives):
+        return cls(primitives)
+
+    def json(self):
+        return {
+            "logVariable": 0.0,
+            "productions": [
+                {"expression": str(primitive), "logProbability": 0.0}
+                for primitive in self.primitives
+            ],
+        }
+
+
+@pytest.fixture
+def checkpoint_grammar():
+    """Builds the grammars of the generators in a test with MockGrammar, for the initial library summary that checkpointed runs write with the task summaries."""
+    with pytest.MonkeyPatch.context() as grammar_patch:
+        grammar_patch.setattr(to_test.tasks_generator, "Grammar", MockGrammar)
+        yield MockGrammar
+
+
+def _build_checkpoint_args(export_dir, checkpoint_every=None, resume=False, workers=1):
+    return _build_mock_args(
+        task_export_dir=export_dir,
+        synthesis_export_dir=None,
+        renders_export_dir=None,
+        summaries_export_dir=None,
+        libraries_export_dir=export_dir,
+        synthesis_format=to_test.PICKLE_FORMAT,
+        summary_format=to_test.task_summaries.CSV_FORMAT,
+        strokes_sidecar=False,
+        incremental=False,
+        task_summaries=True,
+        no_synthesis_tasks=False,
+        no_render=True,
+        workers=workers,
+        dedup_similarity=None,
+        stratify_split=False,
+        train_ratio=0.8,
+        checkpoint_every=checkpoint_every,
+        resume=resume,
+        tasks_generator=CHECKPOINT_TASKS_GENERATOR,
+        num_tasks_per_condition=None,
+    )
+
+
+def test_export_with_checkpoints_resume(tmpdir, monkeypatch, checkpoint_grammar):
+    export_dir = os.path.join(tmpdir, "resumed")
+    os.makedirs(export_dir)
+    export_task = to_test.export_task
+    exported_tasks = []
+
+    def export_first_shard(task, synthesis_export_dir, export_name=None):
+        if len(exported_tasks) >= CHECKPOINT_EVERY:
+            raise MemoryError
+        exported_tasks.append(task)
+        export_task(task, synthesis_export_dir, export_name)
+
+    # Stop the run after the first checkpoint.
+    checkpoint_args = _build_checkpoint_args(export_dir, CHECKPOINT_EVERY, workers=2)
+    monkeypatch.setattr(to_test, "export_task", export_first_shard)
+    with pytest.raises(MemoryError):
+        to_test.run_generation_job(checkpoint_args)
+    monkeypatch.undo()
+    checkpoint_file = to_test.get_generation_checkpoint(checkpoint_args).checkpoint_file
+    checkpoint = to_test.GenerationCheckpoint.load(checkpoint_file)
+    assert checkpoint.position == CHECKPOINT_EVERY
+
+    # Workers build the stimuli to the same tasks as the single process run.
+    resume_args = _build_checkpoint_args(
+        export_dir, CHECKPOINT_EVERY, resume=True, workers=2
+    )
+    to_test.run_generation_job(resume_args)
+    assert not os.path.exists(checkpoint_file)
+
+    # The uninterrupted run generates its curriculum from the same random state.
+    checkpoint.restore_random_state()
+    uninterrupted_dir = os.path.join(tmpdir, "uninterrupted")
+    os.makedirs(os.path.join(uninterrupted_dir, to_test.DEFAULT_SUMMARIES_SUBDIR))
+    uninterrupted_args = _build_checkpoint_args(uninterrupted_dir)
+    to_test.run_generation_job(uninterrupted_args)
+    with open(to_test.get_task_summary_file(checkpoint_args)) as f:
+        with open(to_test.get_task_summary_file(uninterrupted_args)) as f_expected:
+            assert f.read() == f_expected.read()
+    resumed_tasks_dir = to_test.get_synthesis_export_dir(checkpoint_args)
+    uninterrupted_tasks_dir = to_test.get_synthesis_export_dir(uninterrupted_args)
+    task_files = sorted(os.listdir(uninterrupted_tasks_dir))
+    assert sorted(os.listdir(resumed_tasks_dir)) == task_files
+    _, mismatched_files, _ = filecmp.cmpfiles(
+        resumed_tasks_dir, uninterrupted_tasks_dir, task_files, shallow=False
+    )
+    assert mismatched_files == []
+
+
+def test_get_jobs_args(tmpdir):
+    jobs_config = os.path.join(tmpdir, "jobs.json")
+    with open(jobs_config, "w") as f:
+        json.dump([{"tasks_generator": "dials_programs", "train_ratio": 0.5}], f)
+    args = to_test.parser.parse_args(
+        [
+            "--tasks_generator",
+            "nuts_bolts_programs",
+            "wheels_programs",
+            "--jobs_config",
+            jobs_config,
+        ]
+    )
+    jobs_args = to_test.get_jobs_args(args)
+    assert [job_args.tasks_generator for job_args in jobs_args] == [
+        "nuts_bolts_programs",
+        "wheels_programs",
+        "dials_programs",
+    ]
+    assert [job_args.train_ratio for job_args in jobs_args] == [1.0, 1.0, 0.5]
+    assert all(job_args.jobs_config is None for job_args in jobs_args)
+
+    with open(jobs_config, "w") as f:
+        json.dump([{"tasks_generator": "dials_programs", "unknown": 0}], f)
+    with pytest.raises(ValueError):
+        to_test.get_jobs_args(args)
+
+
+def test_generate_drawing_tasks_imports_generators_lazily():
+    # Startup time: importing the script does not import any generator modules.
+    script = "import sys, generate_drawing_tasks; print(' '.join(sys.modules))"
+    imported_modules = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.abspath(to_test.__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    generator_modules = set(to_test.tasks_generator.TASKS_GENERATOR_MODULES.values())
+    assert generator_modules.isdisjoint(imported_modules)